@@ -0,0 +1,161 @@
+# skillpilot/cli.py
+"""
+Headless-режим SkillPilot (без Gradio).
+
+    python -m skillpilot.cli batch --jd jd.txt resumes/ --out scores.jsonl --workers 4
+    python -m skillpilot.cli batch --jd jd.txt dump.zip "more/**/*.pdf" --out scores.csv
+
+Каждый batch-прогон — задача (job) с чекпоинтом; упавший прогон продолжается:
+    python -m skillpilot.cli jobs list
+    python -m skillpilot.cli jobs resume <job_id> --out rest.jsonl
+    python -m skillpilot.cli jobs fetch <job_id> --out all.csv
+
+Заглушка Ollama/OpenAI для нагрузочных прогонов без модели (см. utils/stub_llm.py):
+    python -m skillpilot.cli stub-llm --port 11434 --ttft 0.3 --rate 25 --errors 0.05
+"""
+import argparse
+import sys
+import time
+from typing import Optional
+
+from .config import BATCH_WORKERS
+from .utils.batch import RowWriter, guess_format
+from .utils.ingest import read_any
+from .utils.jobs import BatchJob, list_jobs, DEDUP_THRESHOLD
+from .utils.pii import anonymize
+
+
+def _run_job(job: BatchJob, args) -> int:
+    fmt = args.format or guess_format(args.out)
+    already = job.meta.get("done", 0)
+    t0 = time.time()
+    n = 0
+    if not args.quiet:
+        print(f"Job {job.id} (уже готово: {already})", file=sys.stderr)
+    with RowWriter(args.out, fmt) as w:
+        for row in job.run(workers=args.workers):
+            w.write(row)
+            n += 1
+            if not args.quiet and n % 50 == 0:
+                print(f"… {n} резюме, {n / max(time.time() - t0, 1e-6):.1f}/с", file=sys.stderr)
+    if not args.quiet:
+        print(f"Готово: {n} новых резюме за {time.time() - t0:.1f}с → {args.out} (job {job.id})", file=sys.stderr)
+    return 0
+
+
+def cmd_batch(args) -> int:
+    jd_text = read_any(args.jd, filename=args.jd)
+    if not jd_text.strip():
+        print(f"[ERROR] пустой JD: {args.jd}", file=sys.stderr)
+        return 2
+    if args.hide_pii:
+        jd_text = anonymize(jd_text)
+
+    job = BatchJob.create(jd_text, args.sources, hide_pii=args.hide_pii,
+                          dedup=not args.no_dedup, dedup_threshold=args.dup_threshold)
+    return _run_job(job, args)
+
+
+def cmd_jobs_list(args) -> int:
+    for m in list_jobs():
+        print(f"{m['id']}\t{m.get('status', '?')}\t{m.get('done', 0)}\t{', '.join(m.get('sources', []))}")
+    return 0
+
+
+def _load_job(job_id: str) -> Optional[BatchJob]:
+    try:
+        return BatchJob.load(job_id)
+    except FileNotFoundError:
+        print(f"[ERROR] задача не найдена: {job_id}", file=sys.stderr)
+        return None
+
+
+def cmd_jobs_resume(args) -> int:
+    job = _load_job(args.job_id)
+    if job is None:
+        return 2
+    return _run_job(job, args)
+
+
+def cmd_jobs_fetch(args) -> int:
+    job = _load_job(args.job_id)
+    if job is None:
+        return 2
+    job.export(args.out, args.format or guess_format(args.out), top=args.top)
+    return 0
+
+
+def cmd_stub_llm(args) -> int:
+    from .utils.stub_llm import StubConfig, StubServer
+
+    cfg = StubConfig(ttft=args.ttft, token_rate=args.rate, tokens=args.tokens, content=args.content,
+                     error_rate=args.errors, error_status=args.error_status, load_secs=args.load,
+                     models=tuple(args.model or ["mistral"]), seed=args.seed)
+    srv = StubServer(cfg, args.host, args.port)
+    print(f"stub-llm: {srv.url} (Ollama) · {srv.url}/v1 (OpenAI)", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="skillpilot", description="SkillPilot CLI")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("batch", help="скоринг пачки резюме против одного JD")
+    b.add_argument("sources", nargs="+", help="директория, ZIP или glob-шаблон (можно несколько)")
+    b.add_argument("--jd", required=True, help="файл вакансии (txt/md/pdf/docx)")
+    b.add_argument("--out", default="-", help="файл результата (.jsonl/.csv) или '-' для stdout")
+    b.add_argument("--format", choices=["jsonl", "csv"], help="формат вывода (по умолчанию — по расширению)")
+    b.add_argument("--workers", type=int, default=BATCH_WORKERS, help="число параллельных воркеров скоринга")
+    b.add_argument("--hide-pii", action="store_true", help="анонимизировать JD и резюме перед скорингом")
+    b.add_argument("--no-dedup", action="store_true", help="не искать почти-дубли (MinHash/LSH)")
+    b.add_argument("--dup-threshold", type=float, default=DEDUP_THRESHOLD,
+                   help=f"порог сходства для почти-дублей (по умолчанию {DEDUP_THRESHOLD})")
+    b.add_argument("-q", "--quiet", action="store_true", help="без прогресса в stderr")
+    b.set_defaults(func=cmd_batch)
+
+    j = sub.add_parser("jobs", help="пакетные задачи: список / продолжить / выгрузить")
+    jsub = j.add_subparsers(dest="jobs_cmd", required=True)
+    jsub.add_parser("list", help="список задач").set_defaults(func=cmd_jobs_list)
+
+    r = jsub.add_parser("resume", help="досчитать задачу (пропускает готовые резюме)")
+    r.add_argument("job_id")
+    r.add_argument("--out", default="-", help="куда писать НОВЫЕ строки (.jsonl/.csv или '-')")
+    r.add_argument("--format", choices=["jsonl", "csv"])
+    r.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    r.add_argument("-q", "--quiet", action="store_true")
+    r.set_defaults(func=cmd_jobs_resume)
+
+    f = jsub.add_parser("fetch", help="выгрузить все результаты задачи (по убыванию score)")
+    f.add_argument("job_id")
+    f.add_argument("--out", default="-")
+    f.add_argument("--format", choices=["jsonl", "csv"])
+    f.add_argument("--top", type=int, help="только K лучших без дублей (LIMIT по индексу ранжирования)")
+    f.set_defaults(func=cmd_jobs_fetch)
+
+    s = sub.add_parser("stub-llm", help="заглушка Ollama/OpenAI с настраиваемой задержкой и ошибками")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=11434)
+    s.add_argument("--ttft", type=float, default=0.2, help="секунд до первого токена")
+    s.add_argument("--rate", type=float, default=30.0, help="токенов/с (0 — ответ сразу)")
+    s.add_argument("--tokens", type=int, default=60, help="длина ответа в токенах")
+    s.add_argument("--content", help="фиксированный текст ответа")
+    s.add_argument("--errors", type=float, default=0.0, help="доля запросов с ошибкой (0..1)")
+    s.add_argument("--error-status", type=int, default=500)
+    s.add_argument("--load", type=float, default=0.0, help="секунд холодной загрузки модели")
+    s.add_argument("--model", action="append", default=None, help="имя модели (можно несколько)")
+    s.add_argument("--seed", type=int, default=0)
+    s.set_defaults(func=cmd_stub_llm)
+    return p
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,67 @@ LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama").strip().lower()
 
 # Ollama
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://ollama:11434").rstrip("/")
+# Несколько узлов через запятую; по умолчанию — один OLLAMA_HOST
+OLLAMA_HOSTS = [h.strip().rstrip("/") for h in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if h.strip()]
+OLLAMA_EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", "2"))         # неудач подряд до исключения узла
+OLLAMA_EJECT_SECS = float(os.getenv("OLLAMA_EJECT_SECS", "30"))        # секунд вне ротации
+OLLAMA_AFFINITY_SLACK = int(os.getenv("OLLAMA_AFFINITY_SLACK", "2"))   # на сколько «тёплый» узел может быть загруженнее
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+# Быстрая модель для коротких задач (вопросы, STAR, план) и для разгрузки при длинной очереди; "" — всё на OLLAMA_MODEL
+OLLAMA_FAST_MODEL = os.getenv("OLLAMA_FAST_MODEL", "").strip()
 # новые настройки
 OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "600"))          # секунд
 OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "15m")         # не выгружать модель
+# Прогрев модели при старте и продление keep_alive до истечения — в рабочие часы ("8-20", "" — всегда)
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1").strip().lower() in ("1", "true", "yes", "on")
+OLLAMA_WARM_HOURS = os.getenv("OLLAMA_WARM_HOURS", "8-20").strip()
+OLLAMA_KEEPALIVE_CHECK = float(os.getenv("OLLAMA_KEEPALIVE_CHECK", "60"))   # секунд между проверками
 OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+# num_ctx по размеру запроса: наименьшая «корзина», куда влезают промпт и ответ.
+# Корзин немного — смена num_ctx заставляет Ollama перезагрузить модель. 0 — всегда OLLAMA_NUM_CTX
+OLLAMA_ADAPTIVE_CTX = os.getenv("OLLAMA_ADAPTIVE_CTX", "1").strip().lower() in ("1", "true", "yes", "on")
+OLLAMA_CTX_BUCKETS = sorted({int(x) for x in os.getenv("OLLAMA_CTX_BUCKETS", "2048,4096,8192").split(",") if x.strip()})
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "8"))        # keep-alive соединений в пуле
+OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", "15"))   # секунд; фоновый probe с тем же периодом
+OLLAMA_STREAM_IDLE_TIMEOUT = float(os.getenv("OLLAMA_STREAM_IDLE_TIMEOUT", "180"))  # секунд тишины в стриме
 
 # OpenAI (опционально)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Сколько генераций одновременно шлём в LLM (равно OLLAMA_NUM_PARALLEL сервера Ollama)
+LLM_PARALLEL = max(1, int(os.getenv("LLM_PARALLEL", os.getenv("OLLAMA_NUM_PARALLEL", "2"))))
+# Очередь к LLM: сверх этого — мгновенный ответ «занято, позиция N»
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "120"))   # секунд ожидания слота
+
+# Телеметрия вызовов Ollama (TTFT, токены/с, prefill, холодная загрузка): последние N в памяти
+LLM_TELEMETRY_MAX = int(os.getenv("LLM_TELEMETRY_MAX", "500"))
+LLM_COLD_LOAD_MS = float(os.getenv("LLM_COLD_LOAD_MS", "1000"))   # load_duration больше — модель грузилась
+
+# Кэш ответов LLM (opt-in): повторный запрос с тем же промптом отдаётся с диска
+LLM_CACHE = os.getenv("LLM_CACHE", "0").strip().lower() in ("1", "true", "yes", "on")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))   # секунд; 0 — без срока
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_MAX_TEMP = float(os.getenv("LLM_CACHE_MAX_TEMP", "0.5"))     # выше — всегда свежая генерация
+
+# Вопросы к интервью кэшируются по хэшу JD (и резюме) независимо от LLM_CACHE
+QUESTIONS_CACHE = os.getenv("QUESTIONS_CACHE", "1").strip().lower() in ("1", "true", "yes", "on")
+
+# Сжатие промптов генерации: в LLM идут самые релевантные JD куски резюме в пределах бюджета
+PROMPT_COMPACT = os.getenv("PROMPT_COMPACT", "1").strip().lower() in ("1", "true", "yes", "on")
+PROMPT_RESUME_BUDGET = int(os.getenv("PROMPT_RESUME_BUDGET", "1200"))   # токенов (оценка)
+PROMPT_JD_BUDGET = int(os.getenv("PROMPT_JD_BUDGET", "700"))
+
+# Map-reduce для длинных резюме: факты по разделам параллельно, затем короткий итоговый промпт
+MAPREDUCE_MIN_TOKENS = int(os.getenv("MAPREDUCE_MIN_TOKENS", "2500"))   # длиннее — map-reduce вместо сжатия
+MAP_CHUNK_TOKENS = int(os.getenv("MAP_CHUNK_TOKENS", "800"))
+MAPREDUCE_TIMEOUT = float(os.getenv("MAPREDUCE_TIMEOUT", "120"))        # секунд на всю map-фазу
+
 # Embeddings
 EMB_MODEL = os.getenv("EMB_MODEL", "all-MiniLM-L6-v2")
+
+# Пакетный скоринг (UI/CLI)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))
+# Фоновые генерации для топ-N пакетной задачи: сколько генераций одновременно (priority=background)
+GEN_JOB_PARALLEL = max(1, int(os.getenv("GEN_JOB_PARALLEL", "1")))
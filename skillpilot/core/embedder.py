@@ -1,5 +1,6 @@
 import os
 import io
+import re
 import json
 import hashlib
 import shelve
@@ -20,6 +21,12 @@ CACHE_DIR = os.getenv("SKILLPILOT_CACHE_DIR", os.path.expanduser("~/.cache/skill
 os.makedirs(CACHE_DIR, exist_ok=True)
 CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.db")
 
+# EMB_MODEL=fake[:dim] — детерминированный эмбеддер без модели (хэширование слов и триграмм):
+# для офлайн-прогонов и нагрузочных тестов вместе с utils/stub_llm
+FAKE_PREFIX = "fake"
+_FAKE_DIM = 384
+_WORD = re.compile(r"[0-9A-Za-zА-Яа-яЁё+#]+")
+
 # Версионирование формата кэша (на случай будущих изменений)
 CACHE_SCHEMA_VER = "v2"  # v2 = per-item, npy-bytes float32
 
@@ -35,6 +42,25 @@ def _get(model_name: str | None = None) -> SentenceTransformer:
     return _MODEL
 
 
+def _fake_embed(items: Sequence[str], model_name: str) -> np.ndarray:
+    """Хэширующий эмбеддер: общие слова и триграммы дают близкие векторы; результат зависит только от текста."""
+    _, _, dim = model_name.partition(":")
+    dim = int(dim) if dim.isdigit() else _FAKE_DIM
+    out = np.zeros((len(items), dim), dtype=np.float32)
+    for i, text in enumerate(items):
+        for w in _WORD.findall((text or "").lower()):
+            feats = [w] + [w[j:j + 3] for j in range(max(0, len(w) - 2))]
+            for f in feats:
+                h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+                out[i, h % dim] += 1.0 if (h >> 63) == 0 else -1.0
+        norm = np.linalg.norm(out[i])
+        if norm > 0:
+            out[i] /= norm
+        else:
+            out[i, 0] = 1.0
+    return out
+
+
 def _key_item(text: str, model_name: str) -> str:
     """Ключ кэша на один текст (лучше для повторного использования)."""
     payload = {"ver": CACHE_SCHEMA_VER, "m": model_name, "t": text}
@@ -76,7 +102,7 @@ def embed(
     Поведение:
       • Один раз открывает shelve и читает все совпадения.
       • Считает только «промахи» батчем и дописывает в кэш.
-      • Потокобезопасная запись (глобальный _DB_LOCK).
+      • Потокобезопасные чтение/запись (глобальный _DB_LOCK).
     """
     model_name = name or EMB_MODEL
 
@@ -89,6 +115,8 @@ def embed(
     n = len(items)
     if n == 0:
         return np.empty((0, 0), dtype=np.float32)
+    if model_name.split(":")[0] == FAKE_PREFIX:
+        return _fake_embed(items, model_name)
 
     # попытка загрузить из кэша
     keys = [_key_item(t or "", model_name) for t in items]
@@ -96,7 +124,9 @@ def embed(
     missing_idx: list[int] = []
     missing_texts: list[str] = []
 
-    with _shelve_open() as db:
+    # чтение тоже под lock: dbm (особенно dbm.dumb) не переживает
+    # параллельное открытие из нескольких потоков батча
+    with _DB_LOCK, _shelve_open() as db:
         for i, k in enumerate(keys):
             raw = db.get(k)
             if isinstance(raw, (bytes, bytearray)):
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
 import re
 from sklearn.metrics.pairwise import cosine_similarity
 from .extractor import extract_keywords, detect_lang
@@ -102,17 +102,22 @@ def _extract_critical_terms(jd_text: str, jd_terms_raw: List[str]) -> List[str]:
     return out
 
 
-def score_fit(jd: str, resume: str) -> Tuple[int, List[str], List[str], str]:
+def score_breakdown(jd: str, resume: str) -> Dict[str, Any]:
     """
-    Возвращает:
-      - score: 0..100
-      - strengths: пересечение навыков резюме с JD
-      - gaps: навыки из JD, которых нет в резюме
-      - msg: диагностическая строка (semantic/jaccard + coverage)
+    Полный разбор скоринга одной пары JD↔резюме (для батча/CLI/экспорта).
+
+    Ключи: score, strengths, gaps, semantic, overlap, penalty,
+    critical, missing_critical, coverage, lang, jd_terms, cv_terms, msg.
     """
     # Ранние проверки
     if not jd.strip() or not resume.strip():
-        return 0, [], [], "Нет данных для оценки (пустой JD или резюме)."
+        return {
+            "score": 0, "strengths": [], "gaps": [],
+            "semantic": 0.0, "overlap": 0.0, "penalty": 0.0,
+            "critical": [], "missing_critical": [], "coverage": [],
+            "lang": detect_lang(jd), "jd_terms": 0, "cv_terms": 0,
+            "msg": "Нет данных для оценки (пустой JD или резюме).",
+        }
 
     # 1) извлекаем ключевые слова
     jd_kw_raw = extract_keywords(jd, 25)
@@ -180,4 +185,24 @@ def score_fit(jd: str, resume: str) -> Tuple[int, List[str], List[str], str]:
         + (f"\nCoverage: {', '.join(coverage_marks)}" if coverage_marks else "")
     )
 
-    return score, strengths, gaps, msg
+    return {
+        "score": score, "strengths": strengths, "gaps": gaps,
+        "semantic": round(sem, 4), "overlap": round(jac, 4), "penalty": round(penalty, 4),
+        "critical": [pretty_map.get(t, t) for t in crit_norm],
+        "missing_critical": [pretty_map.get(t, t) for t in missing_crit],
+        "coverage": coverage_marks,
+        "lang": lang, "jd_terms": len(jd_norm), "cv_terms": len(cv_norm),
+        "msg": msg,
+    }
+
+
+def score_fit(jd: str, resume: str) -> Tuple[int, List[str], List[str], str]:
+    """
+    Возвращает:
+      - score: 0..100
+      - strengths: пересечение навыков резюме с JD
+      - gaps: навыки из JD, которых нет в резюме
+      - msg: диагностическая строка (semantic/jaccard + coverage)
+    """
+    d = score_breakdown(jd, resume)
+    return d["score"], d["strengths"], d["gaps"], d["msg"]
@@ -0,0 +1,57 @@
+# skillpilot/gen/cancel.py
+"""
+Токен отмены генерации: UI создаёт токен на запуск, кнопка «Стоп» вызывает cancel(),
+а HTTP-слой (llm_ollama) по колбэку закрывает сокет — Ollama видит разрыв и прекращает генерацию.
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+CANCELLED_TEXT = "[CANCELLED]"
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def register(self, fn: Callable[[], None]) -> Optional[int]:
+        """Колбэк на отмену; если токен уже отменён — вызывается сразу. Возвращает id для unregister()."""
+        with self._lock:
+            if not self._event.is_set():
+                self._next += 1
+                self._callbacks[self._next] = fn
+                return self._next
+        try:
+            fn()
+        except Exception:
+            pass
+        return None
+
+    def unregister(self, handle: Optional[int]) -> None:
+        if handle is None:
+            return
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+    def wait(self, timeout: float) -> bool:
+        """Пауза (например, между ретраями), прерываемая отменой. True — если отменили."""
+        return self._event.wait(timeout)
@@ -0,0 +1,159 @@
+# skillpilot/gen/compact.py
+"""
+Сжатие входов промпта по релевантности: резюме и JD режутся на строки/предложения,
+ранжируются эмбеддером (core.embedder) и в промпт идут только самые релевантные куски —
+в исходном порядке и в пределах бюджета токенов. На CPU prefill длинного промпта
+занимает большую часть времени ответа, а всё, что не влезло в OLLAMA_NUM_CTX,
+Ollama молча обрезает.
+
+Если эмбеддер недоступен (нет модели/офлайн) — ранжирование по пересечению слов.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import PROMPT_COMPACT, PROMPT_RESUME_BUDGET, PROMPT_JD_BUDGET
+from ..core.embedder import embed
+from .llm import estimate_tokens
+
+_WORD = re.compile(r"[0-9A-Za-zА-Яа-яЁё+#]+")
+_SENT = re.compile(r"(?<=[.!?;])\s+(?=\S)")
+_BULLET = re.compile(r"^\s*(?:[\-\*•–]|\d+[.)])\s+")
+
+_GAP = "…"
+
+_STATS = {"calls": 0, "compacted": 0, "tokens_in": 0, "tokens_out": 0}
+_STATS_LOCK = threading.Lock()
+
+
+@dataclass
+class Compacted:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    kept: int
+    dropped: int
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def split_units(text: str) -> List[str]:
+    """Строки (буллеты, заголовки секций), длинные строки — ещё и на предложения."""
+    units: List[str] = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _BULLET.match(line) or len(line) < 160:
+            units.append(line)
+        else:
+            units.extend(s.strip() for s in _SENT.split(line) if s.strip())
+    return units
+
+
+def is_heading(unit: str) -> bool:
+    # «Опыт работы:», «SKILLS» — дёшевы и держат структуру, их не выбрасываем
+    return len(unit) <= 40 and (unit.endswith(":") or (unit.isupper() and len(unit) > 2))
+
+
+def _lexical_scores(units: Sequence[str], query: str) -> np.ndarray:
+    q = {w.lower() for w in _WORD.findall(query)}
+    out = []
+    for u in units:
+        words = {w.lower() for w in _WORD.findall(u)}
+        out.append(len(words & q) / (len(words) ** 0.5) if words else 0.0)
+    return np.asarray(out, dtype=np.float32)
+
+
+def _scores(units: Sequence[str], query: str,
+            embed_fn: Optional[Callable] = embed) -> np.ndarray:
+    if embed_fn is None:
+        return _lexical_scores(units, query)
+    try:
+        M = embed_fn(list(units) + [query])
+        return M[:-1] @ M[-1]   # векторы L2-нормированы — скалярное произведение = косинус
+    except Exception:
+        return _lexical_scores(units, query)
+
+
+def compact(text: str, query: str, budget: int, embed_fn: Optional[Callable] = embed) -> Compacted:
+    """
+    Оставляет самые релевантные query куски text в пределах budget токенов.
+    Первый кусок (обычно имя/должность) и короткие заголовки секций сохраняются всегда;
+    на месте выброшенных фрагментов ставится «…». embed_fn=None — только лексический скоринг
+    (без эмбеддера, за миллисекунды).
+    """
+    before = estimate_tokens(text)
+    units = split_units(text)
+    if before <= budget or len(units) < 2 or not (query or "").strip():
+        return _record(Compacted(text, before, before, len(units), 0))
+
+    sizes = [estimate_tokens(u) for u in units]
+    keep = [False] * len(units)
+    used = 0
+    for i, u in enumerate(units):
+        if i == 0 or is_heading(u):
+            keep[i] = True
+            used += sizes[i]
+
+    scores = _scores(units, query, embed_fn)
+    for i in np.argsort(-scores, kind="stable"):
+        if keep[i]:
+            continue
+        if used + sizes[i] > budget:
+            continue   # длинный кусок не влез — может влезть следующий, покороче
+        keep[i] = True
+        used += sizes[i]
+
+    lines, gap = [], False
+    for u, k in zip(units, keep):
+        if k:
+            lines.append(u)
+            gap = False
+        elif not gap:
+            lines.append(_GAP)
+            gap = True
+    out = "\n".join(lines)
+    kept = sum(keep)
+    return _record(Compacted(out, before, estimate_tokens(out), kept, len(units) - kept))
+
+
+def _record(c: Compacted) -> Compacted:
+    with _STATS_LOCK:
+        _STATS["calls"] += 1
+        _STATS["compacted"] += int(c.dropped > 0)
+        _STATS["tokens_in"] += c.tokens_before
+        _STATS["tokens_out"] += c.tokens_after
+    return c
+
+
+def compact_inputs(resume: str, jd: str,
+                   resume_budget: Optional[int] = None, jd_budget: Optional[int] = None):
+    """
+    Пара (резюме, JD) для промптов генерации. Резюме ранжируется по JD; JD — по самому себе
+    (уходят «О компании»/бонусы, требования остаются). PROMPT_COMPACT=0 — без изменений.
+    """
+    if not PROMPT_COMPACT:
+        return resume, jd
+    jd_c = compact(jd, jd, PROMPT_JD_BUDGET if jd_budget is None else jd_budget)
+    res_c = compact(resume, jd, PROMPT_RESUME_BUDGET if resume_budget is None else resume_budget)
+    return res_c.text, jd_c.text
+
+
+def compact_jd(jd: str, budget: Optional[int] = None) -> str:
+    if not PROMPT_COMPACT:
+        return jd
+    return compact(jd, jd, PROMPT_JD_BUDGET if budget is None else budget).text
+
+
+def stats() -> dict:
+    """Сколько токенов промптов сэкономлено с момента запуска."""
+    with _STATS_LOCK:
+        s = dict(_STATS)
+    s["tokens_saved"] = s["tokens_in"] - s["tokens_out"]
+    return s
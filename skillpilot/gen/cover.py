@@ -1,11 +1,9 @@
-from .llm import llm
-
-def make_cover(resume: str, jd: str):
-    system = (
-        "Ты копирайтер по карьерным письмам. Всегда отвечай НА РУССКОМ ЯЗЫКЕ. "
-        "Тон: профессиональный и дружелюбный. 170–220 слов. Без воды и штампов."
-    )
-    prompt = f"""Сгенерируй сопроводительное письмо под вакансию на РУССКОМ.
+from .llm import llm, llm_stream
+from .docsession import doc_session
+from .mapreduce import reduce_input
+
+COVER_TASK = """Сгенерируй сопроводительное письмо под вакансию на РУССКОМ как копирайтер по карьерным письмам.
+Тон: профессиональный и дружелюбный, без воды и штампов.
 Требования:
 - 170–220 слов.
 - Сошлись на 3–4 конкретных совпадения с JD.
@@ -13,17 +11,26 @@ def make_cover(resume: str, jd: str):
 - НЕ используй знак % и слова "процент/процентов". Вместо этого пиши абсолютные числа, сроки, масштабы
   (например: "ускорил сбор данных в 1.5 раза", "сократил время на 3 часа", "обработал 2 млн строк"),
   либо качественные формулировки без процентов.
-- Не используй квадратные скобки и плейсхолдеры. Текст цельный, без подзаголовков.
-
-Резюме:
-{resume}
-
-Вакансия (JD):
-{jd}
+- Текст цельный, без подзаголовков.
 
 Структура письма:
 1) Короткое вступление: мотивация + 1–2 совпадения с JD.
 2) Абзац с кейсом из опыта и измеримым результатом (без процентов).
 3) Почему подойду компании + готовность обсудить детали.
 """
-    return llm(system, prompt, max_tokens=700)
+
+
+def _cover_prompt(resume: str, jd: str):
+    doc = doc_session(resume, jd)
+    return (doc, *doc.prompt(COVER_TASK))
+
+
+def make_cover(resume: str, jd: str, **llm_kw):
+    doc, system, prompt = _cover_prompt(reduce_input(resume, jd, **llm_kw), jd)
+    return llm(system, prompt, task="cover", doc=doc, **llm_kw)
+
+
+def make_cover_stream(resume: str, jd: str, **llm_kw):
+    """Стриминговая версия make_cover: куски текста по мере генерации."""
+    doc, system, prompt = _cover_prompt(reduce_input(resume, jd, **llm_kw), jd)
+    yield from llm_stream(system, prompt, task="cover", doc=doc, **llm_kw)
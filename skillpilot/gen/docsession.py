@@ -0,0 +1,100 @@
+# skillpilot/gen/docsession.py
+"""
+Сессия документа: все генерации для одной пары резюме/JD (адаптированное резюме,
+сопроводительное, вопросы) строятся с одинаковым началом промпта —
+system + резюме + JD — и различаются только хвостом «ЗАДАНИЕ: …».
+
+Ollama держит KV-кэш последнего промпта в слоте и при совпадающем префиксе считает
+заново только хвост. Чтобы кэш не терялся, сессия закрепляет модель (все задачи сессии
+идут на неё, мимо route_model), num_ctx (смена num_ctx перезагружает модель) и узел пула
+(affinity), а keep_alive уже задан OLLAMA_KEEP_ALIVE.
+Счётчики prompt_eval_count из ответов Ollama показывают, сколько токенов реально
+считалось на каждом вызове: на 2-м и следующих вызовах — только задание.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from ..config import OLLAMA_MODEL
+from .compact import compact_inputs
+from .llm import TASK_PROFILES, DEFAULT_MAX_TOKENS, context_size, estimate_tokens
+
+DOC_SYSTEM = (
+    "Ты карьерный консультант и редактор. Всегда отвечай НА РУССКОМ ЯЗЫКЕ. "
+    "Пиши кратко и предметно, без квадратных скобок и шаблонных заглушек."
+)
+
+# запас под текст задания в хвосте промпта
+_TASK_RESERVE = 320
+_CHAT_OVERHEAD = 32
+_MIN_PREDICT = 128
+
+_SESSIONS_MAX = 64
+_SESSIONS: "OrderedDict[str, DocSession]" = OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+class DocSession:
+    def __init__(self, resume: str, jd: str):
+        self.resume, self.jd = compact_inputs(resume or "", jd or "")
+        self.system = DOC_SYSTEM
+        self.prefix = f"Резюме кандидата:\n{self.resume}\n\nВакансия (JD):\n{self.jd}\n\nЗАДАНИЕ:\n"
+        self.model = OLLAMA_MODEL
+        self.key = hashlib.sha1(
+            f"{self.model}\x00{self.system}\x00{self.prefix}".encode("utf-8")
+        ).hexdigest()[:16]
+        max_tokens = max([DEFAULT_MAX_TOKENS] + [p.get("max_tokens", 0) for p in TASK_PROFILES.values()])
+        # один num_ctx на все задачи сессии — иначе Ollama перезагрузит модель и кэш пропадёт
+        self.num_ctx = context_size(self.system, self.prefix, max_tokens + _TASK_RESERVE)[0]
+        self.prefix_tokens = estimate_tokens(self.system) + estimate_tokens(self.prefix)
+        self._lock = threading.Lock()
+        self.calls: List[dict] = []
+
+    def prompt(self, task: str) -> Tuple[str, str]:
+        """(system, prompt) с общим префиксом; task — инструкция конкретной генерации."""
+        return self.system, self.prefix + task.strip() + "\n"
+
+    def context(self, system: str, prompt: str, max_tokens: int) -> Tuple[int, int]:
+        """Для llm(doc=…): закреплённый num_ctx, num_predict — сколько влезает."""
+        room = self.num_ctx - estimate_tokens(system) - estimate_tokens(prompt) - _CHAT_OVERHEAD
+        return self.num_ctx, max(_MIN_PREDICT, min(int(max_tokens), room))
+
+    def record(self, meta: dict) -> None:
+        """Колбэк on_done: счётчики Ollama по очередному вызову."""
+        with self._lock:
+            self.calls.append(dict(meta))
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = list(self.calls)
+        return {
+            "key": self.key,
+            "model": self.model,
+            "num_ctx": self.num_ctx,
+            "prefix_tokens": self.prefix_tokens,
+            "prefill_tokens": [c.get("prompt_eval_count", 0) for c in calls],
+            "prefill_ms": [round(c.get("prompt_eval_duration", 0) / 1e6) for c in calls],
+        }
+
+
+def doc_session(resume: str, jd: str) -> DocSession:
+    """Сессия для пары резюме/JD; повторные вызовы (другие кнопки UI) получают ту же."""
+    k = hashlib.sha1(f"{resume}\x00{jd}".encode("utf-8")).hexdigest()
+    with _SESSIONS_LOCK:
+        s = _SESSIONS.get(k)
+        if s is not None:
+            _SESSIONS.move_to_end(k)
+            return s
+    s = DocSession(resume, jd)  # compact_inputs может звать эмбеддер — вне lock
+    with _SESSIONS_LOCK:
+        s = _SESSIONS.setdefault(k, s)
+        _SESSIONS.move_to_end(k)
+        while len(_SESSIONS) > _SESSIONS_MAX:
+            _SESSIONS.popitem(last=False)
+    return s
+
+
+def last_session() -> "DocSession | None":
+    with _SESSIONS_LOCK:
+        return next(reversed(_SESSIONS.values()), None)
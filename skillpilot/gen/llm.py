@@ -1,8 +1,18 @@
 # skillpilot/gen/llm.py
 import os
-from typing import Optional, Generator, Iterable
+import re
+import threading
+import time
+from typing import Optional, Generator, Iterable, Tuple
 
-from ..config import LLM_BACKEND, OPENAI_API_KEY, OPENAI_MODEL
+from ..config import (
+    LLM_BACKEND, OPENAI_API_KEY, OPENAI_MODEL, OLLAMA_MODEL, OLLAMA_FAST_MODEL, LLM_CACHE,
+    OLLAMA_NUM_CTX, OLLAMA_ADAPTIVE_CTX, OLLAMA_CTX_BUCKETS,
+)
+from .cancel import CancelToken, CANCELLED_TEXT
+from . import llm_cache
+from .singleflight import SingleFlight
+from .scheduler import SCHEDULER, Busy
 from .llm_ollama import (
     chat as ollama_chat,
     chat_stream as ollama_chat_stream,
@@ -14,13 +24,172 @@ def _norm(s: Optional[str]) -> str:
     return "" if s is None else str(s)
 
 
+def _backend() -> str:
+    return (LLM_BACKEND or "offline").strip().lower()
+
+
+# ---------- профили задач и размер контекста ----------
+# Параметры генерации по задаче; явные аргументы llm()/llm_stream() важнее профиля.
+# stop обрывает генерацию сразу после нужного объёма (не ждём num_predict).
+# model — "main" (OLLAMA_MODEL) или "fast" (OLLAMA_FAST_MODEL), budget — целевая задержка, сек
+# (см. route_model).
+DEFAULT_TEMPERATURE = 0.25
+DEFAULT_MAX_TOKENS = 800
+
+TASK_PROFILES = {
+    "tailor":    {"max_tokens": 900, "model": "main", "budget": 90},
+    "cover":     {"max_tokens": 700, "model": "main", "budget": 60},
+    "plan":      {"max_tokens": 600, "stop": ["\nДень 8", "\n8 |"], "model": "fast", "budget": 30},
+    "questions": {"max_tokens": 400, "model": "fast", "budget": 15},
+    "grade":     {"max_tokens": 400, "model": "main", "budget": 30},
+    "star":      {"max_tokens": 400, "temperature": 0.4, "model": "fast", "budget": 20},
+    "extract":   {"max_tokens": 250, "temperature": 0.1, "model": "fast", "budget": 15},
+}
+
+_CYR = re.compile(r"[А-Яа-яЁё]")
+_CHAT_OVERHEAD = 32   # служебные токены шаблона чата (роли, разделители)
+_MIN_PREDICT = 128
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Грубая оценка токенов без токенизатора: кириллица ≈ 2.7 символа на токен,
+    латиница/цифры ≈ 4 (типично для BPE-словарей Llama/Mistral).
+    """
+    if not text:
+        return 0
+    cyr = len(_CYR.findall(text))
+    return max(1, round(cyr / 2.7 + (len(text) - cyr) / 4))
+
+
+def _resolve(task, temperature, max_tokens, top_p, stop):
+    prof = TASK_PROFILES.get(task or "", {})
+    return (
+        float(prof.get("temperature", DEFAULT_TEMPERATURE) if temperature is None else temperature),
+        int(prof.get("max_tokens", DEFAULT_MAX_TOKENS) if max_tokens is None else max_tokens),
+        prof.get("top_p") if top_p is None else top_p,
+        prof.get("stop") if stop is None else stop,
+    )
+
+
+def context_size(system: Optional[str], prompt: Optional[str], max_tokens: int) -> Tuple[int, int]:
+    """
+    (num_ctx, num_predict) для Ollama: наименьшая корзина OLLAMA_CTX_BUCKETS, в которую
+    влезают промпт и ответ. Если не влезает и в самую большую — урезаем num_predict,
+    чтобы Ollama не обрезала сам промпт.
+    """
+    if not OLLAMA_ADAPTIVE_CTX or not OLLAMA_CTX_BUCKETS:
+        return int(OLLAMA_NUM_CTX), int(max_tokens)
+    prompt_tokens = estimate_tokens(system) + estimate_tokens(prompt) + _CHAT_OVERHEAD
+    need = prompt_tokens + int(max_tokens)
+    for bucket in OLLAMA_CTX_BUCKETS:
+        if need <= bucket:
+            return bucket, int(max_tokens)
+    top = OLLAMA_CTX_BUCKETS[-1]
+    return top, max(_MIN_PREDICT, min(int(max_tokens), top - prompt_tokens))
+
+
+# ---------- маршрутизация задач по моделям ----------
+# Короткие задачи всегда идут на быструю модель. Задачи "main" уходят на быструю, только
+# если ожидаемое время (очередь + типичная длительность этой задачи на основной модели)
+# не укладывается в budget. Типичная длительность — EWMA по завершённым вызовам.
+# Работает только для Ollama; без OLLAMA_FAST_MODEL всё идёт на OLLAMA_MODEL.
+_EWMA_ALPHA = 0.3
+_LATENCY: dict = {}          # (task, model) -> EWMA длительности вызова, сек
+_ROUTED: dict = {}           # (task, model) -> сколько вызовов ушло на модель
+_ROUTE_LOCK = threading.Lock()
+
+
+def _observe(task: Optional[str], model: str, seconds: float) -> None:
+    k = (task or "", model)
+    with _ROUTE_LOCK:
+        prev = _LATENCY.get(k)
+        _LATENCY[k] = seconds if prev is None else prev + _EWMA_ALPHA * (seconds - prev)
+
+
+def expected_latency(task: Optional[str], model: str = OLLAMA_MODEL) -> float:
+    """Ожидаемое время ответа: ожидание в очереди SCHEDULER + EWMA задачи на модели (0 — нет данных)."""
+    with _ROUTE_LOCK:
+        own = _LATENCY.get((task or "", model))
+        known = [v for (t, m), v in _LATENCY.items() if m == model]
+    if own is None:
+        return 0.0
+    q = SCHEDULER.stats()
+    avg = sum(known) / len(known)
+    # очередь впереди нас разбирается по slots запросов за avg секунд; все слоты заняты — ждём ещё один
+    ahead = q["queued"] + (1 if q["active"] >= q["slots"] else 0)
+    return ahead / max(1, q["slots"]) * avg + own
+
+
+def route_model(task: Optional[str]) -> str:
+    """
+    Модель Ollama для задачи по TASK_PROFILES[task]["model"/"budget"] и текущей очереди.
+    Вызывается, только если модель не задана явно (model=) и не закреплена сессией документа (doc=).
+    """
+    prof = TASK_PROFILES.get(task or "", {})
+    fast = OLLAMA_FAST_MODEL or OLLAMA_MODEL
+    if fast == OLLAMA_MODEL:
+        model = OLLAMA_MODEL
+    elif prof.get("model") == "fast":
+        model = fast
+    elif prof.get("budget") and expected_latency(task, OLLAMA_MODEL) > prof["budget"]:
+        model = fast   # очередь длинная — лучше быстрый ответ попроще, чем ответ после дедлайна
+    else:
+        model = OLLAMA_MODEL
+    return model
+
+
+def _count_routed(task: Optional[str], model: str) -> None:
+    with _ROUTE_LOCK:
+        k = (task or "", model)
+        _ROUTED[k] = _ROUTED.get(k, 0) + 1
+
+
+def _pick_model(task: Optional[str], model: Optional[str], doc) -> Tuple[Optional[str], bool]:
+    """
+    (модель, маршрутизирована ли): явная model= и модель сессии документа важнее route_model —
+    общий префикс DocSession должен считаться на одной модели, иначе KV-кэш не переиспользуется.
+    """
+    if _backend() != "ollama":
+        return None, False
+    if model:
+        return model, False
+    if doc is not None:
+        return getattr(doc, "model", None) or OLLAMA_MODEL, False
+    return route_model(task), True
+
+
+def routing_stats() -> dict:
+    """По задачам: куда ушли вызовы и EWMA длительности по моделям."""
+    with _ROUTE_LOCK:
+        out: dict = {}
+        for (task, model), n in _ROUTED.items():
+            out.setdefault(task or "-", {}).setdefault(model, {})["calls"] = n
+        for (task, model), sec in _LATENCY.items():
+            out.setdefault(task or "-", {}).setdefault(model, {})["latency"] = round(sec, 2)
+        return out
+
+
+_OPENAI_CLIENTS: dict = {}
+_OPENAI_LOCK = threading.Lock()
+
+
 def _openai_client():
     """
     Возвращает OpenAI-клиент с учётом кастомного BASE_URL (совместимые эндпоинты).
+    Клиент один на процесс (ключ — api_key/base_url/pid): его httpx-пул держит keep-alive.
     """
     base_url = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE")
-    from openai import OpenAI  # импорт тут, чтобы не тянуть либу без надобности
-    return OpenAI(api_key=OPENAI_API_KEY, base_url=base_url) if base_url else OpenAI(api_key=OPENAI_API_KEY)
+    key = (OPENAI_API_KEY, base_url, os.getpid())
+    client = _OPENAI_CLIENTS.get(key)
+    if client is None:
+        with _OPENAI_LOCK:
+            client = _OPENAI_CLIENTS.get(key)
+            if client is None:
+                from openai import OpenAI  # импорт тут, чтобы не тянуть либу без надобности
+                client = OpenAI(api_key=OPENAI_API_KEY, base_url=base_url) if base_url else OpenAI(api_key=OPENAI_API_KEY)
+                _OPENAI_CLIENTS[key] = client
+    return client
 
 
 def _extract_openai_chunk(event) -> Optional[str]:
@@ -74,7 +243,7 @@ def _extract_openai_chunk(event) -> Optional[str]:
     return None
 
 
-def llm(
+def _llm_call(
     system: Optional[str],
     prompt: Optional[str],
     temperature: float = 0.25,
@@ -82,30 +251,36 @@ def llm(
     *,
     top_p: Optional[float] = None,
     stop: Optional[Iterable[str]] = None,
+    model: Optional[str] = None,
+    task: Optional[str] = None,
+    fmt=None,
+    doc=None,
+    cancel: Optional[CancelToken] = None,
 ) -> str:
-    """
-    Унифицированный синхронный вызов LLM.
-
-    - backend=ollama  → локальная модель (напр., 'mistral') через .llm_ollama.chat
-    - backend=openai  → при наличии OPENAI_API_KEY/OPENAI_MODEL (+ поддержка совместимых BASE_URL)
-    - иначе           → OFFLINE-заглушка
-
-    Всегда возвращает str; сетевые ошибки инкапсулируются в текст.
-    """
+    """Вызов бэкенда без кэша (см. llm)."""
     system = _norm(system)
     prompt = _norm(prompt)
-    backend = (LLM_BACKEND or "offline").strip().lower()
+    backend = _backend()
 
     # ---- OLLAMA (локально)
     if backend == "ollama":
         if ollama_up():
             try:
-                # НЕ передаём top_p/stop — текущая обёртка их не принимает
+                num_ctx, num_predict = (doc.context if doc is not None else context_size)(system, prompt, max_tokens)
                 return ollama_chat(
                     system,
                     prompt,
                     temperature=float(temperature),
-                    max_tokens=int(max_tokens),
+                    max_tokens=num_predict,
+                    top_p=top_p,
+                    stop=stop,
+                    num_ctx=num_ctx,
+                    model=model,
+                    task=task,
+                    fmt=fmt,
+                    affinity=doc.key if doc is not None else None,
+                    on_done=doc.record if doc is not None else None,
+                    cancel=cancel,
                 )
             except Exception as e:
                 return f"[OLLAMA ERROR] {type(e).__name__}: {e}"
@@ -131,6 +306,8 @@ def llm(
             if stop:
                 kwargs["stop"] = list(stop)
 
+            if cancel is not None and cancel.cancelled:
+                return CANCELLED_TEXT
             resp = client.chat.completions.create(**kwargs)
             out = (resp.choices[0].message.content or "").strip()
             return out or "[LLM EMPTY]"
@@ -141,7 +318,7 @@ def llm(
     return f"[OFFLINE]\n{prompt[:500]}"
 
 
-def llm_stream(
+def _llm_stream_call(
     system: Optional[str],
     prompt: Optional[str],
     temperature: float = 0.25,
@@ -149,28 +326,34 @@ def llm_stream(
     *,
     top_p: Optional[float] = None,
     stop: Optional[Iterable[str]] = None,
+    model: Optional[str] = None,
+    task: Optional[str] = None,
+    doc=None,
+    cancel: Optional[CancelToken] = None,
 ) -> Generator[str, None, None]:
-    """
-    Стриминговый вызов LLM. Возвращает генератор, выдающий части ответа.
-
-    - Для Ollama — .llm_ollama.chat_stream(...)
-    - Для OpenAI — stream=True и отдаём delta-контент (устойчиво к разным форматам)
-    - В offline — единичный кусок с оффлайн-заглушкой
-    """
+    """Стрим бэкенда без кэша (см. llm_stream)."""
     system = _norm(system)
     prompt = _norm(prompt)
-    backend = (LLM_BACKEND or "offline").strip().lower()
+    backend = _backend()
 
     # ---- OLLAMA (локально)
     if backend == "ollama":
         if ollama_up():
             try:
-                # НЕ передаём top_p/stop — текущая обёртка их не принимает
+                num_ctx, num_predict = (doc.context if doc is not None else context_size)(system, prompt, max_tokens)
                 for chunk in ollama_chat_stream(
                     system,
                     prompt,
                     temperature=float(temperature),
-                    max_tokens=int(max_tokens),
+                    max_tokens=num_predict,
+                    top_p=top_p,
+                    stop=stop,
+                    num_ctx=num_ctx,
+                    model=model,
+                    task=task,
+                    affinity=doc.key if doc is not None else None,
+                    on_done=doc.record if doc is not None else None,
+                    cancel=cancel,
                 ):
                     if chunk:
                         yield chunk
@@ -203,16 +386,193 @@ def llm_stream(
             if stop:
                 kwargs["stop"] = list(stop)
 
+            if cancel is not None and cancel.cancelled:
+                return
             stream = client.chat.completions.create(**kwargs)
-
-            for event in stream:
-                chunk = _extract_openai_chunk(event)
-                if chunk:
-                    yield chunk
+            handle = cancel.register(stream.close) if cancel is not None else None
+            try:
+                for event in stream:
+                    if cancel is not None and cancel.cancelled:
+                        return
+                    chunk = _extract_openai_chunk(event)
+                    if chunk:
+                        yield chunk
+            finally:
+                if cancel is not None:
+                    cancel.unregister(handle)
+                stream.close()
             return
         except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return
             yield f"[LLM STREAM ERROR] {type(e).__name__}: {e}"
             return
 
     # ---- OFFLINE fallback
     yield f"[OFFLINE]\n{prompt[:500]}"
+
+
+def _model_id(backend: str, model: Optional[str] = None) -> str:
+    if backend == "ollama":
+        return model or OLLAMA_MODEL
+    if backend == "openai":
+        base_url = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE") or ""
+        return f"{(OPENAI_MODEL or '').strip() or 'gpt-4o-mini'}@{base_url}"
+    return ""
+
+
+def _request_key(system, prompt, temperature, max_tokens, top_p, stop, model=None, fmt=None) -> str:
+    """Идентичность запроса: ключ и для кэша ответов, и для single-flight."""
+    backend = _backend()
+    return llm_cache.cache_key(backend, _model_id(backend, model), _norm(system), _norm(prompt),
+                               temperature, max_tokens, top_p, stop, fmt)
+
+
+def _use_cache(temperature: float, cache: Optional[bool]) -> bool:
+    return bool(LLM_CACHE if cache is None else cache) and llm_cache.cacheable_params(temperature)
+
+
+# одинаковые одновременные запросы (двойной клик, два пользователя) делят один вызов модели
+_FLIGHTS = SingleFlight()
+
+
+def llm(
+    system: Optional[str],
+    prompt: Optional[str],
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    *,
+    task: Optional[str] = None,
+    top_p: Optional[float] = None,
+    stop: Optional[Iterable[str]] = None,
+    cancel: Optional[CancelToken] = None,
+    cache: Optional[bool] = None,
+    regenerate: bool = False,
+    priority: str = "interactive",
+    session: Optional[str] = None,
+    doc=None,
+    fmt=None,
+    model: Optional[str] = None,
+) -> str:
+    """
+    Унифицированный синхронный вызов LLM.
+
+    - backend=ollama  → локальная модель (напр., 'mistral') через .llm_ollama.chat
+    - backend=openai  → при наличии OPENAI_API_KEY/OPENAI_MODEL (+ поддержка совместимых BASE_URL)
+    - иначе           → OFFLINE-заглушка
+
+    Всегда возвращает str; сетевые ошибки инкапсулируются в текст.
+    cancel — токен отмены (кнопка «Стоп»): запрос к Ollama обрывается вместе с соединением.
+
+    Кэш ответов (LLM_CACHE=1 или cache=True): при temperature ≤ LLM_CACHE_MAX_TEMP повторный
+    запрос отдаётся с диска; regenerate=True идёт мимо кэша и перезаписывает запись.
+    Одинаковый запрос, уже выполняющийся в другом потоке, не дублируется — ждём его ответ.
+
+    Вызов модели идёт через SCHEDULER (priority: interactive|sandbox|background, session —
+    для честной очереди между пользователями); при перегрузке сразу возвращается «[BUSY] …».
+
+    task — профиль из TASK_PROFILES (max_tokens/temperature/stop); явные аргументы важнее.
+    Для Ollama num_ctx подбирается по размеру промпта (context_size), а модель — по задаче
+    и бюджету задержки (route_model), если не задана явно через model=.
+    doc — DocSession (gen.docsession): закреплённые модель, num_ctx и узел Ollama для промптов
+    с общим префиксом, учёт prefill-токенов; маршрутизация по задачам в сессии не работает.
+    fmt — структурированный ответ Ollama ("json" или JSON-схема); остальные бэкенды
+    получают только инструкцию в промпте, ответ всё равно надо разбирать устойчиво.
+    """
+    temperature, max_tokens, top_p, stop = _resolve(task, temperature, max_tokens, top_p, stop)
+    model, routed = _pick_model(task, model, doc)
+    key = _request_key(system, prompt, temperature, max_tokens, top_p, stop, model, fmt)
+    use_cache = _use_cache(temperature, cache)
+    if use_cache and not regenerate:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            return hit
+
+    def _upstream(token: CancelToken) -> str:
+        with SCHEDULER.slot(priority, session, token) as slot:
+            if not slot.granted:  # отменили, пока ждали в очереди
+                return CANCELLED_TEXT
+            t0 = time.monotonic()
+            if routed:
+                _count_routed(task, model)
+            out = _llm_call(system, prompt, temperature, max_tokens, top_p=top_p, stop=stop,
+                            model=model, task=task, fmt=fmt, doc=doc, cancel=token)
+            if model and not token.cancelled and not out.startswith("["):
+                _observe(task, model, time.monotonic() - t0)
+        if use_cache and not token.cancelled:
+            llm_cache.put(key, out)
+        return out
+
+    try:
+        out = _FLIGHTS.call("c:" + key, _upstream, cancel)
+    except Busy as e:
+        return e.text()
+    if cancel is not None and cancel.cancelled:
+        return CANCELLED_TEXT
+    return out
+
+
+def llm_stream(
+    system: Optional[str],
+    prompt: Optional[str],
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    *,
+    task: Optional[str] = None,
+    top_p: Optional[float] = None,
+    stop: Optional[Iterable[str]] = None,
+    cancel: Optional[CancelToken] = None,
+    cache: Optional[bool] = None,
+    regenerate: bool = False,
+    priority: str = "interactive",
+    session: Optional[str] = None,
+    doc=None,
+    model: Optional[str] = None,
+) -> Generator[str, None, None]:
+    """
+    Стриминговый вызов LLM. Возвращает генератор, выдающий части ответа.
+
+    - Для Ollama — .llm_ollama.chat_stream(...)
+    - Для OpenAI — stream=True и отдаём delta-контент (устойчиво к разным форматам)
+    - В offline — единичный кусок с оффлайн-заглушкой
+
+    После cancel.cancel() генератор тихо завершается, HTTP-соединение закрывается.
+    Кэш — как в llm(): попадание отдаётся одним куском, полный ответ сохраняется после стрима.
+    Одинаковые одновременные стримы читают один апстрим (single-flight, раздача всем подписчикам).
+    Очередь/приоритеты, профили и маршрутизация задач — как в llm(); при перегрузке — один кусок «[BUSY] …».
+    """
+    temperature, max_tokens, top_p, stop = _resolve(task, temperature, max_tokens, top_p, stop)
+    model, routed = _pick_model(task, model, doc)
+    key = _request_key(system, prompt, temperature, max_tokens, top_p, stop, model)
+    use_cache = _use_cache(temperature, cache)
+    if use_cache and not regenerate:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            yield hit
+            return
+
+    def _upstream(token: CancelToken):
+        parts = []
+        with SCHEDULER.slot(priority, session, token) as slot:
+            if not slot.granted:
+                return
+            if routed:
+                _count_routed(task, model)
+            t0 = time.monotonic()
+            for chunk in _llm_stream_call(system, prompt, temperature, max_tokens,
+                                          top_p=top_p, stop=stop, model=model, task=task, doc=doc,
+                                          cancel=token):
+                parts.append(chunk)
+                yield chunk
+            if model and not token.cancelled and parts and not parts[0].startswith("["):
+                _observe(task, model, time.monotonic() - t0)
+        # сюда доходим только при полном стриме
+        if use_cache and not token.cancelled:
+            text = "".join(parts)
+            if "STREAM ERROR]" not in text:
+                llm_cache.put(key, text)
+
+    try:
+        yield from _FLIGHTS.stream("s:" + key, _upstream, cancel)
+    except Busy as e:
+        yield e.text()
@@ -0,0 +1,128 @@
+# skillpilot/gen/llm_cache.py
+"""
+Дисковый кэш ответов LLM (opt-in: LLM_CACHE=1).
+
+Ключ — sha1 от (backend, model, system, prompt, temperature, max_tokens, top_p, stop, format).
+Хранилище — sqlite в CACHE_DIR рядом с кэшем эмбеддингов: в отличие от shelve/dbm.dumb
+оно переиспользует место удалённых записей, поэтому работают TTL и вытеснение по размеру
+(сначала давно не использованные записи).
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Iterable, Optional
+
+from ..config import LLM_CACHE_TTL, LLM_CACHE_MAX_MB, LLM_CACHE_MAX_TEMP
+
+CACHE_DIR = os.getenv("SKILLPILOT_CACHE_DIR", os.path.expanduser("~/.cache/skillpilot"))
+CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite")
+
+# ответы-ошибки и заглушки не кэшируем
+_NOT_CACHEABLE = ("[OLLAMA", "[LLM ", "[OFFLINE", "[CANCELLED", "[OPENAI", "[BUSY]")
+
+_LOCK = threading.Lock()
+_CONN: Optional[sqlite3.Connection] = None
+_PUTS = 0
+_EVICT_EVERY = 50  # вытеснение по размеру — раз в N записей, а не на каждой
+
+
+def _db() -> sqlite3.Connection:
+    global _CONN
+    if _CONN is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+        _CONN = conn
+    return _CONN
+
+
+def cache_key(backend: str, model: str, system: str, prompt: str, temperature: float,
+              max_tokens: int, top_p: Optional[float] = None,
+              stop: Optional[Iterable[str]] = None, fmt=None) -> str:
+    payload = {
+        "b": backend, "m": model, "s": system, "p": prompt,
+        "t": round(float(temperature), 3), "n": int(max_tokens),
+        "tp": None if top_p is None else round(float(top_p), 3),
+        "st": list(stop) if stop else None,
+    }
+    if fmt:   # без формата ключи прежние — старые записи кэша остаются валидными
+        payload["f"] = fmt
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cacheable_params(temperature: float) -> bool:
+    """При высокой температуре пользователь ждёт разнообразия — такие ответы не кэшируем."""
+    return float(temperature) <= LLM_CACHE_MAX_TEMP
+
+
+def cacheable_text(text: str) -> bool:
+    t = (text or "").strip()
+    return bool(t) and not t.startswith(_NOT_CACHEABLE)
+
+
+def get(key: str) -> Optional[str]:
+    now = time.time()
+    with _LOCK:
+        db = _db()
+        row = db.execute("SELECT text, created FROM responses WHERE key=?", (key,)).fetchone()
+        if row is None:
+            return None
+        if LLM_CACHE_TTL > 0 and now - row[1] > LLM_CACHE_TTL:
+            db.execute("DELETE FROM responses WHERE key=?", (key,))
+            return None
+        db.execute("UPDATE responses SET used=? WHERE key=?", (now, key))
+        return row[0]
+
+
+def put(key: str, text: str) -> None:
+    global _PUTS
+    if not cacheable_text(text):
+        return
+    now = time.time()
+    with _LOCK:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO responses(key, text, size, created, used) VALUES (?,?,?,?,?)",
+            (key, text, len(text.encode("utf-8")), now, now),
+        )
+        _PUTS += 1
+        if _PUTS % _EVICT_EVERY == 0:
+            _evict(db, now)
+
+
+def _evict(db: sqlite3.Connection, now: float) -> None:
+    if LLM_CACHE_TTL > 0:
+        db.execute("DELETE FROM responses WHERE created < ?", (now - LLM_CACHE_TTL,))
+    limit = int(LLM_CACHE_MAX_MB * 1024 * 1024)
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= limit:
+        return
+    # LRU: удаляем давно не использованные, пока не уложимся в 90% лимита
+    excess = total - int(limit * 0.9)
+    freed, doomed = 0, []
+    for key, size in db.execute("SELECT key, size FROM responses ORDER BY used"):
+        doomed.append((key,))
+        freed += size
+        if freed >= excess:
+            break
+    db.executemany("DELETE FROM responses WHERE key=?", doomed)
+
+
+def clear() -> None:
+    with _LOCK:
+        _db().execute("DELETE FROM responses")
+
+
+def stats() -> dict:
+    with _LOCK:
+        n, size = _db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+    return {"entries": n, "bytes": size, "path": CACHE_PATH}
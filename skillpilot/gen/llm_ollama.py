@@ -1,37 +1,345 @@
 # skillpilot/gen/llm_ollama.py
+import os
+import re
 import time
 import json
+import socket
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 import requests
-from typing import Generator, Optional, Iterable
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from typing import Callable, Generator, Optional, Iterable
 
 from ..config import (
-    OLLAMA_HOST, OLLAMA_MODEL,
-    OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE, OLLAMA_NUM_CTX
+    OLLAMA_HOSTS, OLLAMA_MODEL, OLLAMA_FAST_MODEL,
+    OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE, OLLAMA_NUM_CTX, OLLAMA_ADAPTIVE_CTX, OLLAMA_CTX_BUCKETS,
+    OLLAMA_WARMUP, OLLAMA_WARM_HOURS, OLLAMA_KEEPALIVE_CHECK,
+    OLLAMA_POOL_SIZE, OLLAMA_HEALTH_TTL, OLLAMA_STREAM_IDLE_TIMEOUT,
 )
+from .cancel import CancelToken, CANCELLED_TEXT
+from .ollama_pool import OllamaPool
+from . import telemetry
 
 UA = "skillpilot/ollama-client"
 _RETRIES = 3          # базовое число попыток для нестримовых вызовов
 _STREAM_RETRIES = 2   # число попыток для стрима
 
 
-def _url(path: str) -> str:
-    return f"{OLLAMA_HOST}{path}"
+# узлы Ollama: least-outstanding + аффинити по загруженной модели (см. ollama_pool)
+_POOL = OllamaPool(OLLAMA_HOSTS)
 
 
-def is_available(timeout: int = 3) -> bool:
+def pool_stats() -> list:
+    return _POOL.stats()
+
+
+# affinity-ключ (общий префикс промптов DocSession) → узел, который его уже считал
+_STICKY: "OrderedDict[str, object]" = OrderedDict()
+_STICKY_MAX = 256
+_STICKY_LOCK = threading.Lock()
+
+
+def _sticky_get(affinity: Optional[str]):
+    if not affinity:
+        return None
+    with _STICKY_LOCK:
+        return _STICKY.get(affinity)
+
+
+def _sticky_put(affinity: Optional[str], node) -> None:
+    if not affinity:
+        return
+    with _STICKY_LOCK:
+        _STICKY[affinity] = node
+        _STICKY.move_to_end(affinity)
+        while len(_STICKY) > _STICKY_MAX:
+            _STICKY.popitem(last=False)
+
+
+def _eval_meta(obj: dict) -> dict:
+    """Счётчики финального ответа Ollama: сколько токенов промпта реально считалось (prefill) и сколько сгенерировано."""
+    return {k: obj[k] for k in ("prompt_eval_count", "prompt_eval_duration", "eval_count",
+                                "eval_duration", "load_duration", "total_duration") if k in obj}
+
+
+# ---------- отмена ----------
+# Токен привязывается к потоку на время post(); пул регистрирует на нём выданное соединение,
+# и cancel() делает shutdown сокета — это прерывает и ожидание заголовков, и чтение стрима.
+_BOUND = threading.local()
+
+
+def _shutdown(conn) -> None:
+    sock = getattr(conn, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _CancellableMixin:
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        token = getattr(_BOUND, "token", None)
+        if token is not None:
+            conn._sp_cancel = (token, token.register(lambda: _shutdown(conn)))
+        return conn
+
+    def _put_conn(self, conn) -> None:
+        reg = getattr(conn, "_sp_cancel", None)
+        if reg is not None:
+            reg[0].unregister(reg[1])
+            conn._sp_cancel = None
+        super()._put_conn(conn)
+
+
+class _CancellableHTTPPool(_CancellableMixin, HTTPConnectionPool):
+    pass
+
+
+class _CancellableHTTPSPool(_CancellableMixin, HTTPSConnectionPool):
+    pass
+
+
+class _Adapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CancellableHTTPPool, "https": _CancellableHTTPSPool,
+        }
+
+
+@contextmanager
+def _bound(cancel: Optional[CancelToken]):
+    prev = getattr(_BOUND, "token", None)
+    _BOUND.token = cancel
+    try:
+        yield
+    finally:
+        _BOUND.token = prev
+
+
+@contextmanager
+def _node_feedback(node, cancel: Optional[CancelToken], model: str = OLLAMA_MODEL):
+    """Итог запроса к узлу → пул: ошибка считается к исключению узла, отмена/уход клиента — нет."""
     try:
-        r = requests.get(_url("/api/tags"), timeout=timeout, headers={"User-Agent": UA})
-        return r.ok
+        yield
     except Exception:
+        if not (cancel is not None and cancel.cancelled):
+            _POOL.failure(node)
+        raise
+    _POOL.success(node, model)
+
+
+def _pause(seconds: float, cancel: Optional[CancelToken]) -> bool:
+    """Пауза между ретраями; True — если за это время отменили."""
+    if cancel is None:
+        time.sleep(seconds)
         return False
+    return cancel.wait(seconds)
+
+
+# ---------- пул соединений ----------
+# Один Session на процесс: keep-alive вместо нового TCP-соединения на каждый запрос.
+_SESSION: Optional[requests.Session] = None
+_SESSION_PID = 0
+_SESSION_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    global _SESSION, _SESSION_PID
+    pid = os.getpid()
+    if _SESSION is None or _SESSION_PID != pid:  # после fork сокеты родителя не переиспользуем
+        with _SESSION_LOCK:
+            if _SESSION is None or _SESSION_PID != pid:
+                s = requests.Session()
+                adapter = _Adapter(pool_connections=max(1, len(OLLAMA_HOSTS)), pool_maxsize=OLLAMA_POOL_SIZE)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers["User-Agent"] = UA
+                _SESSION, _SESSION_PID = s, pid
+    return _SESSION
+
+
+# ---------- кэш здоровья ----------
+# Результат последней проверки узлов (/api/tags, /api/ps) — «жив хотя бы один»; успешные
+# chat/chat_stream тоже его обновляют, а после ошибки запроса _wake() перепроверяет
+# (read-таймаут ≠ «Ollama лежит»). Тот же probe возвращает исключённые узлы в ротацию.
+_HEALTH = {"ok": False, "ts": 0.0}
+_PROBE: Optional[threading.Thread] = None
+_PROBE_LOCK = threading.Lock()
+
+
+def _set_health(ok: bool) -> None:
+    _HEALTH["ok"], _HEALTH["ts"] = bool(ok), time.monotonic()
+
+
+def _probe(timeout: float = 3) -> bool:
+    ok = _POOL.refresh(_session().get, timeout=timeout)
+    _set_health(ok)
+    return ok
+
+
+def _probe_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        _probe()
+
+
+def start_health_probe(interval: float = OLLAMA_HEALTH_TTL) -> None:
+    """Фоновый поток, обновляющий кэш здоровья раз в interval секунд (идемпотентно)."""
+    global _PROBE
+    if interval <= 0:
+        return
+    with _PROBE_LOCK:
+        if _PROBE is None or not _PROBE.is_alive():
+            _PROBE = threading.Thread(target=_probe_loop, args=(interval,),
+                                      name="ollama-health", daemon=True)
+            _PROBE.start()
+
+
+def is_available(timeout: int = 3, max_age: Optional[float] = None) -> bool:
+    """
+    Доступна ли Ollama. Берёт кэш, если он моложе max_age (по умолчанию OLLAMA_HEALTH_TTL),
+    иначе синхронно проверяет /api/tags. Первый вызов запускает фоновый probe,
+    так что генерации не тратят на pre-flight отдельный round trip.
+    """
+    ttl = OLLAMA_HEALTH_TTL if max_age is None else max_age
+    start_health_probe()
+    if _HEALTH["ts"] and time.monotonic() - _HEALTH["ts"] < ttl:
+        return _HEALTH["ok"]
+    return _probe(timeout)
 
 
 def _wake() -> None:
     """Лёгкий пинг /api/tags, чтобы «разбудить» демон/модель."""
+    _probe(timeout=5)
+
+
+# ---------- прогрев и keep-alive ----------
+# /api/tags модель не загружает: первый запрос после простоя платил за загрузку весов.
+# Пустой /api/generate загружает модели (OLLAMA_MODEL и OLLAMA_FAST_MODEL) и продлевает keep_alive.
+# num_ctx прогрева — тот, с которым модель последний раз реально вызывалась на этом узле
+# (корзины OLLAMA_CTX_BUCKETS, закреплённый num_ctx DocSession); до первого запроса — корзина
+# под OLLAMA_NUM_CTX. Иначе Ollama перезагрузит модель на первом же запросе. Фоновый поток
+# прогревает все узлы при старте и в рабочие часы обновляет модель до истечения keep_alive.
+_WARM: Optional[threading.Thread] = None
+_WARM_LOCK = threading.Lock()
+_DURATION = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$")
+
+
+def _keep_alive_seconds(value: str = OLLAMA_KEEP_ALIVE) -> Optional[float]:
+    """'15m' / '1h' / '300' → секунды; None — держать бессрочно (отрицательное значение)."""
+    m = _DURATION.match(str(value or ""))
+    if not m:
+        return 300.0  # значение по умолчанию в Ollama — 5 минут
+    n = float(m.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[m.group(2)]
+    return None if n < 0 else n
+
+
+def _in_warm_hours(hour: Optional[int] = None, spec: str = OLLAMA_WARM_HOURS) -> bool:
+    if not spec:
+        return True
+    try:
+        start, end = (int(x) for x in spec.split("-", 1))
+    except ValueError:
+        return True
+    h = time.localtime().tm_hour if hour is None else hour
+    return start <= h < end if start <= end else (h >= start or h < end)   # «22-6» — через полночь
+
+
+# (url узла, модель) и модель → num_ctx последнего отправленного запроса
+_CTX_SEEN: dict = {}
+_CTX_LOCK = threading.Lock()
+
+
+def _remember_ctx(node, model: str, num_ctx: int) -> None:
+    with _CTX_LOCK:
+        _CTX_SEEN[(node.url, model)] = _CTX_SEEN[model] = int(num_ctx)
+
+
+def warm_ctx(model: str = OLLAMA_MODEL, node=None) -> int:
+    """num_ctx для прогрева модели: как у её последнего запроса (на узле, затем вообще), иначе по умолчанию."""
+    with _CTX_LOCK:
+        seen = _CTX_SEEN.get((node.url, model)) if node is not None else None
+        seen = seen or _CTX_SEEN.get(model)
+    if seen:
+        return seen
+    if OLLAMA_ADAPTIVE_CTX and OLLAMA_CTX_BUCKETS:
+        # та корзина, которую context_size выберет для запроса размером с OLLAMA_NUM_CTX
+        return next((b for b in OLLAMA_CTX_BUCKETS if b >= OLLAMA_NUM_CTX), OLLAMA_CTX_BUCKETS[-1])
+    return int(OLLAMA_NUM_CTX)
+
+
+def models() -> list:
+    """Модели, которые держим загруженными: основная и (если задана) быстрая."""
+    return [OLLAMA_MODEL] + ([OLLAMA_FAST_MODEL] if OLLAMA_FAST_MODEL and OLLAMA_FAST_MODEL != OLLAMA_MODEL else [])
+
+
+def load_model(node=None, model: str = OLLAMA_MODEL, timeout: float = OLLAMA_TIMEOUT,
+               num_ctx: Optional[int] = None) -> bool:
+    """Загрузить модель на узле (по умолчанию — выбранном пулом) без генерации токенов (num_ctx — см. warm_ctx)."""
     try:
-        requests.get(_url("/api/tags"), timeout=5, headers={"User-Agent": UA})
+        with (nullcontext(node) if node is not None else _POOL.node(model)) as n:
+            payload = {"model": model, "keep_alive": OLLAMA_KEEP_ALIVE,
+                       "options": {"num_ctx": int(num_ctx or warm_ctx(model, n))}}
+            return _session().post(f"{n.url}/api/generate", json=payload, timeout=timeout).ok
     except Exception:
-        pass
+        return False
+
+
+def _needs_load(node, ttl: Optional[float], model: str = OLLAMA_MODEL) -> bool:
+    if not node.has_model(model):
+        return True
+    left = node.expires_in(model)
+    # обновляем с запасом: за минуту или за 20% срока до выгрузки
+    return ttl is not None and left is not None and left < max(60.0, ttl * 0.2)
+
+
+def warm_up(force: bool = False) -> int:
+    """Загрузить модели на всех живых узлах, где они не загружены или скоро выгрузятся. Возвращает число загрузок."""
+    _probe()
+    ttl = _keep_alive_seconds()
+    now = time.monotonic()
+    todo = [(n, m) for n in _POOL.nodes for m in models()
+            if n.healthy and not n.ejected(now) and (force or _needs_load(n, ttl, m))]
+    threads = [threading.Thread(target=load_model, args=(n, m), daemon=True) for n, m in todo]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if todo:
+        _probe()  # свежие expires_at из /api/ps для карточки статуса
+    return len(todo)
+
+
+def _warm_loop(interval: float) -> None:
+    warm_up(force=True)   # при старте — всегда, даже вне рабочих часов
+    while True:
+        time.sleep(interval)
+        if _in_warm_hours():
+            warm_up()
+
+
+def start_warmup(interval: float = OLLAMA_KEEPALIVE_CHECK) -> None:
+    """Фоновый прогрев при старте + продление keep_alive (идемпотентно; OLLAMA_WARMUP=0 — выкл.)."""
+    global _WARM
+    if not OLLAMA_WARMUP:
+        return
+    start_health_probe()
+    with _WARM_LOCK:
+        if _WARM is None or not _WARM.is_alive():
+            _WARM = threading.Thread(target=_warm_loop, args=(max(5.0, interval),),
+                                     name="ollama-warmup", daemon=True)
+            _WARM.start()
+
+
+def model_state() -> list:
+    """Состояние моделей по узлам (из последнего /api/ps): загружена ли и сколько до выгрузки."""
+    return [{"url": n.url, "model": m, "loaded": n.has_model(m), "expires_in": n.expires_in(m)}
+            for n in _POOL.nodes for m in models()]
 
 
 def _payload(
@@ -42,10 +350,13 @@ def _payload(
     stream: bool,
     top_p: Optional[float] = None,
     stop: Optional[Iterable[str]] = None,
+    num_ctx: Optional[int] = None,
+    model: Optional[str] = None,
+    fmt=None,
 ) -> dict:
     opts: dict = {
         "temperature": float(temperature),
-        "num_ctx": int(OLLAMA_NUM_CTX),
+        "num_ctx": int(num_ctx or OLLAMA_NUM_CTX),
         "num_predict": int(max_tokens),
     }
     if top_p is not None:
@@ -54,8 +365,8 @@ def _payload(
         # Ollama принимает строку или массив строк
         opts["stop"] = list(stop)
 
-    return {
-        "model": OLLAMA_MODEL,
+    payload = {
+        "model": model or OLLAMA_MODEL,
         "messages": [
             {"role": "system", "content": (system or "")},
             {"role": "user",   "content": (prompt or "")},
@@ -64,6 +375,10 @@ def _payload(
         "stream": stream,
         "keep_alive": OLLAMA_KEEP_ALIVE,
     }
+    if fmt:
+        # структурированный вывод: "json" или JSON-схема (Ollama ≥ 0.5)
+        payload["format"] = fmt
+    return payload
 
 
 def _extract_text(obj: dict) -> str:
@@ -89,31 +404,63 @@ def chat(
     *,
     top_p: Optional[float] = None,
     stop: Optional[Iterable[str]] = None,
+    num_ctx: Optional[int] = None,
+    affinity: Optional[str] = None,
+    on_done: Optional[Callable[[dict], None]] = None,
+    model: Optional[str] = None,
+    task: Optional[str] = None,
+    fmt=None,
+    cancel: Optional[CancelToken] = None,
 ) -> str:
     """
     Нестримйнг, с ретраями и экспоненциальным бэкоффом.
-    Возвращает финальный ответ целиком.
+    Возвращает финальный ответ целиком; после cancel() — CANCELLED_TEXT (соединение закрыто).
+    model — модель Ollama (по умолчанию OLLAMA_MODEL; маршрутизацию по задачам делает gen.llm);
+    affinity — ключ общего префикса: запрос уходит на узел, где префикс уже в KV-кэше;
+    on_done(meta) получает счётчики Ollama (prompt_eval_count и т.п.);
+    task — метка задачи для телеметрии (gen.telemetry);
+    fmt — формат ответа Ollama: "json" или JSON-схема.
     """
-    payload = _payload(system, prompt, temperature, max_tokens, stream=False, top_p=top_p, stop=stop)
+    payload = _payload(system, prompt, temperature, max_tokens, stream=False,
+                       top_p=top_p, stop=stop, num_ctx=num_ctx, model=model, fmt=fmt)
+    model = payload["model"]
 
-    last_err = None
+    last_err, failed = None, None
     for attempt in range(_RETRIES):
+        if cancel is not None and cancel.cancelled:
+            return CANCELLED_TEXT
         try:
-            r = requests.post(
-                _url("/api/chat"),
-                json=payload,
-                timeout=OLLAMA_TIMEOUT,
-                headers={"User-Agent": UA},
-            )
-            r.raise_for_status()
+            # ретрай уходит на другой узел, если он есть
+            with _POOL.node(model, avoid=failed, prefer=_sticky_get(affinity)) as node, \
+                    _node_feedback(node, cancel, model):
+                failed = node
+                t0 = time.monotonic()
+                with _bound(cancel):
+                    r = _session().post(
+                        f"{node.url}/api/chat",
+                        json=payload,
+                        timeout=OLLAMA_TIMEOUT,
+                    )
+                r.raise_for_status()
+                failed = None
+            _set_health(True)
+            _remember_ctx(node, model, payload["options"]["num_ctx"])
+            _sticky_put(affinity, node)
             data = r.json()
+            meta = _eval_meta(data)
+            telemetry.record(task, model, meta, time.monotonic() - t0, node=node.url)
+            if on_done is not None:
+                on_done(meta)
             text = _extract_text(data).strip()
             return text if text else "[OLLAMA ERROR] Unexpected response format"
         except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return CANCELLED_TEXT
             last_err = e
             if attempt == 0:
                 _wake()
-            time.sleep(2 ** attempt)  # 1s, 2s, 4s
+            if _pause(2 ** attempt, cancel):  # 1s, 2s, 4s
+                return CANCELLED_TEXT
     return f"[OLLAMA ERROR] {type(last_err).__name__}: {last_err}"
 
 
@@ -125,49 +472,87 @@ def chat_stream(
     *,
     top_p: Optional[float] = None,
     stop: Optional[Iterable[str]] = None,
+    num_ctx: Optional[int] = None,
+    affinity: Optional[str] = None,
+    on_done: Optional[Callable[[dict], None]] = None,
+    model: Optional[str] = None,
+    task: Optional[str] = None,
+    cancel: Optional[CancelToken] = None,
 ) -> Generator[str, None, None]:
     """
     Стриминг токенов — генератор возвращает кусочки текста по мере прихода.
     С ретраями: если первая попытка не удалась, «будим» демон и повторяем.
+    cancel() закрывает соединение и тихо завершает генератор; если модель молчит
+    дольше OLLAMA_STREAM_IDLE_TIMEOUT — стрим обрывается с ошибкой.
+    model/affinity/on_done/task — как в chat(); TTFT в телеметрии — по первому куску.
     """
-    payload = _payload(system, prompt, temperature, max_tokens, stream=True, top_p=top_p, stop=stop)
+    payload = _payload(system, prompt, temperature, max_tokens, stream=True,
+                       top_p=top_p, stop=stop, num_ctx=num_ctx, model=model)
+    model = payload["model"]
 
-    last_err = None
+    last_err, failed = None, None
+    sent = False
     for attempt in range(_STREAM_RETRIES):
+        if cancel is not None and cancel.cancelled:
+            return
         try:
-            # timeout=None для stream: держим соединение сколько нужно;
-            # при желании можно заменить на большой таймаут (например, 600).
-            with requests.post(
-                _url("/api/chat"),
-                json=payload,
-                stream=True,
-                timeout=None,
-                headers={"User-Agent": UA},
-            ) as r:
-                r.raise_for_status()
-                for raw in r.iter_lines(decode_unicode=True):
-                    if not raw:
-                        continue
-                    try:
-                        obj = json.loads(raw)
-                    except Exception:
-                        # иногда приходят служебные строки — пропускаем
-                        continue
-
-                    chunk = _extract_text(obj)
-                    if chunk:
-                        # Ollama обычно шлёт дельты — отдаём их как есть
-                        yield chunk
-
-                    if obj.get("done"):
-                        return
+            # read-таймаут считается между байтами — это и есть idle-таймаут стрима:
+            # долгая генерация не обрывается, зависшая — обрывается
+            with _POOL.node(model, avoid=failed, prefer=_sticky_get(affinity)) as node, \
+                    _node_feedback(node, cancel, model):
+                failed = node
+                t0, ttft = time.monotonic(), None
+                with _bound(cancel):
+                    resp = _session().post(
+                        f"{node.url}/api/chat",
+                        json=payload,
+                        stream=True,
+                        timeout=(10, OLLAMA_STREAM_IDLE_TIMEOUT),
+                    )
+                with resp as r:
+                    r.raise_for_status()
+                    _set_health(True)
+                    _remember_ctx(node, model, payload["options"]["num_ctx"])
+                    for raw in r.iter_lines(decode_unicode=True):
+                        if not raw:
+                            continue
+                        try:
+                            obj = json.loads(raw)
+                        except Exception:
+                            # иногда приходят служебные строки — пропускаем
+                            continue
+
+                        chunk = _extract_text(obj)
+                        if chunk:
+                            # Ollama обычно шлёт дельты — отдаём их как есть
+                            if ttft is None:
+                                ttft = time.monotonic() - t0
+                            sent = True
+                            yield chunk
+
+                        if obj.get("done"):
+                            _sticky_put(affinity, node)
+                            meta = _eval_meta(obj)
+                            telemetry.record(task, model, meta, time.monotonic() - t0,
+                                             ttft=ttft, stream=True, node=node.url)
+                            if on_done is not None:
+                                on_done(meta)
+                            return
+                        if cancel is not None and cancel.cancelled:
+                            return
             # если вышли из with без done — завершаем
             return
         except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return
             last_err = e
+            if sent:
+                # часть ответа уже у пользователя — повтор задвоил бы текст
+                break
             if attempt == 0:
                 _wake()
-            time.sleep(1)
+            if _pause(1, cancel):
+                return
 
     # если не удалось — финальное сообщение-объяснение
     yield f"[OLLAMA STREAM ERROR] {type(last_err).__name__}: {last_err}"
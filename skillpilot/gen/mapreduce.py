@@ -0,0 +1,123 @@
+# skillpilot/gen/mapreduce.py
+"""
+Map-reduce для длинных резюме (многостраничные CV не влезают в num_ctx целиком).
+
+map:    резюме режется по разделам на куски ≤ MAP_CHUNK_TOKENS; из каждого куска
+        короткий промпт извлекает STAR-факты, релевантные JD (параллельно, до LLM_PARALLEL).
+reduce: обычная генерация (адаптированное резюме / STAR) по списку фактов вместо текста.
+
+Время ограничено: каждый map-ответ короткий (профиль "extract"), а всё, что не успело
+за MAPREDUCE_TIMEOUT, отменяется — такие куски попадают в reduce в сжатом виде
+(после дедлайна — лексическое сжатие, без эмбеддера, чтобы дедлайн оставался дедлайном).
+Так учитывается весь документ, а не первые N токенов.
+"""
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from ..config import LLM_PARALLEL, MAPREDUCE_MIN_TOKENS, MAP_CHUNK_TOKENS, MAPREDUCE_TIMEOUT
+from ..core.embedder import embed
+from .cancel import CancelToken
+from .compact import compact, split_units, is_heading
+from .llm import llm, estimate_tokens
+
+MAP_SYSTEM = (
+    "Ты извлекаешь факты из фрагмента резюме. Всегда отвечай НА РУССКОМ ЯЗЫКЕ. "
+    "Только факты из текста, ничего не выдумывай."
+)
+
+_FALLBACK_TOKENS = 120   # сколько от непрочитанного куска идёт в reduce как есть
+_ERROR = re.compile(r"^\s*\[(?:OLLAMA|LLM |OFFLINE|CANCELLED|OPENAI|BUSY)")
+
+# факты по (документ, JD): резюме и сопроводительное из одного пакета не гоняют map дважды
+_MEMO_MAX = 32
+_MEMO: "OrderedDict[str, str]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+
+def needs_map_reduce(text: str) -> bool:
+    return estimate_tokens(text) > MAPREDUCE_MIN_TOKENS
+
+
+def split_chunks(text: str, budget: int = MAP_CHUNK_TOKENS) -> List[str]:
+    """
+    Куски по разделам: новый кусок начинается с заголовка раздела или при переполнении budget.
+    Каждая строка документа попадает ровно в один кусок.
+    """
+    chunks: List[List[str]] = []
+    cur: List[str] = []
+    used = 0
+    for unit in split_units(text):
+        size = estimate_tokens(unit)
+        if cur and (is_heading(unit) or used + size > budget):
+            chunks.append(cur)
+            cur, used = [], 0
+        cur.append(unit)
+        used += size
+    if cur:
+        chunks.append(cur)
+    return ["\n".join(c) for c in chunks]
+
+
+def _map_prompt(chunk: str, jd: str) -> str:
+    focus = f"Вакансия (JD), на которую ориентируемся:\n{jd}\n\n" if jd else ""
+    return (
+        f"{focus}Фрагмент резюме:\n{chunk}\n\n"
+        "Выпиши до 5 фактов в формате STAR (ситуация/задача → действие → результат с цифрами),"
+        " самые релевантные вакансии. Одна строка на факт, начинай с «- ». "
+        "Если релевантных фактов нет — ответь «- нет»."
+    )
+
+
+def map_facts(text: str, jd: str = "", parallel: Optional[int] = None,
+              timeout: Optional[float] = None, cancel: Optional[CancelToken] = None,
+              **llm_kw) -> str:
+    """Факты по всем кускам документа, в исходном порядке, одним текстом для reduce."""
+    key = hashlib.sha1(f"{text}\x00{jd}".encode("utf-8")).hexdigest()
+    if not llm_kw.get("regenerate"):
+        with _MEMO_LOCK:
+            hit = _MEMO.get(key)
+            if hit is not None:
+                _MEMO.move_to_end(key)
+                return hit
+    chunks = split_chunks(text)
+    token = CancelToken()
+    handle = cancel.register(token.cancel) if cancel is not None else None
+    limit = MAPREDUCE_TIMEOUT if timeout is None else timeout
+    pool = ThreadPoolExecutor(max_workers=max(1, parallel or LLM_PARALLEL), thread_name_prefix="llm-map")
+    try:
+        futures = [pool.submit(llm, MAP_SYSTEM, _map_prompt(c, jd), task="extract", cancel=token, **llm_kw)
+                   for c in chunks]
+        wait(futures, timeout=limit if limit and limit > 0 else None)
+        expired = any(not f.done() for f in futures)
+        if expired:
+            token.cancel()   # дедлайн: недоделанные куски уйдут в reduce сжатыми
+        parts, complete = [], True
+        for i, (chunk, f) in enumerate(zip(chunks, futures), 1):
+            out = f.result() if f.done() and not f.cancelled() and f.exception() is None else ""
+            if not out.strip() or _ERROR.match(out):
+                complete = False
+                out = compact(chunk, jd or chunk, _FALLBACK_TOKENS, embed_fn=None if expired else embed).text
+            parts.append(f"Раздел {i}:\n{out.strip()}")
+        facts = "\n\n".join(parts)
+        if complete:
+            with _MEMO_LOCK:
+                _MEMO[key] = facts
+                while len(_MEMO) > _MEMO_MAX:
+                    _MEMO.popitem(last=False)
+        return facts
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if cancel is not None:
+            cancel.unregister(handle)
+
+
+def reduce_input(resume: str, jd: str, **llm_kw) -> str:
+    """Резюме для итогового промпта: короткое — как есть, длинное — STAR-факты по разделам."""
+    if not needs_map_reduce(resume):
+        return resume
+    kw = {k: v for k, v in llm_kw.items() if k in ("cancel", "priority", "session", "regenerate")}
+    return map_facts(resume, jd, **kw)
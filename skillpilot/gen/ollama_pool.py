@@ -0,0 +1,184 @@
+# skillpilot/gen/ollama_pool.py
+"""
+Пул узлов Ollama (OLLAMA_HOSTS=http://a:11434,http://b:11434).
+
+- Маршрутизация: узел с наименьшим числом запросов «в полёте».
+- Аффинити: узлы, где OLLAMA_MODEL уже загружена (по /api/ps), предпочтительнее —
+  пока их загрузка не больше, чем у холодных, на OLLAMA_AFFINITY_SLACK запросов.
+- Липкость: запросы одного DocSession идут на узел, где уже посчитан их общий префикс.
+- Ошибки: после OLLAMA_EJECT_AFTER неудач подряд узел исключается на OLLAMA_EJECT_SECS;
+  по истечении срока (или после успешного probe) он снова получает запросы.
+"""
+import re
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from ..config import OLLAMA_EJECT_AFTER, OLLAMA_EJECT_SECS, OLLAMA_AFFINITY_SLACK
+
+
+_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+
+def _expires(value) -> Optional[float]:
+    """expires_at из /api/ps (RFC3339, наносекунды от Go) → unix time."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(_FRACTION.sub(r"\1", str(value)).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class Node:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.fails = 0
+        self.healthy = True          # до первого probe считаем узел живым
+        self.ejected_until = 0.0
+        self.models: Set[str] = set()
+        self.expires: Dict[str, Optional[float]] = {}   # модель → когда Ollama её выгрузит
+        self.served = 0
+
+    def ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def has_model(self, model: str) -> bool:
+        # /api/ps отдаёт полное имя с тегом: mistral → mistral:latest
+        return model in self.models or (":" not in model and f"{model}:latest" in self.models)
+
+    def expires_in(self, model: str) -> Optional[float]:
+        """Секунд до выгрузки модели (None — не загружена или срок неизвестен)."""
+        ts = self.expires.get(model, self.expires.get(f"{model}:latest"))
+        return None if ts is None else ts - time.time()
+
+
+class OllamaPool:
+    def __init__(self, hosts: List[str], eject_after: int = OLLAMA_EJECT_AFTER,
+                 eject_for: float = OLLAMA_EJECT_SECS, affinity_slack: int = OLLAMA_AFFINITY_SLACK):
+        self.nodes = [Node(h) for h in hosts] or [Node("http://127.0.0.1:11434")]
+        self.eject_after = max(1, int(eject_after))
+        self.eject_for = float(eject_for)
+        self.affinity_slack = int(affinity_slack)
+        self._lock = threading.Lock()
+        self._rr = 0
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    # ---------- выбор узла ----------
+    def _least(self, nodes: List[Node]) -> Node:
+        # при равной загрузке — по кругу, чтобы не бить всегда в первый узел
+        low = min(n.outstanding for n in nodes)
+        tied = [n for n in nodes if n.outstanding == low]
+        self._rr += 1
+        return tied[self._rr % len(tied)]
+
+    def _pick(self, model: Optional[str], avoid: Optional[Node] = None,
+              prefer: Optional[Node] = None) -> Node:
+        now = time.monotonic()
+        live = [n for n in self.nodes if not n.ejected(now)]
+        if avoid is not None and len(live) > 1:
+            live = [n for n in live if n is not avoid]
+        if not live:
+            # исключены все — пробуем тот, что вернётся раньше остальных
+            return min(self.nodes, key=lambda n: n.ejected_until)
+        if prefer is not None and prefer in live:
+            # на этом узле уже лежит KV-кэш общего префикса — держимся его, пока не перегружен
+            if prefer.outstanding <= min(n.outstanding for n in live) + self.affinity_slack:
+                return prefer
+        if model:
+            warm = [n for n in live if n.has_model(model)]
+            if warm and len(warm) < len(live):
+                best_warm = self._least(warm)
+                cold = [n for n in live if n not in warm]
+                if best_warm.outstanding <= min(n.outstanding for n in cold) + self.affinity_slack:
+                    return best_warm
+        return self._least(live)
+
+    @contextmanager
+    def node(self, model: Optional[str] = None, avoid: Optional[Node] = None,
+             prefer: Optional[Node] = None) -> Iterator[Node]:
+        """
+        Узел на время одного запроса (счётчик «в полёте» держится до выхода из with).
+        avoid — узел, на котором только что упала предыдущая попытка;
+        prefer — узел, который обслуживал предыдущие запросы с тем же префиксом промпта.
+        """
+        with self._lock:
+            n = self._pick(model, avoid, prefer)
+            n.outstanding += 1
+        try:
+            yield n
+        finally:
+            with self._lock:
+                n.outstanding -= 1
+
+    # ---------- обратная связь ----------
+    def success(self, n: Node, model: Optional[str] = None) -> None:
+        with self._lock:
+            n.fails = 0
+            n.healthy = True
+            n.ejected_until = 0.0
+            n.served += 1
+            if model:
+                n.models.add(model)  # только что отвечала — модель на узле загружена
+
+    def failure(self, n: Node) -> None:
+        with self._lock:
+            n.fails += 1
+            if n.fails >= self.eject_after:
+                n.healthy = False
+                n.ejected_until = time.monotonic() + self.eject_for
+
+    # ---------- health / аффинити ----------
+    def _refresh_node(self, n: Node, get: Callable, timeout: float) -> None:
+        try:
+            ok = get(f"{n.url}/api/tags", timeout=timeout).ok
+        except Exception:
+            ok = False
+        models = None
+        if ok:
+            try:
+                r = get(f"{n.url}/api/ps", timeout=timeout)
+                if r.ok:
+                    models = {(m.get("name") or m.get("model")): _expires(m.get("expires_at"))
+                              for m in (r.json().get("models") or [])}
+            except Exception:
+                pass  # старые Ollama без /api/ps — аффинити просто не работает
+        with self._lock:
+            n.healthy = ok
+            if ok:
+                n.fails = 0
+                n.ejected_until = 0.0   # узел ожил — возвращаем в ротацию
+            elif not n.ejected(time.monotonic()):
+                n.ejected_until = time.monotonic() + self.eject_for
+            if models is not None:
+                n.expires = {m: exp for m, exp in models.items() if m}
+                n.models = set(n.expires)
+
+    def refresh(self, get: Callable, timeout: float = 3) -> bool:
+        """Параллельный probe всех узлов (/api/tags + /api/ps). True — если жив хотя бы один."""
+        threads = [threading.Thread(target=self._refresh_node, args=(n, get, timeout), daemon=True)
+                   for n in self.nodes]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout * 2 + 1)
+        return any(n.healthy for n in self.nodes)
+
+    def stats(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "url": n.url,
+                "healthy": n.healthy,
+                "ejected": n.ejected(now),
+                "outstanding": n.outstanding,
+                "served": n.served,
+                "models": sorted(n.models),
+                "expires_in": {m: (None if exp is None else round(exp - time.time()))
+                               for m, exp in n.expires.items()},
+            } for n in self.nodes]
@@ -0,0 +1,92 @@
+# skillpilot/gen/package.py
+"""
+«Сгенерировать всё»: резюме, сопроводительное, план и вопросы к интервью параллельно.
+
+Задачи идут в пул из LLM_PARALLEL потоков (по числу параллельных слотов Ollama) —
+время пакета ≈ самой долгой генерации, а не сумме. Куски всех стримов сливаются
+в одну очередь; потребитель получает накопленные тексты по мере прихода.
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from ..config import LLM_PARALLEL
+from ..interview.qa import gen_questions, QuestionsError
+from .cancel import CancelToken
+from .cover import make_cover_stream
+from .plan import make_7day_plan_stream
+from .resume import make_tailored_resume_stream
+
+PACKAGE_FIELDS = ["tailored", "cover", "plan", "questions"]
+
+QUEUED_TEXT = "⏳ В очереди…"
+
+_DONE = object()
+
+
+def _questions(jd: str, resume: str, **llm_kw) -> Iterator[str]:
+    try:
+        yield "\n".join(gen_questions(jd, 5, resume=resume, **llm_kw))
+    except QuestionsError as e:
+        yield str(e)
+
+
+def generate_package(resume: str, jd: str, gaps: List[str], role_hint: str = "",
+                     parallel: Optional[int] = None, cancel: Optional[CancelToken] = None,
+                     **llm_kw) -> Iterator[Dict[str, str]]:
+    """
+    Генератор состояний {поле: текст} для PACKAGE_FIELDS; последний yield — финальные тексты.
+    cancel (или закрытие генератора) отменяет все ещё идущие генерации.
+    """
+    token = cancel or CancelToken()
+    kw = dict(llm_kw, cancel=token)
+    tasks = {
+        "tailored": lambda: make_tailored_resume_stream(resume, jd, **kw),
+        "cover": lambda: make_cover_stream(resume, jd, **kw),
+        "plan": lambda: make_7day_plan_stream(gaps, role_hint, **kw),
+        "questions": lambda: _questions(jd, resume, **kw),
+    }
+    texts = {name: QUEUED_TEXT for name in PACKAGE_FIELDS}
+    events: "queue.Queue" = queue.Queue()
+
+    def _run(name: str) -> None:
+        events.put((name, None))  # слот получен — задача стартовала
+        try:
+            for chunk in tasks[name]():
+                if token.cancelled:
+                    break
+                if chunk:
+                    events.put((name, chunk))
+        except Exception as e:
+            events.put((name, f"\n[ERROR] {type(e).__name__}: {e}"))
+        finally:
+            events.put((name, _DONE))
+
+    pool = ThreadPoolExecutor(max_workers=max(1, parallel or LLM_PARALLEL), thread_name_prefix="llm-package")
+    pending = len(PACKAGE_FIELDS)
+    try:
+        for name in PACKAGE_FIELDS:
+            pool.submit(_run, name)
+        yield dict(texts)
+        while pending:
+            name, chunk = events.get()
+            # сливаем всё, что уже пришло, — одно обновление UI вместо десятков
+            batch = [(name, chunk)]
+            while True:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            for name, chunk in batch:
+                if chunk is _DONE:
+                    pending -= 1
+                    texts[name] = texts[name].strip() if texts[name] != QUEUED_TEXT else ""
+                elif chunk is None:
+                    texts[name] = ""
+                else:
+                    texts[name] += chunk
+            yield dict(texts)
+    finally:
+        if pending:  # потребитель ушёл раньше — обрываем оставшиеся генерации
+            token.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,4 @@
-from .llm import llm
+from .llm import llm, llm_stream
 
 def _truncate(text: str, limit: int) -> str:
     if not text:
@@ -21,8 +21,7 @@ def _offline_plan(gaps: list, role: str) -> str:
     ]
     return "\n".join(lines)
 
-def make_7day_plan(gaps: list, role_hint: str = ""):
-    role = role_hint or "под JD"
+def _plan_prompt(gaps: list, role: str):
     gaps_txt = ", ".join(gaps[:6]) if gaps else "нет явных пробелов"
 
     system = (
@@ -42,9 +41,28 @@ def make_7day_plan(gaps: list, role_hint: str = ""):
 СФОРМИРУЙ ТАБЛИЦУ (как обычный текст):
 День | Задача (≤60 мин) | Артефакт (что сдаём) | Ресурсы (1–2 ссылки/подсказки)
 """
-    out = llm(system, prompt, max_tokens=600)
+    return system, prompt
+
+
+def make_7day_plan(gaps: list, role_hint: str = "", **llm_kw):
+    role = role_hint or "под JD"
+    system, prompt = _plan_prompt(gaps, role)
+    out = llm(system, prompt, task="plan", **llm_kw)
 
     # если Ollama не ответила/таймаут — вернём копию офлайн-плана
     if isinstance(out, str) and out.startswith("[OLLAMA ERROR]"):
         return _offline_plan(gaps, role)
     return out
+
+
+def make_7day_plan_stream(gaps: list, role_hint: str = "", **llm_kw):
+    """Стриминговая версия make_7day_plan; при ошибке Ollama — офлайн-план одним куском."""
+    role = role_hint or "под JD"
+    system, prompt = _plan_prompt(gaps, role)
+    started = False
+    for chunk in llm_stream(system, prompt, task="plan", **llm_kw):
+        if chunk.startswith("[OLLAMA STREAM ERROR]"):
+            yield ("\n\n" if started else "") + _offline_plan(gaps, role)
+            return
+        started = True
+        yield chunk
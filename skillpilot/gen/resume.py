@@ -1,21 +1,27 @@
-from .llm import llm
-
-def make_tailored_resume(resume: str, jd: str):
-    system = (
-        "Ты карьерный консультант. Всегда отвечай НА РУССКОМ ЯЗЫКЕ. "
-        "Пиши кратко и предметно. Используй формат STAR и буллеты."
-    )
-    prompt = f"""Исходное резюме:
-{resume}
-
-Вакансия (JD):
-{jd}
+from .llm import llm, llm_stream
+from .docsession import doc_session
+from .mapreduce import reduce_input
 
+TAILOR_TASK = """Адаптируй резюме под вакансию как карьерный консультант. Используй формат STAR и буллеты.
 СФОРМИРУЙ НА РУССКОМ:
 1) Строку: «Ключевые навыки: …» — укажи 3–4 наиболее релевантных JD навыка.
 2) 5–7 буллетов в формате STAR (S/T/A/R). Каждый буллет ≤ 2 предложений и содержит конкретные метрики (%, числа, время, деньги).
 3) Убери нерелевантные детали, избегай общих фраз и плейсхолдеров.
-
-Не используй квадратные скобки и шаблонные заглушки.
 """
-    return llm(system, prompt, max_tokens=900)
+
+
+def _tailor_prompt(resume: str, jd: str):
+    # резюме и JD — в общем префиксе сессии документа (см. docsession), задание — в хвосте
+    doc = doc_session(resume, jd)
+    return (doc, *doc.prompt(TAILOR_TASK))
+
+
+def make_tailored_resume(resume: str, jd: str, **llm_kw):
+    doc, system, prompt = _tailor_prompt(reduce_input(resume, jd, **llm_kw), jd)
+    return llm(system, prompt, task="tailor", doc=doc, **llm_kw)
+
+
+def make_tailored_resume_stream(resume: str, jd: str, **llm_kw):
+    """То же, что make_tailored_resume, но отдаёт куски текста по мере генерации."""
+    doc, system, prompt = _tailor_prompt(reduce_input(resume, jd, **llm_kw), jd)
+    yield from llm_stream(system, prompt, task="tailor", doc=doc, **llm_kw)
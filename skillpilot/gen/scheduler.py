@@ -0,0 +1,217 @@
+# skillpilot/gen/scheduler.py
+"""
+Планировщик запросов к LLM: LLM_PARALLEL слотов (по числу параллельных слотов Ollama).
+
+- Приоритеты: interactive (кнопки UI) > sandbox (Prompt-песочница) > background (пакетные задачи).
+- Внутри приоритета — round-robin по сессиям: одна сессия не забирает очередь целиком.
+- background никогда не занимает последний свободный слот (если слотов > 1) —
+  интерактивный запрос не ждёт окончания ночного прогона.
+- Очередь ограничена LLM_QUEUE_MAX; при переполнении или ожидании дольше LLM_QUEUE_TIMEOUT
+  сразу поднимается Busy(position) вместо многоминутного висения до OLLAMA_TIMEOUT.
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional
+
+from ..config import LLM_PARALLEL, LLM_QUEUE_MAX, LLM_QUEUE_TIMEOUT
+from .cancel import CancelToken
+
+PRIORITIES = {"interactive": 0, "sandbox": 1, "background": 2}
+_BACKGROUND = PRIORITIES["background"]
+
+BUSY_PREFIX = "[BUSY]"
+
+
+class Busy(Exception):
+    """LLM перегружена: запрос не поставлен в очередь (или не дождался слота)."""
+
+    def __init__(self, position: int, queued: int, timed_out: bool = False):
+        self.position = position
+        self.queued = queued
+        self.timed_out = timed_out
+        super().__init__(self.text())
+
+    def text(self) -> str:
+        if self.timed_out:
+            return (f"{BUSY_PREFIX} LLM занята: запрос не дождался очереди "
+                    f"(позиция {self.position}). Повторите позже.")
+        return (f"{BUSY_PREFIX} LLM занята: в очереди {self.queued} запросов, "
+                f"ваша позиция была бы {self.position}. Повторите позже.")
+
+
+class _Ticket:
+    __slots__ = ("prio", "session", "event", "granted", "enqueued")
+
+    def __init__(self, prio: int, session: str):
+        self.prio = prio
+        self.session = session
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued = time.monotonic()
+
+
+class LLMScheduler:
+    def __init__(self, slots: int = LLM_PARALLEL, max_queue: int = LLM_QUEUE_MAX,
+                 timeout: float = LLM_QUEUE_TIMEOUT):
+        self.slots = max(1, int(slots))
+        self.max_queue = max(0, int(max_queue))
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._bg_active = 0
+        # приоритет → (сессия → её очередь); порядок сессий = round-robin
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Ticket]]"] = {}
+        self._queued = 0
+        self._waits: Deque[float] = deque(maxlen=500)
+        self._served = 0
+        self._rejected = 0
+
+    @property
+    def _bg_limit(self) -> int:
+        return max(1, self.slots - 1)
+
+    # ---------- очередь ----------
+    def _enqueue(self, t: _Ticket) -> None:
+        q = self._queues.setdefault(t.prio, OrderedDict())
+        q.setdefault(t.session, deque()).append(t)
+        self._queued += 1
+
+    def _remove(self, t: _Ticket) -> None:
+        q = self._queues.get(t.prio, {})
+        dq = q.get(t.session)
+        if dq is not None and t in dq:
+            dq.remove(t)
+            self._queued -= 1
+            if not dq:
+                del q[t.session]
+
+    def _order(self) -> List[_Ticket]:
+        """Порядок, в котором ждущие получат слоты (без учёта лимита background)."""
+        out: List[_Ticket] = []
+        for prio in sorted(self._queues):
+            lanes = [list(dq) for dq in self._queues[prio].values()]
+            for i in range(max(map(len, lanes), default=0)):
+                out.extend(lane[i] for lane in lanes if i < len(lane))
+        return out
+
+    def _next(self) -> Optional[_Ticket]:
+        for prio in sorted(self._queues):
+            if prio == _BACKGROUND and self._bg_active >= self._bg_limit:
+                continue
+            q = self._queues[prio]
+            if not q:
+                continue
+            session, dq = next(iter(q.items()))
+            t = dq.popleft()
+            if dq:
+                q.move_to_end(session)  # следующей обслуживается другая сессия
+            else:
+                del q[session]
+            self._queued -= 1
+            return t
+        return None
+
+    def _grant(self, t: _Ticket) -> None:
+        t.granted = True
+        self._active += 1
+        if t.prio == _BACKGROUND:
+            self._bg_active += 1
+        self._served += 1
+        self._waits.append(time.monotonic() - t.enqueued)
+
+    def _waiting_ahead(self, prio: int) -> bool:
+        """Есть ли в очереди тикет того же или более высокого приоритета, который может стартовать сейчас."""
+        for p, q in self._queues.items():
+            if p > prio or not q:
+                continue
+            if p == _BACKGROUND and self._bg_active >= self._bg_limit:
+                continue   # background, упёршийся в лимит, не держит слот для остальных
+            return True
+        return False
+
+    def _can_start(self, t: _Ticket) -> bool:
+        if self._active >= self.slots or self._waiting_ahead(t.prio):
+            return False
+        return t.prio != _BACKGROUND or self._bg_active < self._bg_limit
+
+    # ---------- API ----------
+    def acquire(self, priority: str = "interactive", session: Optional[str] = None,
+                cancel: Optional[CancelToken] = None) -> _Ticket:
+        """
+        Ждёт слот. Busy — если очередь полна или ожидание дольше timeout.
+        Отмена во время ожидания возвращает тикет без слота (granted=False).
+        """
+        t = _Ticket(PRIORITIES.get(priority, 0), session or "")
+        with self._lock:
+            if self._can_start(t):
+                self._grant(t)
+                return t
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise Busy(self._queued + 1, self._queued)
+            self._enqueue(t)
+        handle = cancel.register(t.event.set) if cancel is not None else None
+        try:
+            t.event.wait(self.timeout if self.timeout and self.timeout > 0 else None)
+        finally:
+            if cancel is not None:
+                cancel.unregister(handle)
+        with self._lock:
+            if t.granted:
+                return t
+            order = self._order()
+            position = order.index(t) + 1 if t in order else 0
+            self._remove(t)
+            if cancel is not None and cancel.cancelled:
+                return t
+            self._rejected += 1
+            raise Busy(position, self._queued, timed_out=True)
+
+    def release(self, t: _Ticket) -> None:
+        if not t.granted:
+            return
+        with self._lock:
+            t.granted = False
+            self._active -= 1
+            if t.prio == _BACKGROUND:
+                self._bg_active -= 1
+            while self._active < self.slots:
+                nxt = self._next()
+                if nxt is None:
+                    break
+                self._grant(nxt)
+                nxt.event.set()
+
+    @contextmanager
+    def slot(self, priority: str = "interactive", session: Optional[str] = None,
+             cancel: Optional[CancelToken] = None) -> Iterator[_Ticket]:
+        t = self.acquire(priority, session, cancel)
+        try:
+            yield t
+        finally:
+            self.release(t)
+
+    def stats(self) -> dict:
+        """Глубина очереди и время ожидания (по последним 500 запросам)."""
+        with self._lock:
+            waits = sorted(self._waits)
+            now = time.monotonic()
+            oldest = max((now - t.enqueued for t in self._order()), default=0.0)
+            by_prio = {name: sum(len(dq) for dq in self._queues.get(p, {}).values())
+                       for name, p in PRIORITIES.items()}
+            return {
+                "slots": self.slots,
+                "active": self._active,
+                "queued": self._queued,
+                "queued_by_priority": by_prio,
+                "served": self._served,
+                "rejected": self._rejected,
+                "wait_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "wait_p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                "wait_oldest": round(oldest, 3),
+            }
+
+
+SCHEDULER = LLMScheduler()
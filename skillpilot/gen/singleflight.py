@@ -0,0 +1,107 @@
+# skillpilot/gen/singleflight.py
+"""
+Single-flight: одинаковые одновременные запросы к LLM делят один вызов апстрима.
+
+Первый подписчик запускает апстрим в отдельном потоке; куски ответа копятся в буфере
+и раздаются всем подписчикам (опоздавший получает всё с начала). Каждый подписчик может
+уйти по своему CancelToken — апстрим отменяется, только когда ушли все.
+"""
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .cancel import CancelToken
+
+
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.refs = 0
+        self.upstream = CancelToken()
+
+    def wake(self) -> None:
+        with self.cond:
+            self.cond.notify_all()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def stream(self, key: str, factory: Callable[[CancelToken], Iterator[str]],
+               cancel: Optional[CancelToken] = None) -> Iterator[str]:
+        """
+        Куски ответа для key. factory(upstream_token) вызывается один раз на все
+        одновременные подписки; upstream_token отменяется, когда уходит последний подписчик.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            flight.refs += 1
+        if leader:
+            threading.Thread(target=self._pump, args=(key, flight, factory),
+                             name="llm-flight", daemon=True).start()
+
+        handle = cancel.register(flight.wake) if cancel is not None else None
+        pos = 0
+        try:
+            while True:
+                with flight.cond:
+                    while pos >= len(flight.chunks) and not flight.done \
+                            and not (cancel is not None and cancel.cancelled):
+                        flight.cond.wait()
+                    if cancel is not None and cancel.cancelled:
+                        return
+                    new = flight.chunks[pos:]
+                    pos += len(new)
+                    finished = flight.done and pos >= len(flight.chunks)
+                for chunk in new:
+                    yield chunk
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            if cancel is not None:
+                cancel.unregister(handle)
+            with self._lock:
+                flight.refs -= 1
+                if flight.refs == 0 and not flight.done:
+                    # никто больше не слушает — обрываем апстрим; новые запросы начнут заново
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                    flight.upstream.cancel()
+
+    def call(self, key: str, fn: Callable[[CancelToken], str],
+             cancel: Optional[CancelToken] = None) -> str:
+        """Нестримовый вариант: fn(upstream_token) -> str выполняется один раз на всех."""
+        return "".join(self.stream(key, lambda token: iter([fn(token)]), cancel))
+
+    def _pump(self, key: str, flight: _Flight, factory: Callable[[CancelToken], Iterator[str]]) -> None:
+        it = None
+        try:
+            it = factory(flight.upstream)
+            for chunk in it:
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
@@ -1,5 +1,6 @@
 # skillpilot/gen/star.py
 from .llm import llm_stream
+from .mapreduce import needs_map_reduce, map_facts
 
 STAR_SYSTEM = "Ты карьерный редактор резюме. Формируешь краткие, сильные, конкретные буллеты."
 STAR_USER_TMPL = """Преобразуй опыт ниже в 3–5 кратких STAR-буллетов на русском.
@@ -18,6 +19,9 @@ def starify(raw_text: str, temperature: float = 0.4, max_tokens: int = 400) -> s
     """Вернёт 3–5 STAR-буллетов. Совместимо с вызовом starify(t) из UI."""
     if not (raw_text or "").strip():
         return "— нет входного текста —"
+    if needs_map_reduce(raw_text):
+        # многостраничный опыт: сначала факты по разделам, STAR — уже по ним
+        raw_text = map_facts(raw_text)
     acc = []
     try:
         for chunk in llm_stream(
@@ -25,6 +29,7 @@ def starify(raw_text: str, temperature: float = 0.4, max_tokens: int = 400) -> s
             STAR_USER_TMPL.format(raw=raw_text),
             temperature=temperature,
             max_tokens=int(max_tokens),
+            task="star",
         ):
             if chunk:
                 acc.append(chunk)
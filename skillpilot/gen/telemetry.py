@@ -0,0 +1,110 @@
+# skillpilot/gen/telemetry.py
+"""
+Телеметрия вызовов Ollama: на каждый chat/chat_stream — время до первого токена (TTFT),
+полное время, токены промпта и ответа, скорость генерации и признак холодной загрузки.
+
+Счётчики берутся из финального ответа Ollama (prompt_eval_count, eval_count, eval_duration,
+load_duration); TTFT у стрима меряется по приходу первого куска, у обычного chat — это
+load_duration + prompt_eval_duration (ответ приходит целиком).
+Хранятся последние LLM_TELEMETRY_MAX записей; summary() — перцентили по задачам.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from ..config import LLM_TELEMETRY_MAX, LLM_COLD_LOAD_MS
+
+_RECORDS: deque = deque(maxlen=max(1, LLM_TELEMETRY_MAX))
+_LOCK = threading.Lock()
+
+
+def _ms(ns) -> Optional[float]:
+    return None if ns is None else ns / 1e6
+
+
+def record(task: Optional[str], model: str, meta: dict, total: float,
+           ttft: Optional[float] = None, stream: bool = False, node: str = "") -> dict:
+    """Записать завершённый вызов. meta — _eval_meta финального ответа, total/ttft — секунды."""
+    load = _ms(meta.get("load_duration"))
+    prefill = _ms(meta.get("prompt_eval_duration"))
+    gen_ms = _ms(meta.get("eval_duration"))
+    gen = meta.get("eval_count")
+    if ttft is None and (load is not None or prefill is not None):
+        ttft = ((load or 0.0) + (prefill or 0.0)) / 1000
+    rec = {
+        "ts": time.time(),
+        "task": task or "-",
+        "model": model,
+        "node": node,
+        "stream": stream,
+        "ttft": ttft,
+        "total": total,
+        "prompt_tokens": meta.get("prompt_eval_count"),
+        "gen_tokens": gen,
+        "prefill_ms": prefill,
+        "load_ms": load,
+        "tok_s": gen / (gen_ms / 1000) if gen and gen_ms else None,
+        "cold": load is not None and load > LLM_COLD_LOAD_MS,
+    }
+    with _LOCK:
+        _RECORDS.append(rec)
+    return rec
+
+
+def records() -> List[dict]:
+    with _LOCK:
+        return list(_RECORDS)
+
+
+def clear() -> None:
+    with _LOCK:
+        _RECORDS.clear()
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return None
+    return vals[min(len(vals) - 1, int(round(q * (len(vals) - 1))))]
+
+
+def summary() -> Dict[str, dict]:
+    """По задачам: число вызовов, p50/p95 TTFT и полного времени, медианы токенов и скорости, холодные загрузки."""
+    by_task: Dict[str, List[dict]] = {}
+    for r in records():
+        by_task.setdefault(r["task"], []).append(r)
+    out = {}
+    for task, rs in sorted(by_task.items()):
+        col = lambda k: [r[k] for r in rs]  # noqa: E731
+        out[task] = {
+            "calls": len(rs),
+            "ttft_p50": _pct(col("ttft"), 0.5),
+            "ttft_p95": _pct(col("ttft"), 0.95),
+            "total_p50": _pct(col("total"), 0.5),
+            "total_p95": _pct(col("total"), 0.95),
+            "prompt_tokens_p50": _pct(col("prompt_tokens"), 0.5),
+            "gen_tokens_p50": _pct(col("gen_tokens"), 0.5),
+            "tok_s_p50": _pct(col("tok_s"), 0.5),
+            "cold": sum(1 for r in rs if r["cold"]),
+        }
+    return out
+
+
+def summary_md() -> str:
+    """Таблица summary() для вкладки «Настройки»."""
+    s = summary()
+    if not s:
+        return "_Пока нет вызовов Ollama._"
+
+    def f(v, fmt="{:.1f}"):
+        return "—" if v is None else fmt.format(v)
+
+    rows = ["| Задача | Вызовов | TTFT p50 / p95, с | Всего p50 / p95, с | Промпт, ток. | Ответ, ток. | Ток/с | Холодных |",
+            "|---|---:|---:|---:|---:|---:|---:|---:|"]
+    for task, m in s.items():
+        rows.append(
+            f'| {task} | {m["calls"]} | {f(m["ttft_p50"])} / {f(m["ttft_p95"])} '
+            f'| {f(m["total_p50"])} / {f(m["total_p95"])} | {f(m["prompt_tokens_p50"], "{:.0f}")} '
+            f'| {f(m["gen_tokens_p50"], "{:.0f}")} | {f(m["tok_s_p50"])} | {m["cold"]} |')
+    return "\n".join(rows)
@@ -1,5 +1,6 @@
 # skillpilot/graph/skill_graph.py
-import os, time, tempfile
+import os, time, json, hashlib, tempfile, threading
+from collections import OrderedDict
 from typing import Tuple, List, Any
 
 # аккуратно тянем зависимости: если нет, используем PIL-заглушку
@@ -24,6 +25,21 @@ except Exception:
 from ..core.extractor import extract_keywords
 
 
+# Кэш картинок по хэшу содержимого графа: неизменная пара JD/резюме — готовый PNG без matplotlib.
+# Каталог во временной папке: Gradio отдаёт файлы только из tmp/cwd.
+GRAPH_CACHE_DIR = os.getenv("SKILLPILOT_GRAPH_CACHE", os.path.join(tempfile.gettempdir(), "skillpilot_graphs"))
+# сколько последних PNG держим: при записи нового самые давно использованные (по mtime) удаляются
+GRAPH_CACHE_MAX = int(os.getenv("SKILLPILOT_GRAPH_CACHE_MAX", "200"))
+
+# (have, recs) по паре текстов: YAKE по двум документам — самая долгая часть до рендера
+_RECO_MAX = 64
+_RECO: "OrderedDict[str, Tuple[List[str], List[str]]]" = OrderedDict()
+_RECO_LOCK = threading.Lock()
+
+_STATS = {"renders": 0, "cache_hits": 0, "evicted": 0}
+_STATS_LOCK = threading.Lock()
+
+
 def _tmp_png(name: str = "skillgraph") -> str:
     d = tempfile.mkdtemp(prefix="skillgraph_")
     return os.path.join(d, f"{name}_{int(time.time())}.png")
@@ -55,33 +71,82 @@ def demo_graph_reco(jd_text: str, cv_text: str) -> Tuple[Any, List[str], List[st
     - have: навыки из JD, которые найдены в резюме
     - recs: навыки из JD, которых нет в резюме (рекомендации)
     """
-    jd_terms = extract_keywords(jd_text or "", 20)
-    cv_terms = extract_keywords(cv_text or "", 20)
-
-    jd_set, cv_set = set(jd_terms), set(cv_terms)
-    have = sorted(list(jd_set & cv_set))
-    recs = sorted([t for t in jd_terms if t not in cv_set])[:12]
-
-    # если есть networkx — строим граф
-    if nx is not None:
-        G = nx.Graph()
-        center = "Вы"
-        role = "Роль (JD)"
-        G.add_node(center, kind="person")
-        G.add_node(role, kind="role")
-        G.add_edge(center, role)
-
-        for s in have:
-            G.add_node(s, kind="have")
-            G.add_edge(center, s)
-        for s in recs:
-            G.add_node(s, kind="need")
-            G.add_edge(role, s)
-        return G, have, recs
-
-    # без networkx — вернём простую структуру
+    key = hashlib.sha1(f"{jd_text or ''}\x00{cv_text or ''}".encode("utf-8")).hexdigest()
+    with _RECO_LOCK:
+        hit = _RECO.get(key)
+        if hit is not None:
+            _RECO.move_to_end(key)
+    if hit is None:
+        jd_terms = extract_keywords(jd_text or "", 20)
+        cv_terms = extract_keywords(cv_text or "", 20)
+
+        jd_set, cv_set = set(jd_terms), set(cv_terms)
+        hit = (sorted(list(jd_set & cv_set)), sorted([t for t in jd_terms if t not in cv_set])[:12])
+        with _RECO_LOCK:
+            _RECO[key] = hit
+            while len(_RECO) > _RECO_MAX:
+                _RECO.popitem(last=False)
+    have, recs = list(hit[0]), list(hit[1])
+
     G = {"center": "Вы", "role": "Роль (JD)", "have": have, "need": recs}
-    return G, have, recs
+    # если есть networkx — строим граф, без него — вернём простую структуру
+    return (_to_graph(G) if nx is not None else G), have, recs
+
+
+def _to_graph(struct: dict):
+    G = nx.Graph()
+    center = struct.get("center", "Вы")
+    role = struct.get("role", "Роль (JD)")
+    G.add_node(center, kind="person")
+    G.add_node(role, kind="role")
+    G.add_edge(center, role)
+    for s in struct.get("have", []):
+        G.add_node(s, kind="have"); G.add_edge(center, s)
+    for s in struct.get("need", []):
+        G.add_node(s, kind="need"); G.add_edge(role, s)
+    return G
+
+
+def graph_key(G_or_struct: Any, target_role: str = "под JD") -> str:
+    """Хэш содержимого графа (узлы с типами, рёбра, подпись) — ключ кэша картинок."""
+    if isinstance(G_or_struct, dict):
+        body = {k: G_or_struct.get(k) for k in ("center", "role", "have", "need")}
+    else:
+        body = {"nodes": sorted((str(n), str(k)) for n, k in G_or_struct.nodes(data="kind")),
+                "edges": sorted(tuple(sorted((str(a), str(b)))) for a, b in G_or_struct.edges())}
+    body["title"] = target_role
+    return hashlib.sha1(json.dumps(body, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def render_stats() -> dict:
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[key] += n
+
+
+def _evict(keep: int = None) -> None:
+    """Оставить в кэше keep самых свежих PNG (mtime обновляется и при попадании в кэш)."""
+    keep = GRAPH_CACHE_MAX if keep is None else keep
+    try:
+        files = [e for e in os.scandir(GRAPH_CACHE_DIR) if e.is_file() and e.name.endswith(".png")
+                 and ".tmp." not in e.name]
+    except OSError:
+        return
+    if len(files) <= keep:
+        return
+    files.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    removed = 0
+    for e in files[max(0, keep):]:
+        try:
+            os.remove(e.path)
+            removed += 1
+        except OSError:
+            pass   # параллельный вызов уже удалил
+    _count("evicted", removed)
 
 
 def render_graph_png(G_or_struct: Any, target_role: str = "под JD") -> str:
@@ -95,16 +160,7 @@ def render_graph_png(G_or_struct: Any, target_role: str = "под JD") -> str:
 
     # Если пришла «структура», преобразуем в граф при наличии networkx
     if nx is not None and isinstance(G_or_struct, dict):
-        G = nx.Graph()
-        center = G_or_struct.get("center", "Вы")
-        role = G_or_struct.get("role", "Роль (JD)")
-        G.add_node(center, kind="person")
-        G.add_node(role, kind="role")
-        G.add_edge(center, role)
-        for s in G_or_struct.get("have", []):
-            G.add_node(s, kind="have"); G.add_edge(center, s)
-        for s in G_or_struct.get("need", []):
-            G.add_node(s, kind="need"); G.add_edge(role, s)
+        G = _to_graph(G_or_struct)
     else:
         G = G_or_struct
 
@@ -112,9 +168,21 @@ def render_graph_png(G_or_struct: Any, target_role: str = "под JD") -> str:
     if nx is None:
         return _placeholder_png("networkx недоступен — показываю заглушку")
 
+    # Тот же граф уже рисовали — отдаём готовый PNG (раскладка детерминирована seed=42)
+    path = os.path.join(GRAPH_CACHE_DIR, f"{graph_key(G, target_role)}.png")
+    if os.path.exists(path):
+        try:
+            os.utime(path)   # свежее использование — не кандидат на вытеснение
+            _count("cache_hits")
+            return path
+        except OSError:
+            pass   # успели вытеснить — рисуем заново
+    os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+    _count("renders")
+
     # Рендер через matplotlib
     pos = nx.spring_layout(G, seed=42, k=0.6)
-    path = _tmp_png("skillgraph")
+    tmp = path + f".{os.getpid()}.{threading.get_ident()}.tmp.png"
 
     plt.figure(figsize=(9, 5), dpi=120)
     kinds = nx.get_node_attributes(G, "kind")
@@ -143,6 +211,8 @@ def render_graph_png(G_or_struct: Any, target_role: str = "под JD") -> str:
     plt.title(f"SkillGraph {target_role}", fontsize=12)
     plt.axis("off")
     plt.tight_layout()
-    plt.savefig(path, bbox_inches="tight")
+    plt.savefig(tmp, bbox_inches="tight")
     plt.close()
+    os.replace(tmp, path)   # параллельный рендер того же графа не отдаст недописанный файл
+    _evict()
     return path
@@ -0,0 +1,171 @@
+# skillpilot/interview/pregrade.py
+"""
+Мгновенная локальная оценка ответа на интервью по измерениям RUBRIC — без LLM, за миллисекунды.
+
+  structure — есть ли в ответе части STAR (ситуация, задача, действие, результат);
+  specific  — цифры, единицы и названия метрик;
+  depth     — аргументация («потому что», «вместо», trade-off) и близость ответа к вопросу;
+  comms     — длина, длина предложений, слова-паразиты.
+
+Близость к вопросу и JD считается эмбеддером (core.embedder); если он недоступен —
+по пересечению основ слов. Это предварительный балл: подробный разбор по рубрике делает LLM
+(qa.grade_answer_stream), он приходит следом.
+"""
+import re
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.embedder import embed
+from .rubric import RUBRIC
+
+_WORD = re.compile(r"[0-9A-Za-zА-Яа-яЁё+#]+")
+_SENT = re.compile(r"[.!?…]+\s+|\n+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?\s*(?:%|x|х|k|к|млн|тыс|мс|ms|сек|s\b|мин|ч\b|час|дн|нед|мес|₽|\$|€)?", re.I)
+
+_STAR = {
+    "S": re.compile(r"ситуац|контекст|на проекте|в компании|в команде|когда |situation|context", re.I),
+    "T": re.compile(r"задач|цель|требовалось|нужно было|надо было|стояла|task|goal", re.I),
+    "A": re.compile(r"\bя\s+\w+л[аи]?\b|сделал|внедрил|реализовал|построил|настроил|провёл|провел|разработал|"
+                    r"предложил|написал|автоматизировал|action|implemented|built|designed", re.I),
+    "R": re.compile(r"результат|в итоге|итог|удалось|снизил|увеличил|вырос|сократил|ускорил|улучшил|"
+                    r"result|improved|reduced|increased", re.I),
+}
+_STAR_NAMES = {"S": "Ситуация", "T": "Задача", "A": "Действие", "R": "Результат"}
+_METRIC = re.compile(r"\b(?:auc|roc|f1|precision|recall|accuracy|mae|rmse|mape|ctr|cr|ltv|arpu|nps|rps|qps|"
+                     r"latency|p95|p99|sla|retention|конверси\w*|выручк\w*|отток\w*|метрик\w*|точност\w*|"
+                     r"задержк\w*|аптайм\w*)\b", re.I)
+_REASON = re.compile(r"потому что|так как|поэтому|из-за|чтобы|вместо|компромисс|альтернатив|выбрал|"
+                     r"trade-?off|because|therefore|instead", re.I)
+_FILLER = re.compile(r"\b(?:ну|как бы|типа|короче|в общем|вообще-то|эм+|um+|like)\b", re.I)
+
+_LABELS = {"structure": "Структура (STAR)", "specific": "Конкретика и метрики",
+           "depth": "Глубина и аргументация", "comms": "Ясность изложения"}
+
+# эмбеддер не загрузился один раз (офлайн/нет модели) — дальше сразу лексика, без повторных попыток
+_EMBED_OK = [True]
+
+
+def _stems(text: str) -> set:
+    # грубый стемминг: первые 5 букв — «метрику»/«метрики», «модели»/«модель» совпадают
+    return {w.lower()[:5] for w in _WORD.findall(text or "") if len(w) > 2}
+
+
+def _relevance(answer: str, refs: List[str], embed_fn: Callable) -> List[float]:
+    """Близость ответа к каждому из refs в [0, 1]; пустой ref — 0."""
+    live = [r for r in refs if (r or "").strip()]
+    out = {}
+    if live and (_EMBED_OK[0] or embed_fn is not embed):
+        try:
+            M = embed_fn([answer] + live)
+            out = {r: float(max(0.0, min(1.0, M[0] @ M[i + 1]))) for i, r in enumerate(live)}
+        except Exception:
+            if embed_fn is embed:
+                _EMBED_OK[0] = False
+    if live and not out:
+        aw = _stems(answer)
+        out = {r: len(aw & _stems(r)) / max(1, len(_stems(r))) for r in live}
+    return [out.get(r, 0.0) for r in refs]
+
+
+def pregrade(question: str, answer: str, jd: str = "", embed_fn: Callable = embed) -> dict:
+    """
+    Предварительная оценка: {"score": 0..100, "dims": {измерение RUBRIC: 0..100},
+    "star": {S/T/A/R: bool}, "relevance": {"question", "jd"}, "hints": [...], "ms": время}.
+    """
+    t0 = time.perf_counter()
+    answer = (answer or "").strip()
+    if not answer:
+        return {"score": 0, "dims": {k: 0 for k in RUBRIC}, "star": {k: False for k in _STAR},
+                "relevance": {"question": 0.0, "jd": 0.0}, "hints": ["Ответ пустой."], "ms": 0.0}
+
+    words = _WORD.findall(answer)
+    sents = [s for s in _SENT.split(answer) if s.strip()]
+    star = {k: bool(rx.search(answer)) for k, rx in _STAR.items()}
+    numbers = len(_NUMBER.findall(answer))
+    metrics = len(_METRIC.findall(answer))
+    reasons = len(_REASON.findall(answer))
+    fillers = len(_FILLER.findall(answer))
+    rel_q, rel_jd = _relevance(answer, [question or "", jd or ""], embed_fn)
+
+    avg_sent = len(words) / max(1, len(sents))
+    comms = 100
+    if len(words) < 40:
+        comms -= 40 * (40 - len(words)) // 40
+    elif len(words) > 300:
+        comms -= 20
+    if avg_sent > 30:
+        comms -= 20
+    comms -= min(40, 10 * fillers)
+
+    dims = {
+        "structure": 25 * sum(star.values()),
+        "specific": min(100, 25 * min(numbers, 3) + 15 * min(metrics, 2)),
+        "depth": round(50 * min(1.0, reasons / 2) + 50 * rel_q),
+        "comms": max(0, comms),
+    }
+    dims = {k: dims.get(k, 0) for k in RUBRIC}
+    rel = max(rel_q, (rel_q + rel_jd) / 2) if jd else rel_q
+    score = round(0.85 * sum(dims.values()) / max(1, len(dims)) + 15 * rel)
+
+    hints = [f"Нет части «{_STAR_NAMES[k]}»." for k, ok in star.items() if not ok]
+    if not numbers:
+        hints.append("Нет цифр: добавьте масштаб и результат (%, время, деньги).")
+    if not reasons:
+        hints.append("Объясните, почему выбрали именно это решение.")
+    if len(words) < 40:
+        hints.append("Ответ слишком короткий.")
+    if fillers:
+        hints.append(f"Слова-паразиты: {fillers}.")
+    if question and rel_q < 0.15:
+        hints.append("Ответ слабо связан с вопросом.")
+    return {"score": max(0, min(100, score)), "dims": dims, "star": star,
+            "relevance": {"question": round(rel_q, 2), "jd": round(rel_jd, 2)},
+            "hints": hints, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+def format_pregrade(res: dict) -> str:
+    """Короткий текст для UI: общий балл, измерения, подсказки."""
+    lines = [f"⚡ Предварительная оценка: {res['score']}/100 (локально, {res['ms']:.0f} мс)"]
+    for k, v in res["dims"].items():
+        lines.append(f"- {_LABELS.get(k, k)}: {v}")
+    star = " ".join(("✓" if ok else "✗") + k for k, ok in res["star"].items())
+    lines.append(f"- STAR: {star} · близость к вопросу {res['relevance']['question']:.2f}")
+    if res["hints"]:
+        lines.append("Подсказки: " + " ".join(res["hints"]))
+    return "\n".join(lines)
+
+
+# ---------- транскрипт мок-интервью ----------
+_Q_MARK = re.compile(r"^\s*(?:вопрос|в|q|question|интервьюер|interviewer)\s*\d*\s*[:.)\-—]\s*", re.I)
+_A_MARK = re.compile(r"^\s*(?:ответ|о|a|answer|кандидат|candidate)\s*\d*\s*[:.)\-—]\s*", re.I)
+
+
+def parse_transcript(text: str) -> List[Tuple[str, str]]:
+    """
+    Пары (вопрос, ответ) из транскрипта вида «В: … / О: …» (также Q:/A:, Вопрос:/Ответ:,
+    Интервьюер:/Кандидат:). Ответ может занимать несколько строк — до следующего вопроса.
+    """
+    pairs: List[List[str]] = []
+    mode = None
+    for line in (text or "").splitlines():
+        if _Q_MARK.match(line):
+            pairs.append([_Q_MARK.sub("", line, count=1).strip(), ""])
+            mode = "q"
+        elif _A_MARK.match(line) and pairs:
+            pairs[-1][1] = (pairs[-1][1] + "\n" + _A_MARK.sub("", line, count=1)).strip()
+            mode = "a"
+        elif line.strip() and pairs:
+            i = 0 if mode == "q" else 1
+            pairs[-1][i] = (pairs[-1][i] + "\n" + line.strip()).strip()
+    return [(q, a) for q, a in pairs if q or a]
+
+
+def grade_transcript(text: str, jd: str = "", embed_fn: Callable = embed) -> dict:
+    """Локальная оценка всех ответов транскрипта: {"items": [{question, answer, ...pregrade}], "score": среднее}."""
+    items = [dict(pregrade(q, a, jd, embed_fn), question=q, answer=a) for q, a in parse_transcript(text)]
+    scores = [it["score"] for it in items]
+    avg: Optional[float] = round(float(np.mean(scores)), 1) if scores else None
+    dims = {k: round(float(np.mean([it["dims"][k] for it in items])), 1) for k in RUBRIC} if items else {}
+    return {"items": items, "score": avg, "dims": dims}
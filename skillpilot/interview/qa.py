@@ -1,12 +1,107 @@
+import re
+import json
+import hashlib
+from ..config import QUESTIONS_CACHE
 from ..core.extractor import detect_lang
 from .rubric import RUBRIC
-from ..gen.llm import llm
-def gen_questions(jd: str, n: int = 5):
+from ..gen.llm import llm, llm_stream
+from ..gen import llm_cache
+from ..gen.compact import compact_jd
+from ..gen.docsession import doc_session
+
+QUESTION_WORDS_MAX = 20
+_QUOTED = re.compile(r'"((?:[^"\\]|\\.){8,})"')
+
+
+class QuestionsError(Exception):
+    """LLM не дала вопросов: в str(e) — её текст ошибки ([OFFLINE]/[OLLAMA ERROR]/[BUSY]…)."""
+
+
+def _questions_schema(n: int) -> dict:
+    """JSON-схема для format Ollama: ровно n строк в "questions"."""
+    return {"type": "object", "required": ["questions"],
+            "properties": {"questions": {"type": "array", "items": {"type": "string"},
+                                         "minItems": n, "maxItems": n}}}
+
+
+def _parse_questions(txt: str, n: int) -> list:
+    """Вопросы из JSON-ответа; обрезанный/нестрогий JSON — по строкам в кавычках, затем по строкам."""
+    qs = None
+    for cand in (txt, txt + "]}", txt + '"]}'):
+        try:
+            data = json.loads(cand[cand.index("{"):])
+            qs = data.get("questions") if isinstance(data, dict) else None
+            break
+        except (ValueError, AttributeError):
+            continue
+    if not isinstance(qs, list):
+        qs = [json.loads(f'"{m}"') for m in _QUOTED.findall(txt) if m != "questions"] \
+            or [q for q in txt.split("\n") if q.strip() and not q.rstrip().endswith(":")]
+    out = []
+    for q in qs:
+        q = " ".join(str(q).split()).strip('- •0123456789.)"')
+        if q and q not in out:
+            out.append(" ".join(q.split()[:QUESTION_WORDS_MAX]))
+    return out[:n]
+
+
+def _cache_key(jd: str, resume: str, n: int) -> str:
+    return "questions:" + hashlib.sha1(json.dumps(["v1", n, jd.strip(), resume.strip()],
+                                                  ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def cached_questions(jd: str, n: int = 5, resume: str = ""):
+    """
+    Вопросы из кэша по хэшу JD (и резюме) без вызова LLM; None — если их ещё не генерировали
+    (или запись в кэше не список строк — тогда это промах, а не ошибка).
+    """
+    if not QUESTIONS_CACHE or not (jd or "").strip():
+        return None
+    hit = llm_cache.get(_cache_key(jd, resume, n))
+    try:
+        qs = json.loads(hit) if hit else None
+    except ValueError:
+        return None
+    if not isinstance(qs, list) or not qs or not all(isinstance(q, str) for q in qs):
+        return None
+    return qs
+
+
+def gen_questions(jd: str, n: int = 5, resume: str = "", **llm_kw):
+    """
+    Ровно n коротких вопросов одним вызовом: ответ — JSON {"questions": [...]}
+    (для Ollama форма задана схемой, длина ответа ограничена max_tokens).
+    Готовый список кэшируется по хэшу JD (и резюме) на диске: повторные клики и
+    другие сессии получают его без LLM; regenerate=True — сгенерировать заново.
+    С resume — в сессии документа (общий префикс с резюме/cover, см. gen.docsession).
+    Ошибка LLM ([OFFLINE]/[BUSY]/…) — QuestionsError, а не список из одного «вопроса».
+    """
     if not jd: return []
-    system = "Интервьюер. Краткие вопросы по JD."
-    txt = llm(system, f"Сгенерируй {n} вопросов по JD: {jd}", max_tokens=400)
-    qs = [q.strip('- •0123456789. ') for q in txt.split('\n') if q.strip()]
-    if qs: return qs[:n]
+    use_cache = QUESTIONS_CACHE and llm_kw.get("cache") is not False
+    if use_cache and not llm_kw.get("regenerate"):
+        hit = cached_questions(jd, n, resume)
+        if hit:
+            return hit
+    ask = (f"Составь ровно {n} коротких вопросов для интервью по JD"
+           f"{' с учётом опыта кандидата' if resume else ''}. Каждый вопрос — одно предложение, "
+           f"не длиннее {QUESTION_WORDS_MAX} слов. Ответ строго JSON без пояснений: "
+           f'{{"questions": ["вопрос 1", …, "вопрос {n}"]}}')
+    kw = dict(llm_kw, task="questions", fmt=_questions_schema(n), stop=["]}"],
+              max_tokens=40 * n + 30, cache=False)
+    if resume:
+        doc = doc_session(resume, jd)
+        system, prompt = doc.prompt(ask)
+        txt = llm(system, prompt, doc=doc, **kw)
+    else:
+        system = "Ты интервьюер. Всегда отвечай НА РУССКОМ ЯЗЫКЕ и только JSON."
+        txt = llm(system, f"JD:\n{compact_jd(jd)}\n\n{ask}", **kw)
+    if (txt or "").strip() and not llm_cache.cacheable_text(txt):
+        raise QuestionsError(txt.strip())   # не подменяем ошибку шаблонными вопросами
+    qs = _parse_questions(txt, n)
+    if qs:
+        if use_cache and len(qs) == n:
+            llm_cache.put(_cache_key(jd, resume, n), json.dumps(qs, ensure_ascii=False))
+        return qs
     lang = detect_lang(jd)
     return (["Расскажите о проекте и оценке качества?","Какие метрики и почему?",
              "Опишите пайплайн фичеризации.","Что делать при переобучении?","Как проведёте A/B тест?"]
@@ -16,4 +111,20 @@ def gen_questions(jd: str, n: int = 5):
 def grade_answer(question: str, answer: str):
     system = "Оценщик. Разбор по рубрике и балл 0-100."
     prompt = f"Вопрос: {question}\nОтвет: {answer}\nРубрика: {RUBRIC}"
-    return llm(system, prompt, max_tokens=400)
+    return llm(system, prompt, task="grade")
+
+
+def grade_answer_stream(question: str, answer: str, jd: str = "", pre: dict = None, **llm_kw):
+    """
+    Стрим разбора по рубрике. pre — локальная оценка (interview.pregrade): LLM видит её баллы
+    и подсказки и уточняет их, а не считает всё с нуля.
+    """
+    system = "Оценщик интервью. Всегда отвечай НА РУССКОМ ЯЗЫКЕ. Разбор по рубрике и балл 0-100."
+    prompt = f"Вопрос: {question}\nОтвет: {answer}\nРубрика: {RUBRIC}"
+    if jd:
+        prompt += f"\nВакансия (JD): {compact_jd(jd)}"
+    if pre:
+        prompt += (f"\nАвтоматическая предварительная оценка: {pre['score']}/100, по измерениям {pre['dims']}; "
+                   f"замечания: {' '.join(pre['hints']) or 'нет'}. Подтверди или поправь её и объясни, "
+                   f"что улучшить в ответе.")
+    return llm_stream(system, prompt, task="grade", **llm_kw)
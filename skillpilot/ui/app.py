@@ -1,20 +1,29 @@
 # skillpilot/ui/app.py
-import os, io, re, tempfile, time, zipfile, json, datetime
+import os, io, re, tempfile, time, zipfile, json, datetime, threading
+from contextlib import contextmanager
 import gradio as gr
 
-from ..config import LLM_BACKEND, OLLAMA_MODEL, EMB_MODEL
-from ..core.scorer import score_fit
-from ..gen.resume import make_tailored_resume
-from ..gen.cover import make_cover
-from ..gen.plan import make_7day_plan
-from ..interview.qa import gen_questions, grade_answer
+from ..config import LLM_BACKEND, OLLAMA_MODEL, EMB_MODEL, BATCH_WORKERS, LLM_PARALLEL
+from ..core.scorer import score_fit, score_breakdown
+from ..gen.resume import make_tailored_resume_stream
+from ..gen.cover import make_cover_stream
+from ..gen.plan import make_7day_plan_stream
+from ..gen.package import generate_package
+from ..interview.qa import gen_questions, cached_questions, grade_answer_stream, QuestionsError
+from ..interview.pregrade import pregrade, format_pregrade, grade_transcript
 from ..graph.skill_graph import demo_graph_reco, render_graph_png
 from ..utils.export import export_md, export_pdf
-from ..gen.llm_ollama import is_available as ollama_up
-from ..gen.llm import llm_stream
+from ..gen.llm_ollama import is_available as ollama_up, pool_stats, model_state, start_warmup
+from ..gen.llm import llm_stream, routing_stats
+from ..gen.cancel import CancelToken
+from ..gen.scheduler import SCHEDULER
+from ..gen.compact import stats as compact_stats
+from ..gen.docsession import last_session as last_doc_session
+from ..gen.telemetry import summary_md as telemetry_md
 from ..utils.pii import anonymize
 
-from ..utils.batch import batch_score, read_any_to_text
+from ..utils.jobs import BatchJob, list_jobs
+from ..utils.genjobs import GEN_FIELDS, GenJob, start_gen_job, list_gen_jobs
 from ..utils.viz import radar_coverage, heat_coverage
 from ..utils.ats import ats_check
 from ..utils.whatif import delta_scores
@@ -41,9 +50,105 @@ def _list_sessions() -> list[str]:
         return []
 
 
+# ---------------- отмена генераций ----------------
+# (session_hash, группа) → токены запущенных генераций; «Стоп» отменяет их и закрывает HTTP к LLM
+_RUNNING: dict[tuple, set] = {}
+_RUNNING_LOCK = threading.Lock()
+
+
+def _sid(request) -> str:
+    return getattr(request, "session_hash", None) or "local"
+
+
+@contextmanager
+def _generation(request, group: str = "gen"):
+    token = CancelToken()
+    key = (_sid(request), group)
+    with _RUNNING_LOCK:
+        _RUNNING.setdefault(key, set()).add(token)
+    try:
+        yield token
+    finally:
+        token.cancel()  # генератор закрыт Gradio (отмена/разрыв) — соединение тоже закрываем
+        with _RUNNING_LOCK:
+            active = _RUNNING.get(key)
+            if active is not None:
+                active.discard(token)
+                if not active:
+                    _RUNNING.pop(key, None)
+
+
+def _stop_generations(request, group: str = "gen") -> None:
+    with _RUNNING_LOCK:
+        tokens = list(_RUNNING.pop((_sid(request), group), ()))
+    for token in tokens:
+        token.cancel()
+
+
+# ---------------- batch jobs ----------------
+def _job_choices() -> list[str]:
+    try:
+        return [f"{m['id']} · {m.get('status', '?')} · {m.get('done', 0)}" for m in list_jobs()]
+    except Exception:
+        return []
+
+def _job_id(choice: str | None) -> str:
+    return (choice or "").split(" · ", 1)[0].strip()
+
+
+BATCH_PAGE_SIZE = 50
+
+
+def _job_page(job_id: str, page: int, query: str = "", min_score=None, hide_dups: bool = False):
+    """Одна страница результатов задачи: (table, page, info). page — 1-based, как в UI."""
+    if not job_id:
+        return [], 1, ""
+    job = BatchJob.load(job_id)
+    page = max(1, int(page or 1))
+    ms = float(min_score) if min_score not in (None, "") else None
+    rows, total = job.page(page - 1, BATCH_PAGE_SIZE, query=query, min_score=ms, hide_duplicates=bool(hide_dups))
+    pages = max(1, -(-total // BATCH_PAGE_SIZE))
+    if page > pages:
+        page = pages
+        rows, total = job.page(page - 1, BATCH_PAGE_SIZE, query=query, min_score=ms, hide_duplicates=bool(hide_dups))
+    table = [[r["resume"], r["score"], ", ".join(r.get("strengths") or []), ", ".join(r.get("gaps") or []),
+              r.get("duplicate_of") or ""]
+             for r in rows]
+    info = f"Задача `{job.id}` · найдено {total} · страница {page} из {pages}"
+    return table, page, info
+
+
+def _job_csv(job: BatchJob) -> str:
+    outdir = tempfile.mkdtemp(prefix="skillpilot_batch_")
+    return job.export(os.path.join(outdir, f"batch_{job.id}.csv"), "csv")
+
+
+def _gen_choices() -> list[str]:
+    try:
+        return [f"{m['id']} · {m.get('status', '?')} · {m.get('done', 0)}/{m.get('total', 0)}"
+                for m in list_gen_jobs()]
+    except Exception:
+        return []
+
+
+def _gen_progress(job_id: str) -> str:
+    if not job_id:
+        return ""
+    try:
+        p = GenJob.load(job_id).progress()
+    except FileNotFoundError:
+        return ""
+    pct = 100 * (p["done"] + p["failed"]) // max(1, p["total"])
+    bar = "█" * (pct // 10) + "░" * (10 - pct // 10)
+    state = "идёт" if p["running"] else p["status"]
+    fail = f" · с ошибкой {p['failed']}" if p["failed"] else ""
+    return f"Генерация `{p['id']}`: {bar} {p['done']}/{p['total']} ({state}){fail}"
+
+
 # ---------------- helpers ----------------
-def _bundle_artifacts(tailored_text: str, cover_text: str, plan_text: str, jd_text: str, resume_text: str) -> str | None:
-    if not any([tailored_text, cover_text, plan_text, jd_text, resume_text]):
+def _bundle_artifacts(tailored_text: str, cover_text: str, plan_text: str, jd_text: str, resume_text: str,
+                      questions_text: str = "") -> str | None:
+    if not any([tailored_text, cover_text, plan_text, jd_text, resume_text, questions_text]):
         return None
     tmpdir = tempfile.mkdtemp(prefix="skillpilot_pkg_")
     files = []
@@ -61,6 +166,7 @@ def _bundle_artifacts(tailored_text: str, cover_text: str, plan_text: str, jd_te
     _write("resume_tailored.txt", tailored_text)
     _write("cover_letter.txt", cover_text)
     _write("7day_plan.txt", plan_text)
+    _write("interview_questions.txt", questions_text)
 
     if not files:
         return None
@@ -137,19 +243,27 @@ def _read_any(file_obj) -> str:
         return "[ERROR] Не удалось декодировать файл как UTF-8."
 
 
-# ---------- streaming helper (визуальный стрим) ----------
-def _yield_chunks(text: str, chunk: int = 48, delay: float = 0.015):
-    """Простой «визуальный» стрим (без реального онлайнового токен-стрима)."""
-    text = (text or "").strip()
+# ---------- streaming helper ----------
+def _stream_into(chunks, do_stream: bool = True):
+    """
+    Накопление кусков из *_stream-генераторов для Gradio-поля.
+    do_stream=True — обновляем поле на каждом куске (видим первый токен сразу),
+    иначе — один итоговый yield.
+    """
     acc = ""
-    for i in range(0, len(text), chunk):
-        acc = text[: i + chunk]
-        time.sleep(delay)
-        yield acc
+    for chunk in chunks:
+        if not chunk:
+            continue
+        acc += chunk
+        if do_stream:
+            yield acc
+    yield acc.strip()
 
 
 # ---------------- UI ----------------
 def ui():
+    if (LLM_BACKEND or "").lower() == "ollama":
+        start_warmup()  # модель грузится в фоне, пока поднимается UI — первый пользователь не ждёт загрузки
     theme = gr.themes.Soft(primary_hue="blue", secondary_hue="slate", neutral_hue="slate")
 
     CSS_LIGHT = """
@@ -380,6 +494,66 @@ def ui():
                 )
             with gr.Column(scale=2):
                 backend = (f"Ollama · {OLLAMA_MODEL}" if (LLM_BACKEND or "").lower() == "ollama" else (LLM_BACKEND or "—").upper())
+                def _queue_line():
+                    q = SCHEDULER.stats()
+                    return (f'<div style="margin-top:4px">🧵 Очередь LLM: {q["active"]}/{q["slots"]} слотов заняты, '
+                            f'ждут {q["queued"]} · ожидание avg {q["wait_avg"]:.1f}s / p95 {q["wait_p95"]:.1f}s</div>')
+
+                def _warm_line():
+                    states = model_state()
+                    many = len(pool_stats()) > 1
+                    named = len({st["model"] for st in states}) > 1
+                    parts = []
+                    for st in states:
+                        who = st["url"].split("//")[-1] + ": " if many else ""
+                        what = f'модель {st["model"]}' if named else "модель"
+                        left = st["expires_in"]
+                        if not st["loaded"]:
+                            parts.append(f"❄️ {who}{what} не загружена")
+                        elif left is None or left > 86400:   # keep_alive=-1 — бессрочно
+                            parts.append(f"🔥 {who}{what} в памяти")
+                        else:
+                            parts.append(f"🔥 {who}{what} в памяти ещё {max(0, int(left // 60))} мин")
+                    return f'<div style="margin-top:4px">{" · ".join(parts)}</div>' if parts else ""
+
+                def _nodes_line():
+                    nodes = pool_stats()
+                    if len(nodes) < 2:
+                        return ""
+                    items = " · ".join(
+                        f'{"⛔" if n["ejected"] else ("🟢" if n["healthy"] else "🔴")} '
+                        f'{n["url"].split("//")[-1]} ({n["outstanding"]} в работе'
+                        f'{", модель загружена" if any(m.split(":")[0] == OLLAMA_MODEL.split(":")[0] for m in n["models"]) else ""})'
+                        for n in nodes)
+                    return f'<div style="margin-top:4px">🖧 Узлы: {items}</div>'
+
+                def _route_line():
+                    r = routing_stats()
+                    if len({m for per in r.values() for m in per}) < 2:
+                        return ""
+                    items = " · ".join(
+                        f'{task}: ' + ", ".join(f'{m} ×{v.get("calls", 0)}'
+                                                + (f' ~{v["latency"]:.0f}s' if "latency" in v else "")
+                                                for m, v in per.items())
+                        for task, per in sorted(r.items()))
+                    return f'<div style="margin-top:4px">🧭 Модели по задачам: {items}</div>'
+
+                def _compact_line():
+                    c = compact_stats()
+                    if not c["compacted"]:
+                        return ""
+                    return (f'<div style="margin-top:4px">✂️ Сжатие промптов: сэкономлено ~{c["tokens_saved"]} токенов '
+                            f'({c["compacted"]} из {c["calls"]} входов сокращено)</div>')
+
+                def _doc_line():
+                    doc = last_doc_session()
+                    if doc is None or not doc.calls:
+                        return ""
+                    d = doc.stats()
+                    seq = " → ".join(str(t) for t in d["prefill_tokens"][-6:])
+                    return (f'<div style="margin-top:4px">♻️ Общий префикс резюме+JD (~{d["prefix_tokens"]} ток., '
+                            f'num_ctx {d["num_ctx"]}): prefill по вызовам {seq}</div>')
+
                 def _llm_status():
                     if (LLM_BACKEND or "").lower() == "ollama":
                         ok = ollama_up()
@@ -390,6 +564,12 @@ def ui():
                           <div class="sp-pill">Embeddings: {EMB_MODEL}</div>
                           <div class="sp-pill">UI: Gradio</div>
                           <div style="margin-top:8px">{dot} <b>Ollama</b> status: {"online" if ok else "offline"}</div>
+                          {_warm_line()}
+                          {_nodes_line()}
+                          {_queue_line()}
+                          {_route_line()}
+                          {_compact_line()}
+                          {_doc_line()}
                         </div>"""
                     else:
                         return f"""
@@ -398,6 +578,9 @@ def ui():
                           <div class="sp-pill">Embeddings: {EMB_MODEL}</div>
                           <div class="sp-pill">UI: Gradio</div>
                           <div style="margin-top:8px">ℹ️ Для OpenAI-совместимых эндпоинтов прогресс виден в баре действий.</div>
+                          {_queue_line()}
+                          {_compact_line()}
+                          {_doc_line()}
                         </div>"""
                 status_html = gr.HTML(value=_llm_status(), elem_classes=["sp-card"])
                 gr.Button("↻ Проверить LLM").click(lambda: _llm_status(), outputs=status_html)
@@ -425,8 +608,41 @@ def ui():
                     files_in = gr.Files(label="Или выберите несколько файлов", type="filepath")
                 with gr.Row():
                     btn_batch = gr.Button("Скоринг пачки", variant="primary")
-                batch_table = gr.Dataframe(headers=["resume","score","strengths","gaps"], interactive=False, wrap=True)
+                with gr.Row():
+                    batch_query = gr.Textbox(label="Фильтр (имя / навык)", placeholder="python")
+                    batch_min_score = gr.Number(label="Мин. score", value=None)
+                    batch_hide_dups = gr.Checkbox(value=True, label="Скрыть дубли")
+                    btn_pg_apply = gr.Button("Применить", variant="secondary")
+                batch_table = gr.Dataframe(headers=["resume","score","strengths","gaps","duplicate_of"], interactive=False, wrap=True)
+                with gr.Row():
+                    btn_pg_prev = gr.Button("◀")
+                    batch_page = gr.Number(value=1, label="Страница", precision=0, interactive=False)
+                    btn_pg_next = gr.Button("▶")
+                batch_info = gr.Markdown("")
+                batch_job = gr.State("")
                 csv_out = gr.File(label="Экспорт CSV", interactive=False)
+                gr.Markdown("Каждый прогон — задача с чекпоинтом: если прогон оборвался, его можно продолжить.")
+                with gr.Row():
+                    job_list = gr.Dropdown(choices=_job_choices(), label="Пакетные задачи", allow_custom_value=False)
+                    btn_jobs_refresh = gr.Button("🔄 Обновить список")
+                    btn_job_resume = gr.Button("▶️ Продолжить задачу", variant="secondary")
+                    btn_job_fetch = gr.Button("⬇️ Результаты задачи", variant="secondary")
+                gr.Markdown("Генерации для шорт-листа: резюме, сопроводительные и вопросы для топ-N кандидатов "
+                            "текущей задачи — в фоне, с низким приоритетом, готовое сохраняется сразу.")
+                with gr.Row():
+                    gen_top = gr.Number(value=10, label="Топ-N", precision=0, minimum=1)
+                    gen_fields = gr.CheckboxGroup(choices=[(v[0], k) for k, v in GEN_FIELDS.items()],
+                                                  value=list(GEN_FIELDS), label="Что сгенерировать")
+                    btn_gen_start = gr.Button("🚀 Сгенерировать для топ-N", variant="primary")
+                with gr.Row():
+                    gen_list = gr.Dropdown(choices=_gen_choices(), label="Задачи генерации", allow_custom_value=False)
+                    btn_gen_resume = gr.Button("▶️ Продолжить", variant="secondary")
+                    btn_gen_stop = gr.Button("⏹ Остановить", variant="stop")
+                    btn_gen_zip = gr.Button("⬇️ ZIP", variant="secondary")
+                gen_job = gr.State("")
+                gen_progress = gr.Markdown("")
+                gen_zip = gr.File(label="Результаты генерации (ZIP)", interactive=False)
+                gen_timer = gr.Timer(3)
 
             # ----- Анализ
             with gr.Tab("🧮 Анализ"):
@@ -456,7 +672,10 @@ def ui():
                     btn_tailor = gr.Button("Адаптировать резюме (STAR)", variant="primary", interactive=False)
                     btn_cover = gr.Button("Сгенерировать сопроводительное", variant="primary", interactive=False)
                     btn_plan = gr.Button("План на 7 дней", variant="secondary", interactive=False)
-                stream_out = gr.Checkbox(value=True, label="⚡️ Стримить вывод (визуально)", interactive=True, elem_id="stream_out")
+                    btn_all = gr.Button("🚀 Сгенерировать всё", variant="primary", interactive=False)
+                with gr.Row():
+                    stream_out = gr.Checkbox(value=True, label="⚡️ Стримить вывод", interactive=True, elem_id="stream_out")
+                    regen = gr.Checkbox(value=False, label="🔁 Перегенерировать (мимо кэша LLM)", interactive=True)
                 btn_stop = gr.Button("⏹️ Остановить генерацию", variant="stop")
 
                 tailored = gr.Textbox(label="Адаптированное резюме", lines=12, elem_classes=["sp-card"])
@@ -507,11 +726,22 @@ def ui():
             # ----- Мини-интервью
             with gr.Tab("🎤 Мини-интервью"):
                 qlist = gr.Textbox(label="Сгенерированные вопросы (5 шт.)", lines=8, elem_classes=["sp-card"])
+                with gr.Row():
+                    btn_questions = gr.Button("Сгенерировать вопросы по JD", variant="secondary")
+                    btn_questions_new = gr.Button("🔄 Другие вопросы", variant="secondary")
                 with gr.Row():
                     q = gr.Textbox(label="Вопрос", lines=2, elem_classes=["sp-card"])
                     a = gr.Textbox(label="Ваш ответ", lines=4, elem_classes=["sp-card"])
                 btn_grade = gr.Button("Оценить ответ", variant="primary")
                 grade = gr.Textbox(label="Фидбек по рубрике", lines=10, elem_classes=["sp-card"])
+                with gr.Accordion("📋 Транскрипт мок-интервью целиком", open=False):
+                    gr.Markdown("Формат: строки «В: вопрос» и «О: ответ» (или Q:/A:, Вопрос:/Ответ:). "
+                                "Оценка локальная и мгновенная, без LLM.")
+                    transcript = gr.Textbox(label="Транскрипт", lines=10, placeholder="В: Расскажите о проекте…\nО: В компании X я…")
+                    btn_transcript = gr.Button("Оценить транскрипт", variant="secondary")
+                    transcript_summary = gr.Markdown("")
+                    transcript_table = gr.Dataframe(headers=["#", "Вопрос", "Балл", "STAR", "Конкретика", "Глубина",
+                                                             "Ясность", "Подсказки"], interactive=False, wrap=True)
 
             # ----- Prompt-песочница
             with gr.Tab("🧪 Prompt-песочница"):
@@ -541,69 +771,127 @@ def ui():
                 with gr.Row():
                     sess_list = gr.Dropdown(choices=_list_sessions(), label="Загрузить сессию", allow_custom_value=False)
                     btn_refresh_sess = gr.Button("🔄 Обновить список")
+                with gr.Accordion("⏱️ Производительность LLM", open=False):
+                    gr.Markdown("TTFT — время до первого токена; «холодных» — вызовов, где Ollama загружала модель. "
+                                "Последние вызовы процесса, перцентили по задачам.")
+                    perf = gr.Markdown(telemetry_md())
+                    btn_perf = gr.Button("🔄 Обновить")
 
         # -------- handlers --------
 
         # демо + включение кнопок
         btn_demo.click(_load_demo, inputs=None, outputs=[jd, resume]) \
                 .then(lambda j, r: _update_buttons(j, r), inputs=[jd, resume],
-                      outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan])
+                      outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan, btn_all])
 
         # чтение файлов + включение кнопок
         btn_file2text.click(lambda f1, f2: (_read_any(f1), _read_any(f2)),
                             inputs=[jd_file, cv_file], outputs=[jd, resume]) \
                      .then(lambda j, r: _update_buttons(j, r), inputs=[jd, resume],
-                           outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan])
+                           outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan, btn_all])
 
         def _update_buttons(jd_text, cv_text):
             ok = _can_run(jd_text, cv_text)
             upd = gr.update(interactive=ok)
-            return upd, upd, upd, upd, upd
+            return (upd,) * 6
 
-        jd.change(_update_buttons, inputs=[jd, resume], outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan])
-        resume.change(_update_buttons, inputs=[jd, resume], outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan])
+        jd.change(_update_buttons, inputs=[jd, resume], outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan, btn_all])
+        resume.change(_update_buttons, inputs=[jd, resume], outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan, btn_all])
 
         btn_clear.click(lambda: ("", ""), inputs=None, outputs=[jd, resume])
-        btn_clear.click(lambda: (gr.update(interactive=False),)*5, inputs=None, outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan])
+        btn_clear.click(lambda: (gr.update(interactive=False),)*6, inputs=None, outputs=[btn_fit, btn_graph, btn_tailor, btn_cover, btn_plan, btn_all])
         btn_clear.click(lambda: ("", "", "", "", ""), inputs=None, outputs=[tailored, cover, plan, qlist, diag])
 
-        # ---- Пакетная проверка (handler)
-        def _do_batch(jd_text, zip_file, file_list, hide):
+        # ---- Пакетная проверка (handler): каждый прогон — задача с чекпоинтом;
+        # в таблицу уходит только одна страница, полный результат остаётся на диске
+        def _finish_job(job: BatchJob, query, min_score, hide_dups):
+            for _ in job.run(workers=BATCH_WORKERS):
+                pass
+            table, page, info = _job_page(job.id, 1, query, min_score, hide_dups)
+            return table, _job_csv(job), gr.update(choices=_job_choices()), job.id, page, info
+
+        def _do_batch(jd_text, zip_file, file_list, hide, query, min_score, hide_dups):
             if not (jd_text or "").strip():
-                return [], None
+                return [], None, gr.update(), "", 1, ""
             J = anonymize(jd_text) if hide else jd_text
-            resumes = []
+            paths = []
             if zip_file is not None:
-                try:
-                    with zipfile.ZipFile(zip_file.name, "r") as z:
-                        for nm in z.namelist():
-                            if nm.endswith("/") or nm.startswith("__MACOSX/"):
-                                continue
-                            with z.open(nm) as f:
-                                tmp = tempfile.NamedTemporaryFile(delete=False)
-                                tmp.write(f.read()); tmp.flush(); tmp.close()
-                                try:
-                                    txt = read_any_to_text(tmp.name)
-                                finally:
-                                    try: os.unlink(tmp.name)
-                                    except Exception: pass
-                                resumes.append((nm, anonymize(txt) if hide else txt))
-                except Exception:
-                    pass
-            if file_list:
-                for fp in file_list:
-                    path = fp if isinstance(fp, str) else getattr(fp, "name", "")
-                    name = os.path.basename(path)
-                    txt = read_any_to_text(path)
-                    resumes.append((name, anonymize(txt) if hide else txt))
-
-            if not resumes:
-                return [], None
-            rows, csv_path = batch_score(J, resumes)
-            table = [[r["resume"], r["score"], r["strengths"], r["gaps"]] for r in rows]
-            return table, csv_path
-
-        btn_batch.click(_do_batch, inputs=[jd, zip_in, files_in, hide_pii], outputs=[batch_table, csv_out])
+                paths.append(zip_file if isinstance(zip_file, str) else zip_file.name)
+            for fp in (file_list or []):
+                paths.append(fp if isinstance(fp, str) else getattr(fp, "name", ""))
+            paths = [p for p in paths if p and os.path.isfile(p)]
+            if not paths:
+                return [], None, gr.update(), "", 1, ""
+            job = BatchJob.create(J, paths, hide_pii=bool(hide), copy_sources=True)
+            return _finish_job(job, query, min_score, hide_dups)
+
+        def _resume_job(choice, query, min_score, hide_dups):
+            jid = _job_id(choice)
+            if not jid:
+                return [], None, gr.update(choices=_job_choices()), "", 1, ""
+            return _finish_job(BatchJob.load(jid), query, min_score, hide_dups)
+
+        def _fetch_job(choice, query, min_score, hide_dups):
+            jid = _job_id(choice)
+            if not jid:
+                return [], None, "", 1, ""
+            table, page, info = _job_page(jid, 1, query, min_score, hide_dups)
+            return table, _job_csv(BatchJob.load(jid)), jid, page, info
+
+        pg_filters = [batch_query, batch_min_score, batch_hide_dups]
+        btn_batch.click(_do_batch, inputs=[jd, zip_in, files_in, hide_pii] + pg_filters,
+                        outputs=[batch_table, csv_out, job_list, batch_job, batch_page, batch_info])
+        btn_job_resume.click(_resume_job, inputs=[job_list] + pg_filters,
+                             outputs=[batch_table, csv_out, job_list, batch_job, batch_page, batch_info])
+        btn_job_fetch.click(_fetch_job, inputs=[job_list] + pg_filters,
+                            outputs=[batch_table, csv_out, batch_job, batch_page, batch_info])
+
+        # ---- фоновые генерации для топ-N текущей пакетной задачи
+        def _gen_start(batch_id, choice, top_n, fields):
+            bid = batch_id or _job_id(choice)
+            if not bid or not fields:
+                return gr.update(), "", "Сначала выполните или выберите пакетную задачу."
+            job = start_gen_job(bid, int(top_n or 10), list(fields))
+            choices = _gen_choices()
+            current = next((c for c in choices if _job_id(c) == job.id), None)
+            return gr.update(choices=choices, value=current), job.id, _gen_progress(job.id)
+
+        def _gen_pick(choice):
+            jid = _job_id(choice)
+            return jid, _gen_progress(jid)
+
+        def _gen_resume(jid):
+            if jid:
+                GenJob.load(jid).start()
+            return _gen_progress(jid)
+
+        def _gen_stop(jid):
+            if jid:
+                GenJob.load(jid).cancel()
+            return _gen_progress(jid)
+
+        def _gen_zip(jid):
+            if not jid:
+                return None
+            outdir = tempfile.mkdtemp(prefix="skillpilot_genjob_")
+            return GenJob.load(jid).export_zip(os.path.join(outdir, f"genjob_{jid}.zip"))
+
+        btn_gen_start.click(_gen_start, inputs=[batch_job, job_list, gen_top, gen_fields],
+                            outputs=[gen_list, gen_job, gen_progress])
+        gen_list.change(_gen_pick, inputs=[gen_list], outputs=[gen_job, gen_progress])
+        btn_gen_resume.click(_gen_resume, inputs=[gen_job], outputs=[gen_progress])
+        btn_gen_stop.click(_gen_stop, inputs=[gen_job], outputs=[gen_progress])
+        btn_gen_zip.click(_gen_zip, inputs=[gen_job], outputs=[gen_zip])
+        gen_timer.tick(_gen_progress, inputs=[gen_job], outputs=[gen_progress])
+
+        pg_outputs = [batch_table, batch_page, batch_info]
+        btn_pg_prev.click(lambda jid, p, *f: _job_page(jid, int(p or 1) - 1, *f),
+                          inputs=[batch_job, batch_page] + pg_filters, outputs=pg_outputs)
+        btn_pg_next.click(lambda jid, p, *f: _job_page(jid, int(p or 1) + 1, *f),
+                          inputs=[batch_job, batch_page] + pg_filters, outputs=pg_outputs)
+        btn_pg_apply.click(lambda jid, *f: _job_page(jid, 1, *f),
+                           inputs=[batch_job] + pg_filters, outputs=pg_outputs)
+        btn_jobs_refresh.click(lambda: gr.update(choices=_job_choices()), inputs=None, outputs=[job_list])
 
         # ---- Анализ
         def do_fit(jd_text, cv_text, hide, progress=gr.Progress(track_tqdm=True)):
@@ -636,114 +924,129 @@ def ui():
 
         btn_wi.click(_do_whatif, inputs=[jd, resume, wi_terms, hide_pii], outputs=[wi_table])
 
-        # ---- Генерация (визуальный стрим)
-        def _gen_stream_wrapper(text: str):
-            yield from _yield_chunks(text)
-
-        def _guarded(gen_fn, j, r, do_stream: bool, hide: bool, progress=gr.Progress(track_tqdm=True)):
+        # ---- Генерация (настоящий токен-стрим из llm_stream)
+        def _guarded(gen_fn, j, r, do_stream: bool, hide: bool, regenerate: bool = False, request=None,
+                     progress=gr.Progress(track_tqdm=True)):
             if not _can_run(j, r):
                 yield "Сначала заполните JD и резюме."
                 return
             J = anonymize(j) if hide else j
             R = anonymize(r) if hide else r
-            progress(0.08, desc="🔧 Готовим промпт…")
-            time.sleep(0.05)
             progress(0.28, desc="🤖 Вызываем LLM…")
-            out = gen_fn(R, J)  # сигнатуры генераторов: (resume, jd)
-            progress(0.9, desc="✍️ Заполняем поле…")
-            if do_stream:
-                yield from _gen_stream_wrapper(out)
-            else:
-                yield out
+            with _generation(request) as token:
+                # сигнатуры генераторов: (resume, jd)
+                yield from _stream_into(gen_fn(R, J, cancel=token, regenerate=bool(regenerate),
+                                               session=_sid(request)), do_stream)
 
-        def _tailor_handler(j, r, st, hide):
-            yield from _guarded(make_tailored_resume, j, r, st, hide)
+        def _tailor_handler(j, r, st, hide, rg, request: gr.Request):
+            yield from _guarded(make_tailored_resume_stream, j, r, st, hide, rg, request)
 
-        def _cover_handler(j, r, st, hide):
-            yield from _guarded(make_cover, j, r, st, hide)
+        def _cover_handler(j, r, st, hide, rg, request: gr.Request):
+            yield from _guarded(make_cover_stream, j, r, st, hide, rg, request)
 
         tailor_evt = btn_tailor.click(_tailor_handler,
-                                      inputs=[jd, resume, stream_out, hide_pii],
+                                      inputs=[jd, resume, stream_out, hide_pii, regen],
                                       outputs=[tailored])
 
         cover_evt = btn_cover.click(_cover_handler,
-                                    inputs=[jd, resume, stream_out, hide_pii],
+                                    inputs=[jd, resume, stream_out, hide_pii, regen],
                                     outputs=[cover])
 
-        def _make_plan(j, r, do_stream: bool, hide: bool, progress=gr.Progress(track_tqdm=True)):
+        def _make_plan(j, r, do_stream: bool, hide: bool, role: str, rg: bool, request: gr.Request,
+                       progress=gr.Progress(track_tqdm=True)):
             if not _can_run(j, r):
                 yield "Сначала заполните JD и резюме."
                 return
             J = anonymize(j) if hide else j
             R = anonymize(r) if hide else r
-            progress(0.2, desc="📊 Анализируем JD/резюме…")
-            out = make_7day_plan(R, J)
-            progress(0.9, desc="✍️ Заполняем поле…")
-            if do_stream:
-                yield from _gen_stream_wrapper(out)
-            else:
-                yield out
-
-        plan_evt = btn_plan.click(_make_plan, inputs=[jd, resume, stream_out, hide_pii], outputs=[plan])
-
-        # Кнопка «Стоп»
-        btn_stop.click(lambda: None, inputs=None, outputs=None, cancels=[tailor_evt, cover_evt, plan_evt])
+            progress(0.2, desc="📊 Ищем пробелы JD/резюме…")
+            gaps_list = score_breakdown(J, R)["gaps"]
+            progress(0.4, desc="🤖 Вызываем LLM…")
+            with _generation(request) as token:
+                chunks = make_7day_plan_stream(gaps_list, role or "", cancel=token, regenerate=bool(rg),
+                                               session=_sid(request))
+                yield from _stream_into(chunks, do_stream)
+
+        plan_evt = btn_plan.click(_make_plan, inputs=[jd, resume, stream_out, hide_pii, role_hint, regen],
+                                  outputs=[plan])
+
+        # «Сгенерировать всё»: 4 генерации параллельно (до LLM_PARALLEL одновременно) + ZIP в конце
+        def _make_all(j, r, hide: bool, role: str, rg: bool, request: gr.Request):
+            if not _can_run(j, r):
+                msg = "Сначала заполните JD и резюме."
+                yield msg, msg, msg, msg, None
+                return
+            J = anonymize(j) if hide else j
+            R = anonymize(r) if hide else r
+            gaps_list = score_breakdown(J, R)["gaps"]
+            texts = {}
+            with _generation(request) as token:
+                for texts in generate_package(R, J, gaps_list, role or "", parallel=LLM_PARALLEL,
+                                              cancel=token, regenerate=bool(rg), session=_sid(request)):
+                    yield texts["tailored"], texts["cover"], texts["plan"], texts["questions"], None
+                stopped = token.cancelled
+            if not stopped:
+                zip_path = _bundle_artifacts(texts["tailored"], texts["cover"], texts["plan"], j, r,
+                                             texts["questions"])
+                yield texts["tailored"], texts["cover"], texts["plan"], texts["questions"], zip_path
+
+        all_evt = btn_all.click(_make_all, inputs=[jd, resume, hide_pii, role_hint, regen],
+                                outputs=[tailored, cover, plan, qlist, bundle_file])
+
+        # Кнопка «Стоп»: отменяем события Gradio и обрываем запросы к LLM
+        def _stop_gen(request: gr.Request):
+            _stop_generations(request)
+
+        btn_stop.click(_stop_gen, inputs=None, outputs=None, cancels=[tailor_evt, cover_evt, plan_evt, all_evt])
 
         # ---- Prompt-песочница (настоящий стрим из llm_stream)
-        def _run_prompt(system, user, temperature, max_tokens):
+        def _run_prompt(system, user, temperature, max_tokens, request: gr.Request):
             acc = ""
             try:
-                for chunk in llm_stream(system, user, temperature=temperature, max_tokens=int(max_tokens)):
-                    if chunk:
-                        acc += chunk
-                        yield acc
+                with _generation(request, "prompt") as token:
+                    # песочница — всегда живой ответ модели, без кэша
+                    for chunk in llm_stream(system, user, temperature=temperature, max_tokens=int(max_tokens),
+                                            cancel=token, cache=False,
+                                            priority="sandbox", session=_sid(request)):
+                        if chunk:
+                            acc += chunk
+                            yield acc
             except Exception as e:
                 yield f"[STREAM ERROR] {type(e).__name__}: {e}"
 
+        def _stop_prompt(request: gr.Request):
+            _stop_generations(request, "prompt")
+
         pp_evt = btn_run_pp.click(_run_prompt, inputs=[sys_box, usr_box, temp, mxtok], outputs=[out_pp])
-        btn_stop_pp.click(lambda: None, inputs=None, outputs=None, cancels=[pp_evt])
+        btn_stop_pp.click(_stop_prompt, inputs=None, outputs=None, cancels=[pp_evt])
 
         # ---- Навыки / Граф
-        def _graph_text(j, r, hide, progress=gr.Progress()):
+        def _graph(j, r, hide, progress=gr.Progress()):
+            # один расчёт графа на клик — и для текста, и для картинки (PNG кэшируется по хэшу графа)
             if not _can_run(j, r):
-                return "Сначала заполните JD и резюме."
+                return "Сначала заполните JD и резюме.", None
             J = anonymize(j) if hide else j
             R = anonymize(r) if hide else r
             progress(0.4, desc="🌐 Строим рекомендации…")
-            res = demo_graph_reco(J, R)
+            try:
+                res = demo_graph_reco(J, R)
+            except Exception as e:
+                return f"Не удалось построить граф: {e}", None
             try:
                 G, have, recs = res
                 txt = "Имеющиеся навыки: " + ", ".join(sorted(have)) + "\n" + \
                       "Рекомендуемые навыки: " + ", ".join(sorted(recs))
             except Exception:
-                txt = str(res)
-            progress(1.0)
-            return txt
-
-        def _graph_img(j, r, hide):
-            J = anonymize(j) if hide else j
-            R = anonymize(r) if hide else r
-            try:
-                res = demo_graph_reco(J, R)
-            except Exception:
-                res = None
-
-            if isinstance(res, tuple) and len(res) >= 1:
-                try:
-                    return render_graph_png(res[0], target_role="под JD")
-                except Exception:
-                    pass
+                G, txt = res, str(res)
+            progress(0.8, desc="🖼️ Рисуем граф…")
             try:
-                return render_graph_png(res, target_role="под JD")
+                img = render_graph_png(G, target_role="под JD")
             except Exception:
-                pass
-            try:
-                return render_graph_png(R, target_role="под JD")
-            except Exception:
-                return None
+                img = None
+            progress(1.0)
+            return txt, img
 
-        btn_graph.click(_graph_text, inputs=[jd, resume, hide_pii], outputs=[path_text])
-        btn_graph.click(_graph_img, inputs=[jd, resume, hide_pii], outputs=[graph_img])
+        btn_graph.click(_graph, inputs=[jd, resume, hide_pii], outputs=[path_text, graph_img])
 
         # ---- Визуализация
         def _parse_marks(diag_text: str):
@@ -829,10 +1132,53 @@ def ui():
         btn_exp_pdf.click(_export_pdf_resume, inputs=[tailored], outputs=[pdf_file])
 
         # ---- Q&A
-        btn_fit.click(lambda jd_text: ("\n".join(gen_questions(jd_text, 5)) if (jd_text or "").strip() else "Сначала вставьте JD."),
-                      inputs=[jd], outputs=[qlist])
-
-        btn_grade.click(lambda q_text, a_text: grade_answer(q_text, a_text), inputs=[q, a], outputs=[grade])
+        # вопросы — отдельной кнопкой (LLM-вызов), кэш по хэшу JD; «Оценить соответствие»
+        # только подставляет уже сгенерированные для этого JD, не дожидаясь модели
+        def _questions(jd_text, regenerate=False):
+            if not (jd_text or "").strip():
+                return "Сначала вставьте JD."
+            try:
+                qs = gen_questions(jd_text, 5, regenerate=regenerate)
+            except QuestionsError as e:   # ошибку LLM показываем как есть, а не «вопросом» под номером
+                return str(e)
+            return "\n".join(f"{i}. {q}" for i, q in enumerate(qs, 1))
+
+        def _questions_cached(jd_text, current):
+            qs = cached_questions(jd_text or "", 5)
+            return "\n".join(f"{i}. {q}" for i, q in enumerate(qs, 1)) if qs else current
+
+        btn_questions.click(_questions, inputs=[jd], outputs=[qlist])
+        btn_questions_new.click(lambda jd_text: _questions(jd_text, regenerate=True), inputs=[jd], outputs=[qlist])
+        btn_fit.click(_questions_cached, inputs=[jd, qlist], outputs=[qlist])
+
+        # мгновенная локальная оценка, затем — стрим разбора от LLM
+        def _grade(q_text, a_text, jd_text, request: gr.Request):
+            if not (a_text or "").strip():
+                yield "Сначала введите ответ."
+                return
+            pre = pregrade(q_text, a_text, jd_text or "")
+            head = format_pregrade(pre)
+            yield head + "\n\n⏳ Подробный разбор от LLM…"
+            text = ""
+            with _generation(request) as token:
+                for chunk in grade_answer_stream(q_text, a_text, jd_text or "", pre=pre, cancel=token,
+                                                 session=_sid(request)):
+                    text += chunk
+                    yield head + "\n\n" + text
+            yield head + "\n\n" + (text.strip() or "(LLM не ответила)")
+
+        def _grade_transcript(text, jd_text):
+            res = grade_transcript(text, jd_text or "")
+            if not res["items"]:
+                return "Не нашёл пар вопрос/ответ — проверьте формат «В: … / О: …».", []
+            rows = [[i, it["question"], it["score"], it["dims"].get("structure"), it["dims"].get("specific"),
+                     it["dims"].get("depth"), it["dims"].get("comms"), " ".join(it["hints"])]
+                    for i, it in enumerate(res["items"], 1)]
+            dims = ", ".join(f"{k} {v:.0f}" for k, v in res["dims"].items())
+            return f"**Средний балл: {res['score']:.0f}/100** · {len(rows)} ответов · {dims}", rows
+
+        btn_grade.click(_grade, inputs=[q, a, jd], outputs=[grade])
+        btn_transcript.click(_grade_transcript, inputs=[transcript, jd], outputs=[transcript_summary, transcript_table])
 
         # ---- Сохранение/загрузка сессий
         def _save_session(name, jd_text, resume_text, tailored_text, cover_text, plan_text):
@@ -852,6 +1198,7 @@ def ui():
                             outputs=[sess_list])
 
         btn_refresh_sess.click(lambda: gr.update(choices=_list_sessions()), inputs=None, outputs=[sess_list])
+        btn_perf.click(telemetry_md, inputs=None, outputs=[perf])
 
         def _load_session(sel_name):
             if not sel_name:
@@ -868,7 +1215,8 @@ def ui():
 
         # Footer
         gr.Markdown(
-            "⌛️ Первая генерация на «холодной» модели может быть дольше; повторы быстрее благодаря keep_alive.",
+            "⌛️ Модель прогревается при старте и в рабочие часы (`OLLAMA_WARM_HOURS`) не выгружается; "
+            "вне их первая генерация на «холодной» модели может быть дольше.",
             elem_classes=["sp-card"]
         )
 
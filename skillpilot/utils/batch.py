@@ -1,7 +1,17 @@
 # skillpilot/utils/batch.py
-import os, io, zipfile, csv, tempfile, re
-from typing import List, Tuple
-from ..core.scorer import score_fit
+import os, io, zipfile, csv, tempfile, re, glob, json, heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, Iterator, List, Optional, Tuple
+from ..core.scorer import score_fit, score_breakdown
+from .ingest import read_any
+
+# поля строки батча (порядок = порядок колонок CSV)
+ROW_FIELDS = [
+    "resume", "score", "semantic", "overlap", "penalty",
+    "missing_critical", "strengths", "gaps", "duplicate_of", "similarity",
+]
+# что считаем резюме при обходе директории/glob
+RESUME_EXTS = (".txt", ".md", ".pdf", ".docx")
 
 _TXT_RE = re.compile(rb"[\x09\x0A\x0D\x20-\x7E\xA0-\xFF]+")
 
@@ -28,29 +38,199 @@ def _iter_zip_texts(zip_path: str):
             data = z.read(name)
             yield name, _guess_text(data)
 
-def batch_score(jd_text: str, resumes: List[Tuple[str, str]]):
-    """
-    resumes: список (display_name, text)
-    return: rows(list), csv_path(str), top_zip(None пока не формируем)
+def batch_score(jd_text: str, resumes: Iterable[Tuple[str, str]], top_k: Optional[int] = None):
     """
-    rows = []
-    for name, text in resumes:
-        score, strengths, gaps, msg = score_fit(jd_text, text)
-        rows.append({
-            "resume": name, "score": score,
-            "strengths": ", ".join(strengths),
-            "gaps": ", ".join(gaps),
-        })
-    rows.sort(key=lambda r: r["score"], reverse=True)
+    resumes: (display_name, text), можно ленивый итератор
+    return: rows(list), csv_path(str)
 
-    # экспорт CSV
+    CSV пишется построчно по мере скоринга (полный результат на диске);
+    в памяти — только top_k лучших строк (heap), если top_k задан.
+    """
     outdir = tempfile.mkdtemp(prefix="skillpilot_batch_")
     csv_path = os.path.join(outdir, "batch_scores.csv")
+    top = TopK(top_k) if top_k else None
+    rows = []
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=["resume","score","strengths","gaps"])
-        w.writeheader(); w.writerows(rows)
-
+        w.writeheader()
+        for name, text in resumes:
+            score, strengths, gaps, msg = score_fit(jd_text, text)
+            row = {
+                "resume": name, "score": score,
+                "strengths": ", ".join(strengths),
+                "gaps": ", ".join(gaps),
+            }
+            w.writerow(row)
+            if top is not None:
+                top.push(row)
+            else:
+                rows.append(row)
+    if top is not None:
+        return top.sorted(), csv_path
+    rows.sort(key=lambda r: r["score"], reverse=True)
     return rows, csv_path
 
 def read_any_to_text(filepath: str) -> str:
     return _guess_text(_read_file_bytes(filepath))
+
+
+class TopK:
+    """Ограниченная min-куча: держит k строк с наибольшим key (O(k) памяти на любой поток)."""
+
+    def __init__(self, k: int, key: str = "score"):
+        self.k = max(1, int(k))
+        self.key = key
+        self._heap: list = []
+        self._seq = 0
+
+    def push(self, row: dict) -> None:
+        # seq: при равном score раньше пришедшая строка «старше» и не вытесняется
+        item = (row.get(self.key) or 0, -self._seq, row)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def sorted(self) -> List[dict]:
+        return [it[2] for it in sorted(self._heap, key=lambda it: it[:2], reverse=True)]
+
+
+# ---------- потоковый батч (CLI / большие корпуса) ----------
+
+def _is_resume_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return bool(base) and not base.startswith(".") and base.lower().endswith(RESUME_EXTS)
+
+
+def iter_sources(spec: str) -> Iterator[Tuple[str, str]]:
+    """
+    Лениво отдаёт (display_name, text) из директории (рекурсивно), ZIP, glob-шаблона или одного файла.
+    Файлы читаются по одному — память не зависит от размера корпуса.
+    """
+    if os.path.isdir(spec):
+        for root, dirs, files in os.walk(spec):
+            dirs.sort()
+            for fn in sorted(files):
+                if not _is_resume_name(fn):
+                    continue
+                path = os.path.join(root, fn)
+                yield os.path.relpath(path, spec), _read_path(path)
+        return
+
+    if spec.lower().endswith(".zip") and os.path.isfile(spec):
+        with zipfile.ZipFile(spec, "r") as z:
+            for name in z.namelist():
+                if name.endswith("/") or name.startswith("__MACOSX/") or not _is_resume_name(name):
+                    continue
+                yield name, read_any(z.read(name), filename=name)
+        return
+
+    if os.path.isfile(spec):   # явно указанный файл берём как есть, без фильтра по расширению
+        yield spec, _read_path(spec)
+        return
+
+    for path in sorted(glob.iglob(spec, recursive=True)):
+        if os.path.isfile(path) and _is_resume_name(path):
+            yield path, _read_path(path)
+
+
+def _read_path(path: str) -> str:
+    try:
+        return read_any(path, filename=path)
+    except Exception:
+        return read_any_to_text(path)
+
+
+def score_row(jd_text: str, name: str, text: str, extra: Optional[dict] = None) -> dict:
+    """Одна строка результата с полным разбором скоринга (+ служебные поля из extra)."""
+    d = score_breakdown(jd_text, text)
+    return {
+        **(extra or {}),
+        "resume": name,
+        "score": d["score"],
+        "semantic": d["semantic"],
+        "overlap": d["overlap"],
+        "penalty": d["penalty"],
+        "missing_critical": d["missing_critical"],
+        "strengths": d["strengths"],
+        "gaps": d["gaps"],
+    }
+
+
+def iter_batch_scores(
+    jd_text: str,
+    resumes: Iterable[tuple],
+    workers: int = 1,
+) -> Iterator[dict]:
+    """
+    Скорит резюме и отдаёт строки по мере готовности (порядок завершения, не входа).
+    resumes: (name, text) или (name, text, extra) — extra вливается в строку как есть.
+    В полёте не больше 2*workers задач, поэтому вход может быть ленивым и бесконечно длинным.
+    """
+    workers = max(1, int(workers or 1))
+    if workers == 1:
+        for item in resumes:
+            yield score_row(jd_text, *item)
+        return
+
+    window = workers * 2
+    src = iter(resumes)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sp-batch") as pool:
+        pending = set()
+        for item in src:
+            pending.add(pool.submit(score_row, jd_text, *item))
+            if len(pending) < window:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+
+
+def _csv_value(v):
+    return ", ".join(str(x) for x in v) if isinstance(v, (list, tuple)) else v
+
+
+class RowWriter:
+    """Построчная запись строк батча в JSONL или CSV (flush после каждой строки)."""
+
+    def __init__(self, path: str, fmt: Optional[str] = None, fields: Optional[List[str]] = None):
+        self.fmt = (fmt or guess_format(path)).lower()
+        if self.fmt not in ("jsonl", "csv"):
+            raise ValueError(f"unsupported format: {self.fmt}")
+        self.fields = list(fields or ROW_FIELDS)
+        self._own = path not in ("-", "")
+        if self._own:
+            self._f = open(path, "w", newline="", encoding="utf-8")
+        else:
+            import sys
+            self._f = sys.stdout
+        self._csv = None
+        if self.fmt == "csv":
+            self._csv = csv.DictWriter(self._f, fieldnames=self.fields, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self._csv is not None:
+            self._csv.writerow({k: _csv_value(row.get(k, "")) for k in self.fields})
+        else:
+            self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._own:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def guess_format(path: str) -> str:
+    return "csv" if (path or "").lower().endswith(".csv") else "jsonl"
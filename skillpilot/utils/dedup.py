@@ -0,0 +1,142 @@
+# skillpilot/utils/dedup.py
+"""
+Поиск почти-дубликатов резюме: MinHash по словесным шинглам + LSH-индекс по полосам.
+
+Оценка сходства — доля совпавших позиций сигнатуры (≈ Jaccard шинглов).
+При num_perm=64 и bands=8 (8 строк в полосе) кандидаты находятся уже от J≈0.77,
+окончательное решение — по threshold.
+"""
+import re
+import hashlib
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"[0-9A-Za-zА-Яа-яЁё+#]+")
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK32 = (1 << 32) - 1
+
+
+def _shingles(text: str, k: int) -> List[str]:
+    words = _WORD.findall((text or "").lower())
+    if len(words) <= k:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+
+
+def _hash32(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def _is_empty(sig: np.ndarray) -> bool:
+    return bool((sig == _MASK32).all())
+
+
+class NearDupIndex:
+    """Онлайн-индекс: add() репрезентантов, query() — найти близкого уже добавленного."""
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 8,
+                 shingle: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = float(threshold)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        rng = np.random.RandomState(seed)
+        # коэффициенты (a*x + b) mod p; x < 2^32, a,b < 2^29 → без переполнения uint64
+        self._a = rng.randint(1, 1 << 29, size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 29, size=(num_perm, 1)).astype(np.uint64)
+        self._sigs: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [dict() for _ in range(bands)]
+
+    def signature(self, text: str) -> np.ndarray:
+        sh = _shingles(text, self.shingle)
+        if not sh:
+            return np.full(self.num_perm, _MASK32, dtype=np.uint64)
+        x = np.fromiter({_hash32(s) for s in sh}, dtype=np.uint64)
+        return ((self._a * x + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray):
+        for i in range(self.bands):
+            yield i, sig[i * self.rows:(i + 1) * self.rows].tobytes()
+
+    # ---------- хранилище (в памяти; SqliteNearDupIndex — на диске) ----------
+    def _store_sig(self, key: str, sig: np.ndarray) -> None:
+        self._sigs[key] = sig
+
+    def _load_sig(self, key: str) -> np.ndarray:
+        return self._sigs[key]
+
+    def _bucket_add(self, band: int, bk: bytes, key: str) -> None:
+        self._buckets[band].setdefault(bk, []).append(key)
+
+    def _bucket(self, band: int, bk: bytes):
+        return self._buckets[band].get(bk, ())
+
+    # ---------- API ----------
+    def add(self, key: str, sig: np.ndarray) -> None:
+        if _is_empty(sig):   # текст без слов ничего не представляет — иначе все пустые совпадут с ним
+            return
+        self._store_sig(key, sig)
+        for i, bk in self._band_keys(sig):
+            self._bucket_add(i, bk, key)
+
+    def query(self, sig: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Лучший кандидат со сходством ≥ threshold или None (для текста без слов — всегда None)."""
+        if _is_empty(sig):
+            return None
+        cands = set()
+        for i, bk in self._band_keys(sig):
+            cands.update(self._bucket(i, bk))
+        best, best_sim = None, 0.0
+        for key in cands:
+            sim = float(np.mean(self._load_sig(key) == sig))
+            if sim > best_sim:
+                best, best_sim = key, sim
+        if best is not None and best_sim >= self.threshold:
+            return best, best_sim
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sigs
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+
+class SqliteNearDupIndex(NearDupIndex):
+    """
+    Тот же индекс, но сигнатуры и полосы LSH лежат в sqlite (соединение передаёт вызывающий):
+    память не растёт с числом репрезентантов. Коммит — на стороне владельца соединения.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, **kw):
+        super().__init__(**kw)
+        self._db = conn
+        conn.execute("CREATE TABLE IF NOT EXISTS dedup_sigs (key TEXT PRIMARY KEY, sig BLOB NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS dedup_bands (band INTEGER, bk BLOB, key TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS dedup_bands_bk ON dedup_bands (band, bk)")
+
+    def _store_sig(self, key: str, sig: np.ndarray) -> None:
+        self._db.execute("INSERT OR REPLACE INTO dedup_sigs (key, sig) VALUES (?, ?)",
+                         (key, sig.astype(np.uint64).tobytes()))
+
+    def _load_sig(self, key: str) -> np.ndarray:
+        row = self._db.execute("SELECT sig FROM dedup_sigs WHERE key = ?", (key,)).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint64)
+
+    def _bucket_add(self, band: int, bk: bytes, key: str) -> None:
+        self._db.execute("INSERT INTO dedup_bands (band, bk, key) VALUES (?, ?, ?)", (band, bk, key))
+
+    def _bucket(self, band: int, bk: bytes):
+        return [r[0] for r in self._db.execute("SELECT key FROM dedup_bands WHERE band = ? AND bk = ?",
+                                               (band, bk))]
+
+    def __contains__(self, key: str) -> bool:
+        return self._db.execute("SELECT 1 FROM dedup_sigs WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM dedup_sigs").fetchone()[0]
@@ -0,0 +1,304 @@
+# skillpilot/utils/genjobs.py
+"""
+Фоновые генерации для шорт-листа пакетной задачи: адаптированное резюме, сопроводительное
+и вопросы к интервью для топ-N кандидатов из BatchJob.
+
+Генерации идут с priority="background" (SCHEDULER не отдаёт им последний свободный слот)
+и не больше GEN_JOB_PARALLEL одновременно. Каждый готовый текст сразу пишется на диск,
+поэтому прерванную задачу можно продолжить — сделанное не пересчитывается.
+
+Раскладка на диске (~/.skillpilot/genjobs/<job_id>/):
+  meta.json      — параметры, кандидаты и прогресс
+  jd.txt         — текст JD из пакетной задачи
+  in/<NN>.txt    — тексты резюме кандидатов (после анонимизации, если она была)
+  out/<NN>_<имя>/<поле>.md — результаты
+  results.jsonl  — append-only лог готовых (и неудавшихся) генераций
+"""
+import os
+import re
+import json
+import time
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ..config import GEN_JOB_PARALLEL
+from ..gen.cancel import CancelToken
+from ..gen.cover import make_cover
+from ..gen.resume import make_tailored_resume
+from ..interview.qa import gen_questions, QuestionsError
+from .batch import iter_sources
+from .jobs import BatchJob, content_hash, _new_id
+from .pii import anonymize
+
+GENJOBS_DIR = os.getenv("SKILLPILOT_GENJOBS_DIR", os.path.expanduser("~/.skillpilot/genjobs"))
+
+_META = "meta.json"
+_JD = "jd.txt"
+_LOG = "results.jsonl"
+
+_ERROR = re.compile(r"^\s*\[(?:OLLAMA|LLM |OFFLINE|CANCELLED|OPENAI|BUSY)")
+
+
+def _questions(cv: str, jd: str, **llm_kw) -> str:
+    try:
+        qs = gen_questions(jd, 5, resume=cv, **llm_kw)
+    except QuestionsError as e:   # текст ошибки как есть — его ловят _ERROR и повтор при [BUSY]
+        return str(e)
+    return "\n".join(f"{i}. {q}" for i, q in enumerate(qs, 1))
+
+
+GEN_FIELDS = {
+    "tailored": ("Адаптированное резюме", make_tailored_resume),
+    "cover": ("Сопроводительное письмо", make_cover),
+    "questions": ("Вопросы к интервью", _questions),
+}
+_BUSY_RETRIES = 5
+_BUSY_PAUSE = 10.0   # секунд: очередь занята интерактивными запросами — ждём и пробуем снова
+
+_ACTIVE: Dict[str, "GenJob"] = {}
+_ACTIVE_LOCK = threading.Lock()
+
+
+def _slug(name: str) -> str:
+    base = os.path.splitext(os.path.basename(name))[0]
+    return re.sub(r"[^0-9A-Za-zА-Яа-яЁё_-]+", "_", base).strip("_")[:40] or "resume"
+
+
+class GenJob:
+    """Фоновая генерация для топ-N кандидатов пакетной задачи."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.dir = os.path.join(GENJOBS_DIR, job_id)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._token = CancelToken()
+        self.meta: dict = {}
+        if os.path.exists(self._p(_META)):
+            with open(self._p(_META), "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+
+    def _p(self, *names: str) -> str:
+        return os.path.join(self.dir, *names)
+
+    # ---------- создание / загрузка ----------
+    @classmethod
+    def create(cls, batch: BatchJob, top_n: int = 10, fields: Optional[List[str]] = None) -> "GenJob":
+        """Шорт-лист: top_n лучших (без дублей) из batch; тексты резюме берутся из её источников."""
+        fields = [f for f in (fields or list(GEN_FIELDS)) if f in GEN_FIELDS]
+        top = batch.top(max(1, int(top_n)), hide_duplicates=True)
+        want = {r.get("sha"): r for r in top}
+        texts: Dict[str, str] = {}
+        for spec in batch.meta.get("sources", []):
+            for _, text in iter_sources(spec):
+                sha = content_hash(text)
+                if sha in want and sha not in texts:
+                    texts[sha] = text
+            if len(texts) == len(want):
+                break
+
+        job = cls(_new_id())
+        os.makedirs(job._p("in"), exist_ok=True)
+        os.makedirs(job._p("out"), exist_ok=True)
+        with open(job._p(_JD), "w", encoding="utf-8") as f:
+            f.write(batch.jd_text)
+        hide = batch.meta.get("hide_pii", False)
+        candidates = []
+        for i, r in enumerate(top, 1):
+            text = texts.get(r.get("sha"))
+            if text is None:   # источник удалён/изменён — кандидата пропускаем
+                continue
+            with open(job._p("in", f"{i:02d}.txt"), "w", encoding="utf-8") as f:
+                f.write(anonymize(text) if hide else text)
+            candidates.append({"n": i, "resume": r.get("resume", ""), "score": r.get("score"),
+                               "dir": f"{i:02d}_{_slug(r.get('resume', ''))}"})
+        job.meta = {
+            "id": job.id,
+            "batch": batch.id,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "status": "new",
+            "top_n": int(top_n),
+            "fields": fields,
+            "candidates": candidates,
+            "total": len(candidates) * len(fields),
+            "done": 0,
+            "failed": 0,
+        }
+        job._save_meta()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str) -> "GenJob":
+        with _ACTIVE_LOCK:
+            if job_id in _ACTIVE:
+                return _ACTIVE[job_id]
+        job = cls(job_id)
+        if not job.meta:
+            raise FileNotFoundError(f"generation job not found: {job_id}")
+        return job
+
+    def _save_meta(self) -> None:
+        with self._lock:
+            self.meta["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            tmp = self._p(_META + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self._p(_META))
+
+    # ---------- лог ----------
+    def iter_results(self):
+        path = self._p(_LOG)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except Exception:
+                    continue   # битая последняя строка (обрыв записи)
+
+    def done_units(self) -> set:
+        return {(r["n"], r["field"]) for r in self.iter_results() if r.get("ok")}
+
+    def _record(self, cand: dict, field: str, text: str, ok: bool, secs: float) -> None:
+        if ok:
+            os.makedirs(self._p("out", cand["dir"]), exist_ok=True)
+            with open(self._p("out", cand["dir"], f"{field}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# {GEN_FIELDS[field][0]} — {cand['resume']}\n\n{text.strip()}\n")
+        row = {"n": cand["n"], "resume": cand["resume"], "field": field, "ok": ok,
+               "secs": round(secs, 2), "error": "" if ok else text[:200]}
+        with self._lock:
+            with open(self._p(_LOG), "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            self.meta["done" if ok else "failed"] += 1
+        self._save_meta()
+
+    # ---------- выполнение ----------
+    def _unit(self, cand: dict, field: str, jd: str) -> None:
+        token = self._token
+        if token.cancelled:
+            return
+        with open(self._p("in", f"{cand['n']:02d}.txt"), "r", encoding="utf-8") as f:
+            cv = f.read()
+        t0 = time.monotonic()
+        text = ""
+        for _ in range(_BUSY_RETRIES):
+            try:
+                text = GEN_FIELDS[field][1](cv, jd, priority="background", session=f"genjob:{self.id}",
+                                            cancel=token)
+            except Exception as e:
+                text = f"[LLM ERROR] {type(e).__name__}: {e}"
+            if not text.startswith("[BUSY]") or token.wait(_BUSY_PAUSE):
+                break
+        if token.cancelled:
+            return
+        ok = bool(text.strip()) and not _ERROR.match(text)
+        self._record(cand, field, text, ok, time.monotonic() - t0)
+
+    def run(self, parallel: Optional[int] = None) -> None:
+        """Выполнить всё, чего ещё нет в логе (блокирует). Повторный вызов продолжает задачу."""
+        done = self.done_units()
+        with open(self._p(_JD), "r", encoding="utf-8") as f:
+            jd = f.read()
+        todo = [(c, f) for c in self.meta.get("candidates", []) for f in self.meta.get("fields", [])
+                if (c["n"], f) not in done]
+        self.meta.update(status="running", done=len(done), failed=0)
+        self._save_meta()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, parallel or GEN_JOB_PARALLEL),
+                                    thread_name_prefix="genjob") as pool:
+                for fut in [pool.submit(self._unit, c, f, jd) for c, f in todo]:
+                    fut.result()
+        except Exception as e:
+            self.meta["status"] = "failed"
+            self.meta["error"] = f"{type(e).__name__}: {e}"
+        else:
+            if self._token.cancelled:
+                self.meta["status"] = "cancelled"
+            else:
+                self.meta["status"] = "done" if not self.meta.get("failed") else "partial"
+            self.meta.pop("error", None)
+        finally:
+            self._save_meta()
+
+    def start(self, parallel: Optional[int] = None) -> "GenJob":
+        """Запустить run() в фоновом потоке (если ещё не запущена)."""
+        with _ACTIVE_LOCK:
+            running = _ACTIVE.get(self.id)
+            if running is not None and running.running:
+                return running
+            self._token = CancelToken()
+            self._thread = threading.Thread(target=self._run_bg, args=(parallel,),
+                                            name=f"genjob-{self.id}", daemon=True)
+            _ACTIVE[self.id] = self
+            self._thread.start()
+        return self
+
+    def _run_bg(self, parallel: Optional[int]) -> None:
+        try:
+            self.run(parallel)
+        finally:
+            with _ACTIVE_LOCK:
+                if _ACTIVE.get(self.id) is self:
+                    _ACTIVE.pop(self.id, None)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self) -> None:
+        self._token.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    def progress(self) -> dict:
+        m = self.meta
+        return {"id": self.id, "status": m.get("status"), "done": m.get("done", 0),
+                "failed": m.get("failed", 0), "total": m.get("total", 0), "running": self.running}
+
+    # ---------- выгрузка ----------
+    def export_zip(self, path: Optional[str] = None) -> str:
+        """Все готовые тексты одним ZIP: папка на кандидата + index.md со score и статусами."""
+        path = path or self._p(f"genjob_{self.id}.zip")
+        done = self.done_units()
+        lines = [f"# Генерации для топ-{self.meta.get('top_n')} (пакетная задача {self.meta.get('batch')})", "",
+                 "| # | Резюме | Score | " + " | ".join(GEN_FIELDS[f][0] for f in self.meta.get("fields", [])) + " |",
+                 "|---|---|---:|" + "---|" * len(self.meta.get("fields", []))]
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+            for c in self.meta.get("candidates", []):
+                marks = []
+                for f in self.meta.get("fields", []):
+                    src = self._p("out", c["dir"], f"{f}.md")
+                    if (c["n"], f) in done and os.path.exists(src):
+                        z.write(src, arcname=f"{c['dir']}/{f}.md")
+                        marks.append("✓")
+                    else:
+                        marks.append("—")
+                lines.append(f"| {c['n']} | {c['resume']} | {c.get('score')} | " + " | ".join(marks) + " |")
+            z.writestr("index.md", "\n".join(lines) + "\n")
+        return path
+
+
+def start_gen_job(batch_id: str, top_n: int = 10, fields: Optional[List[str]] = None,
+                  parallel: Optional[int] = None) -> GenJob:
+    """Создать задачу по пакетной задаче batch_id и запустить в фоне."""
+    return GenJob.create(BatchJob.load(batch_id), top_n, fields).start(parallel)
+
+
+def list_gen_jobs() -> List[dict]:
+    """Метаданные всех задач генерации, новые сверху (у запущенных — живой прогресс)."""
+    if not os.path.isdir(GENJOBS_DIR):
+        return []
+    out = []
+    for name in os.listdir(GENJOBS_DIR):
+        job = GenJob.load(name) if os.path.exists(os.path.join(GENJOBS_DIR, name, _META)) else None
+        if job is not None and job.meta:
+            out.append(dict(job.meta, running=job.running))
+    return sorted(out, key=lambda m: m.get("created", ""), reverse=True)
@@ -0,0 +1,443 @@
+# skillpilot/utils/jobs.py
+"""
+Пакетные задачи (jobs) с чекпоинтом: batch-прогон можно продолжить после падения.
+
+Раскладка на диске (~/.skillpilot/jobs/<job_id>/):
+  meta.json      — параметры и статус задачи
+  jd.txt         — текст JD (как был подан на скоринг)
+  results.jsonl  — append-only лог готовых строк; ключ строки — sha текста резюме
+  index.sqlite   — индекс прогона (готовые ключи, репрезентанты, LSH); пересобирается из лога
+  rank.sqlite    — ранжирование для page()/export(): score и смещение строки в логе, дочитывается
+                   из results.jsonl по мере роста
+  src/           — копии загруженных файлов (для задач из UI, где temp-файлы Gradio живут недолго)
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .batch import iter_sources, iter_batch_scores, RowWriter
+from .dedup import SqliteNearDupIndex
+from .pii import anonymize_many
+
+JOBS_DIR = os.getenv("SKILLPILOT_JOBS_DIR", os.path.expanduser("~/.skillpilot/jobs"))
+
+_META = "meta.json"
+_JD = "jd.txt"
+_LOG = "results.jsonl"
+_INDEX = "index.sqlite"
+_RANK = "rank.sqlite"
+
+# порог сходства MinHash для почти-дублей
+DEDUP_THRESHOLD = 0.85
+
+# hide_pii: столько резюме анонимизируется одним вызовом anonymize_many (большие пачки — пулом процессов)
+PII_BATCH = 2000
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+def _new_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+class _RunIndex:
+    """
+    Состояние одного прогона на диске, а не в памяти: какие (sha, резюме) уже в логе и
+    оценка/имя каждого репрезентанта (больше дублю ничего не нужно). Файл — производный
+    от results.jsonl: на старте прогона он пересобирается, так что обрыв записи его не портит.
+    """
+
+    def __init__(self, path: str):
+        if os.path.exists(path):
+            os.remove(path)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE done (sha TEXT, resume TEXT, PRIMARY KEY (sha, resume)) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE reps (sha TEXT PRIMARY KEY, resume TEXT, score REAL)")
+
+    def add_done(self, sha: str, name: str) -> bool:
+        """False — такая строка уже есть."""
+        cur = self.db.execute("INSERT OR IGNORE INTO done (sha, resume) VALUES (?, ?)", (sha, name))
+        return cur.rowcount == 1
+
+    def set_rep(self, sha: str, name: str, score=None) -> None:
+        self.db.execute("INSERT OR REPLACE INTO reps (sha, resume, score) VALUES (?, ?, ?)", (sha, name, score))
+
+    def rep(self, sha: str) -> Optional[dict]:
+        """{"resume", "score"} репрезентанта; score=None — ещё скорится."""
+        row = self.db.execute("SELECT resume, score FROM reps WHERE sha = ?", (sha,)).fetchone()
+        return {"resume": row[0], "score": row[1]} if row else None
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+
+class _RankIndex:
+    """
+    Ранжирование строк лога в sqlite: (score, порядок записи, смещение в results.jsonl).
+    Страницы и экспорт — ORDER BY … LIMIT/OFFSET с чтением строк по смещению, так что
+    память не зависит ни от размера задачи, ни от номера страницы. Индекс дочитывает
+    лог с последнего смещения; недописанная последняя строка ждёт следующего sync().
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS rows (seq INTEGER PRIMARY KEY, off INTEGER, "
+                        "score REAL, dup INTEGER, hay TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS rows_rank ON rows (score DESC, seq)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS synced (id INTEGER PRIMARY KEY CHECK (id = 0), off INTEGER)")
+
+    def sync(self, log_path: str) -> None:
+        size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT off FROM synced WHERE id = 0").fetchone()
+            off = row[0] if row else 0
+            if size < off:   # лог заменён — индекс строим заново
+                self.db.execute("DELETE FROM rows")
+                off = 0
+            if size > off:
+                with open(log_path, "rb") as f:
+                    f.seek(off)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            break
+                        try:
+                            r = json.loads(raw)
+                        except ValueError:
+                            r = None
+                        if isinstance(r, dict):
+                            self.db.execute("INSERT INTO rows (off, score, dup, hay) VALUES (?, ?, ?, ?)",
+                                            (off, r.get("score") or 0, int(bool(r.get("duplicate_of"))),
+                                             _haystack(r)))
+                        off += len(raw)
+            self.db.execute("INSERT OR REPLACE INTO synced (id, off) VALUES (0, ?)", (off,))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def _where(self, query: str, min_score: Optional[float], hide_duplicates: bool) -> Tuple[str, list]:
+        cond, args = [], []
+        if hide_duplicates:
+            cond.append("dup = 0")
+        if min_score is not None:
+            cond.append("score >= ?")
+            args.append(float(min_score))
+        if query:
+            cond.append("instr(hay, ?) > 0")
+            args.append(query)
+        return (" WHERE " + " AND ".join(cond)) if cond else "", args
+
+    def count(self, query: str = "", min_score: Optional[float] = None, hide_duplicates: bool = False) -> int:
+        where, args = self._where(query, min_score, hide_duplicates)
+        return self.db.execute(f"SELECT COUNT(*) FROM rows{where}", args).fetchone()[0]
+
+    def offsets(self, query: str = "", min_score: Optional[float] = None, hide_duplicates: bool = False,
+                limit: int = -1, offset: int = 0) -> Iterator[int]:
+        where, args = self._where(query, min_score, hide_duplicates)
+        cur = self.db.execute(f"SELECT off FROM rows{where} ORDER BY score DESC, seq LIMIT ? OFFSET ?",
+                              args + [int(limit), int(offset)])
+        for (off,) in cur:
+            yield off
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class BatchJob:
+    """Одна пакетная задача: метаданные + durable-лог готовых строк."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.dir = os.path.join(JOBS_DIR, job_id)
+        self._lock = threading.Lock()
+        self.meta: dict = {}
+        if os.path.exists(self._p(_META)):
+            with open(self._p(_META), "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+
+    def _p(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    # ---------- создание / загрузка ----------
+    @classmethod
+    def create(cls, jd_text: str, sources: List[str], hide_pii: bool = False,
+               copy_sources: bool = False, dedup: bool = True,
+               dedup_threshold: float = DEDUP_THRESHOLD) -> "BatchJob":
+        """
+        sources: директории / ZIP / glob. copy_sources=True копирует файлы внутрь задачи
+        (нужно для UI: загруженные файлы удаляются Gradio после ответа).
+        """
+        job = cls(_new_id())
+        os.makedirs(job.dir, exist_ok=True)
+        if copy_sources:
+            src_dir = job._p("src")
+            os.makedirs(src_dir, exist_ok=True)
+            kept = []
+            for i, path in enumerate(sources):
+                dst = os.path.join(src_dir, os.path.basename(path))
+                if os.path.exists(dst):
+                    dst = os.path.join(src_dir, f"{i:03d}_{os.path.basename(path)}")
+                shutil.copyfile(path, dst)
+                kept.append(dst)
+            sources = [src_dir] if not any(p.lower().endswith(".zip") for p in kept) else kept
+        else:
+            sources = [s if any(ch in s for ch in "*?[") else os.path.abspath(s) for s in sources]
+
+        with open(job._p(_JD), "w", encoding="utf-8") as f:
+            f.write(jd_text or "")
+        job.meta = {
+            "id": job.id,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "status": "new",
+            "sources": sources,
+            "hide_pii": bool(hide_pii),
+            "dedup": bool(dedup),
+            "dedup_threshold": float(dedup_threshold),
+            "jd_sha": content_hash(jd_text),
+            "done": 0,
+        }
+        job._save_meta()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str) -> "BatchJob":
+        job = cls(job_id)
+        if not job.meta:
+            raise FileNotFoundError(f"job not found: {job_id}")
+        return job
+
+    def _save_meta(self) -> None:
+        self.meta["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        tmp = self._p(_META + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._p(_META))
+
+    @property
+    def jd_text(self) -> str:
+        with open(self._p(_JD), "r", encoding="utf-8") as f:
+            return f.read()
+
+    # ---------- чекпоинт-лог ----------
+    def iter_results(self) -> Iterator[dict]:
+        """Строки из лога в порядке записи; битая последняя строка (обрыв записи) пропускается."""
+        path = self._p(_LOG)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except Exception:
+                    continue
+
+    def done_hashes(self) -> set:
+        return {r.get("sha") for r in self.iter_results() if r.get("sha")}
+
+    def _append(self, fh, row: dict) -> None:
+        with self._lock:
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    # ---------- выполнение ----------
+    def run(self, workers: int = 1) -> Iterator[dict]:
+        """
+        Скорит всё, чего ещё нет в логе, и отдаёт новые строки по мере готовности.
+        Повторный вызов (resume) пропускает уже посчитанные резюме по sha содержимого.
+
+        Перед скорингом — фингерпринтинг (MinHash/LSH, если meta["dedup"]): точные и почти-дубли
+        не скорятся, а получают оценку своего репрезентанта и пометку duplicate_of/similarity.
+        """
+        idx = _RunIndex(self._p(_INDEX))
+        n = 0
+        for r in self.iter_results():
+            n += 1
+            idx.add_done(r.get("sha"), r.get("resume"))
+            if r.get("sha") and not r.get("duplicate_of"):
+                idx.set_rep(r["sha"], r.get("resume", ""), r.get("score"))
+        idx.commit()
+
+        hide = self.meta.get("hide_pii", False)
+        index = SqliteNearDupIndex(idx.db, threshold=self.meta.get("dedup_threshold", DEDUP_THRESHOLD)) \
+            if self.meta.get("dedup", True) else None
+        waiting: Dict[str, List[tuple]] = {}   # sha репрезентанта в работе → его дубли (не больше окна скоринга)
+        ready: deque = deque()                  # дубли, готовые к записи
+
+        def _dup(name: str, sha: str, rep_sha: str, sim: float):
+            d = (name, sha, rep_sha, round(sim, 3))
+            rep = idx.rep(rep_sha)
+            if rep is not None and rep["score"] is not None:
+                ready.append(_dup_row(rep, *d))
+            else:
+                waiting.setdefault(rep_sha, []).append(d)
+
+        def _fresh() -> Iterator[tuple]:
+            for spec in self.meta.get("sources", []):
+                for name, text in iter_sources(spec):
+                    blank = not (text or "").strip()
+                    # пустое резюме (скан без текстового слоя) — ничей не дубль: ключ по имени файла
+                    sha = content_hash("\0" + name) if blank else content_hash(text)
+                    if not idx.add_done(sha, name):
+                        # уже в логе; репрезентантов возвращаем в индекс, чтобы resume ловил их дубли
+                        if index is not None and not blank and sha not in index and idx.rep(sha) is not None:
+                            index.add(sha, index.signature(text))
+                        continue
+                    if idx.rep(sha) is not None:
+                        _dup(name, sha, sha, 1.0)
+                        continue
+                    if index is not None and not blank:
+                        sig = index.signature(text)
+                        hit = index.query(sig)
+                        if hit is not None:
+                            _dup(name, sha, hit[0], hit[1])
+                            continue
+                        index.add(sha, sig)
+                    idx.set_rep(sha, name)
+                    yield name, text, {"sha": sha, "cluster": sha[:10]}
+
+        def _pending() -> Iterator[tuple]:
+            if not hide:
+                yield from _fresh()
+                return
+            buf: List[tuple] = []
+            for item in _fresh():
+                buf.append(item)
+                if len(buf) >= PII_BATCH:
+                    yield from _masked(buf)
+                    buf = []
+            yield from _masked(buf)
+
+        def _masked(buf: List[tuple]) -> Iterator[tuple]:
+            for (name, _, extra), text in zip(buf, anonymize_many([t for _, t, _ in buf])):
+                yield name, text, extra
+
+        self.meta["status"] = "running"
+        self._save_meta()
+        try:
+            with open(self._p(_LOG), "a", encoding="utf-8") as fh:
+                for row in iter_batch_scores(self.jd_text, _pending(), workers=workers):
+                    row["duplicate_of"] = ""
+                    idx.set_rep(row["sha"], row["resume"], row["score"])
+                    batch = [row] + [_dup_row(row, *d) for d in waiting.pop(row["sha"], [])]
+                    while ready:
+                        batch.append(ready.popleft())
+                    for r in batch:
+                        self._append(fh, r)
+                        n += 1
+                        if n % 100 == 0:
+                            idx.commit()
+                            self.meta["done"] = n
+                            self._save_meta()
+                        yield r
+                while ready:
+                    r = ready.popleft()
+                    self._append(fh, r)
+                    n += 1
+                    yield r
+        except GeneratorExit:
+            self.meta["status"] = "interrupted"
+            raise
+        except Exception as e:
+            self.meta["status"] = "failed"
+            self.meta["error"] = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            self.meta["status"] = "done"
+            self.meta.pop("error", None)
+        finally:
+            idx.close()
+            self.meta["done"] = n
+            self._save_meta()
+
+    def _ranked(self, query: str = "", min_score: Optional[float] = None, hide_duplicates: bool = False,
+                limit: int = -1, offset: int = 0) -> Iterator[dict]:
+        """Строки лога в порядке score (по убыванию; при равенстве — порядок записи), по одной."""
+        rank = _RankIndex(self._p(_RANK))
+        try:
+            rank.sync(self._p(_LOG))
+            offs = rank.offsets(query, min_score, hide_duplicates, limit, offset)
+            with open(self._p(_LOG), "rb") as f:
+                for off in offs:
+                    f.seek(off)
+                    yield json.loads(f.readline())
+        finally:
+            rank.close()
+
+    def results(self) -> List[dict]:
+        """Все строки, отсортированные по score (по убыванию). Для больших задач — page()/top()/export()."""
+        return list(self._ranked())
+
+    def page(self, page: int = 0, size: int = 50, query: str = "",
+             min_score: Optional[float] = None, hide_duplicates: bool = False) -> Tuple[List[dict], int]:
+        """
+        Страница ранжированных результатов: (rows, total_matched). LIMIT/OFFSET по rank.sqlite —
+        в памяти только size строк на любой глубине страниц.
+        query — подстрока (без регистра) в имени резюме, сильных сторонах или пробелах.
+        """
+        page, size = max(0, int(page)), max(1, int(size))
+        q = (query or "").strip().lower()
+        rank = _RankIndex(self._p(_RANK))
+        try:
+            rank.sync(self._p(_LOG))
+            total = rank.count(q, min_score, hide_duplicates)
+        finally:
+            rank.close()
+        return list(self._ranked(q, min_score, hide_duplicates, size, page * size)), total
+
+    def top(self, k: int, hide_duplicates: bool = True) -> List[dict]:
+        return self.page(0, k, hide_duplicates=hide_duplicates)[0]
+
+    def export(self, path: str, fmt: Optional[str] = None, top: Optional[int] = None) -> str:
+        """Запись в CSV/JSONL потоком из лога в порядке score (top — только первые top строк без дублей)."""
+        rows = self._ranked(hide_duplicates=True, limit=top) if top else self._ranked()
+        with RowWriter(path, fmt) as w:
+            for row in rows:
+                w.write(row)
+        return path
+
+
+def _haystack(r: dict) -> str:
+    parts = [str(r.get("resume", ""))]
+    for k in ("strengths", "gaps"):
+        v = r.get(k) or []
+        parts.append(" ".join(v) if isinstance(v, list) else str(v))
+    return " ".join(parts).lower()
+
+
+def _dup_row(rep: dict, name: str, sha: str, rep_sha: str, sim: float) -> dict:
+    """Строка дубля: оценка репрезентанта + пометка, чей это дубль (полный разбор — в строке репрезентанта)."""
+    return {"resume": name, "score": rep.get("score"), "sha": sha, "cluster": rep_sha[:10],
+            "duplicate_of": rep.get("resume", ""), "similarity": sim}
+
+
+def list_jobs() -> List[Dict]:
+    """Метаданные всех задач, новые сверху."""
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    out = []
+    for name in os.listdir(JOBS_DIR):
+        job = BatchJob(name)
+        if job.meta:
+            out.append(job.meta)
+    return sorted(out, key=lambda m: m.get("created", ""), reverse=True)
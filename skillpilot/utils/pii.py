@@ -1,21 +1,124 @@
 # skillpilot/utils/pii.py
+import os
 import re
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Один скомпилированный проход вместо трёх sub(): ветки — исходные паттерны email, телефона
+# и имени, тип совпадения — m.lastgroup. Раньше проходы шли по очереди (email → телефон → имя);
+# чтобы ни один символ, скрытый ими, не остался виден:
+#   - телефон, к которому вплотную приклеен email («… 35 35hr@corp.com»), скрывается вместе с ним;
+#   - латинское имя не «съедает» начало email (Ivan Petrov@mail.ru → имя + email);
+#   - имя, приклеенное к цифрам телефона («123-45-67Иван»), ищется так же, как после [phone hidden].
+_EMAIL_TAIL = r"[A-Za-z0-9._%+\-]*@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b"
+_EMAIL = r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b"
+_PHONE = r"\+?\d[\d\-\s\(\)]{7,}\d"
+# осторожная эвристика имён (латиница/кириллица); граница слова — только с буквой, не с цифрой
+_NAME = (r"(?<![^\W\d])"
+         r"(?:[А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+){0,2}"
+         rf"|[A-Z][a-z]+(?:\s+[A-Z][a-z]+){{0,2}}(?!{_EMAIL_TAIL}))"
+         r"(?![^\W\d])")
+_PII = re.compile(rf"(?P<email>{_EMAIL})|(?P<phone>{_PHONE}(?:{_EMAIL_TAIL})?)|(?P<name>{_NAME})")
+
+# популярные tech-термины с заглавной буквы — не имена
+TECH_SAFE = frozenset({
+    "python", "pandas", "numpy", "sql", "docker", "kubernetes", "tensorflow",
+    "pytorch", "llm", "nlp", "xgboost", "catboost", "lightgbm",
+})
+
+_PLACEHOLDER = {"email": "[email hidden]", "phone": "[phone hidden]", "name": "[name]"}
+_TOKEN = re.compile(r"\[(?:email|phone|name)_\d+\]")
+
+# memo по sha текста: один и тот же JD/резюме анонимизируется во всех хендлерах UI
+_MEMO_MAX = 256
+_MEMO: "OrderedDict[str, str]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+# ниже этого объёма пул процессов дороже самой работы: spawn стоит ~0.5 с,
+# а одно резюме анонимизируется за ~1 мс
+_PARALLEL_MIN = 2000
+
+
+def _sub(m: "re.Match") -> str:
+    kind = m.lastgroup
+    if kind == "name" and m.group(0).lower() in TECH_SAFE:
+        return m.group(0)
+    return _PLACEHOLDER[kind]
+
+
+def _anonymize_raw(text: str) -> str:
+    return _PII.sub(_sub, text)
+
+
+def _key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
-_EMAIL = re.compile(r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b")
-_PHONE = re.compile(r"(?:\+?\d[\d\-\s\(\)]{7,}\d)")
-# Осторожная эвристика имён (латиница/кириллица), исключаем популярные tech-термины
-_NAME  = re.compile(r"\b([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+){0,2}|[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b")
-_TECH_SAFE = re.compile(r"^(Python|Pandas|NumPy|SQL|Docker|Kubernetes|TensorFlow|PyTorch|LLM|NLP|XGBoost|CatBoost|LightGBM)$", re.I)
 
 def anonymize(text: str) -> str:
     if not text:
         return text
-    t = _EMAIL.sub("[email hidden]", text)
-    t = _PHONE.sub("[phone hidden]", t)
+    k = _key(text)
+    with _MEMO_LOCK:
+        hit = _MEMO.get(k)
+        if hit is not None:
+            _MEMO.move_to_end(k)
+            return hit
+    out = _anonymize_raw(text)
+    with _MEMO_LOCK:
+        _MEMO[k] = out
+        while len(_MEMO) > _MEMO_MAX:
+            _MEMO.popitem(last=False)
+    return out
+
+
+def anonymize_many(texts: Sequence[str], workers: Optional[int] = None) -> List[str]:
+    """
+    Анонимизация списка текстов (например, всех резюме батча).
+    Большие списки обрабатываются пулом процессов (regex держит GIL, потоки не помогут);
+    процессов не больше, чем ядер — на одном ядре пул только добавляет накладные расходы.
+    """
+    texts = list(texts)
+    workers = min(workers or 8, os.cpu_count() or 1)
+    if len(texts) < _PARALLEL_MIN or workers <= 1:
+        return [anonymize(t) for t in texts]
+    ctx = multiprocessing.get_context("spawn")  # fork небезопасен в многопоточном Gradio-процессе
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return list(pool.map(_anonymize_raw, [t or "" for t in texts],
+                             chunksize=max(1, len(texts) // (workers * 4))))
 
-    def _name_sub(m):
-        s = m.group(0)
-        return s if _TECH_SAFE.match(s) else "[name]"
 
-    t = _NAME.sub(_name_sub, t)
-    return t
+def anonymize_with_map(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Обратимая анонимизация: PII → токены [email_1], [name_2]… и словарь токен → оригинал.
+    Одинаковые значения получают один токен; deanonymize() возвращает исходные данные.
+    """
+    if not text:
+        return text, {}
+    mapping: Dict[str, str] = {}
+    reverse: Dict[Tuple[str, str], str] = {}
+    counters = {"email": 0, "phone": 0, "name": 0}
+
+    def _tok(m: "re.Match") -> str:
+        kind, val = m.lastgroup, m.group(0)
+        if kind == "name" and val.lower() in TECH_SAFE:
+            return val
+        tok = reverse.get((kind, val))
+        if tok is None:
+            counters[kind] += 1
+            tok = f"[{kind}_{counters[kind]}]"
+            reverse[(kind, val)] = tok
+            mapping[tok] = val
+        return tok
+
+    return _PII.sub(_tok, text), mapping
+
+
+def deanonymize(text: str, mapping: Dict[str, str]) -> str:
+    """Один проход: токены из anonymize_with_map заменяются обратно на оригиналы."""
+    if not text or not mapping:
+        return text
+    return _TOKEN.sub(lambda m: mapping.get(m.group(0), m.group(0)), text)
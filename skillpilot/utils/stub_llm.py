@@ -0,0 +1,269 @@
+# skillpilot/utils/stub_llm.py
+"""
+Заглушка LLM-сервера для нагрузочных и регрессионных прогонов без настоящей модели.
+
+Говорит на тех же форматах, что используют gen/llm_ollama.py и gen/llm.py:
+  GET  /api/tags, /api/ps, /api/version        — probe пула узлов, аффинити и прогрев
+  POST /api/chat (stream=true|false)            — ответы Ollama со счётчиками eval_*
+  POST /api/generate                            — прогрев (пустой prompt) и генерация
+  GET  /v1/models, POST /v1/chat/completions    — OpenAI-совместимый эндпоинт (в т.ч. SSE-стрим)
+
+Настраиваются TTFT, скорость токенов, длина ответа, текст ответа, холодная загрузка
+и доля ошибок. Ответы детерминированы: текст зависит только от промпта, ошибки — от seed
+и порядкового номера запроса.
+
+    python -m skillpilot.cli stub-llm --port 11434 --ttft 0.3 --rate 25 --errors 0.05
+    OLLAMA_HOST=http://127.0.0.1:11434 EMB_MODEL=fake python run.py
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+_WORDS = (
+    "опыт проект команда результат метрика Python SQL модель данные сервис рост "
+    "снизил увеличил внедрил автоматизировал процесс клиент продукт анализ отчёт "
+    "пайплайн качество скорость задача решение архитектура тест релиз"
+).split()
+
+
+@dataclass
+class StubConfig:
+    ttft: float = 0.2                 # секунд до первого токена (prefill)
+    token_rate: float = 30.0          # токенов/с; 0 — весь ответ сразу
+    tokens: int = 60                  # длина ответа (не больше num_predict/max_tokens запроса)
+    content: Optional[str] = None     # фиксированный текст ответа вместо сгенерированного
+    error_rate: float = 0.0           # доля запросов генерации, на которые отвечаем error_status
+    error_status: int = 500
+    load_secs: float = 0.0            # холодная загрузка: первая генерация каждой модели ждёт дольше
+    keep_alive: float = 300.0         # сколько модель «держится» в /api/ps после запроса
+    models: Tuple[str, ...] = ("mistral",)
+    seed: int = 0
+
+
+@dataclass
+class _State:
+    rng: random.Random
+    loaded: dict = field(default_factory=dict)   # модель -> unix time выгрузки
+    requests: int = 0
+    errors: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _tokens(prompt: str, n: int, content: Optional[str]) -> List[str]:
+    if content is not None:
+        words = content.split(" ")
+        return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+    h = hashlib.sha1(prompt.encode("utf-8")).digest()
+    return [_WORDS[(h[i % len(h)] + i) % len(_WORDS)] + " " for i in range(max(0, n))]
+
+
+def _prompt_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cfg: StubConfig
+    state: _State
+
+    def log_message(self, *a):
+        pass
+
+    # ---------- транспорт ----------
+    def _json(self, obj, status: int = 200) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, ctype: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: str) -> None:
+        raw = data.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+        self.wfile.flush()
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _body(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            return {}
+
+    # ---------- модель ----------
+    def _admit(self, model: str) -> Tuple[bool, float]:
+        """(ошибка?, время загрузки): номер запроса и seed однозначно задают исход."""
+        cfg, st = self.cfg, self.state
+        with st.lock:
+            st.requests += 1
+            fail = cfg.error_rate > 0 and st.rng.random() < cfg.error_rate
+            st.errors += int(fail)
+            now = time.time()
+            cold = st.loaded.get(model, 0) < now
+            if not fail:
+                st.loaded[model] = now + cfg.keep_alive
+        return fail, (cfg.load_secs if cold and not fail else 0.0)
+
+    def _final(self, prompt_tokens: int, n: int, load: float, t0: float, prefill: float) -> dict:
+        gen = n / self.cfg.token_rate if self.cfg.token_rate > 0 else 0.0
+        return {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.monotonic() - t0) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": n,
+            "eval_duration": int(gen * 1e9),
+        }
+
+    def _generate(self, prompt: str, limit: Optional[int]):
+        """Токены ответа с паузами TTFT/скорости; первым отдаёт время до первого токена."""
+        n = self.cfg.tokens if not limit or limit < 0 else min(self.cfg.tokens, int(limit))
+        toks = _tokens(prompt, n, self.cfg.content)
+        step = 1.0 / self.cfg.token_rate if self.cfg.token_rate > 0 else 0.0
+        for i, tok in enumerate(toks):
+            time.sleep(self.cfg.ttft if i == 0 else step)
+            yield tok
+
+    # ---------- роутинг ----------
+    def do_GET(self):
+        names = [m if ":" in m else f"{m}:latest" for m in self.cfg.models]
+        if self.path.startswith("/api/tags"):
+            self._json({"models": [{"name": n, "model": n} for n in names]})
+        elif self.path.startswith("/api/ps"):
+            with self.state.lock:
+                loaded = dict(self.state.loaded)
+            now = time.time()
+            self._json({"models": [
+                {"name": n, "model": n,
+                 "expires_at": datetime.fromtimestamp(exp, timezone.utc).isoformat().replace("+00:00", "Z")}
+                for n in names for m, exp in loaded.items() if n.split(":")[0] == m.split(":")[0] and exp > now
+            ]})
+        elif self.path.startswith("/api/version"):
+            self._json({"version": "0.0.0-stub"})
+        elif self.path.startswith("/v1/models"):
+            self._json({"object": "list", "data": [{"id": m, "object": "model"} for m in self.cfg.models]})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = self._body()
+        if self.path.startswith("/api/chat"):
+            self._ollama(body, "".join(m.get("content", "") for m in body.get("messages", [])), chat=True)
+        elif self.path.startswith("/api/generate"):
+            self._ollama(body, body.get("prompt") or "", chat=False)
+        elif self.path.startswith("/v1/chat/completions"):
+            self._openai(body)
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def _ollama(self, body: dict, prompt: str, chat: bool) -> None:
+        model = body.get("model") or self.cfg.models[0]
+        fail, load = self._admit(model)
+        if fail:
+            self._json({"error": "stub: injected failure"}, self.cfg.error_status)
+            return
+        t0 = time.monotonic()
+        time.sleep(load)
+        if not chat and not prompt:   # прогрев: только загрузка модели
+            self._json(dict(self._final(0, 0, load, t0, 0.0), model=model, response=""))
+            return
+        limit = (body.get("options") or {}).get("num_predict")
+        wrap = (lambda t: {"message": {"role": "assistant", "content": t}}) if chat else (lambda t: {"response": t})
+        ptoks = _prompt_tokens(prompt)
+        if body.get("stream", True):
+            self._start_chunked("application/x-ndjson")
+            n = 0
+            for tok in self._generate(prompt, limit):
+                n += 1
+                self._chunk(json.dumps(dict(wrap(tok), model=model, done=False), ensure_ascii=False) + "\n")
+            final = dict(wrap(""), model=model, **self._final(ptoks, n, load, t0, self.cfg.ttft))
+            self._chunk(json.dumps(final, ensure_ascii=False) + "\n")
+            self._end_chunked()
+        else:
+            toks = list(self._generate(prompt, limit))
+            self._json(dict(wrap("".join(toks)), model=model, **self._final(ptoks, len(toks), load, t0, self.cfg.ttft)))
+
+    def _openai(self, body: dict) -> None:
+        model = body.get("model") or self.cfg.models[0]
+        fail, load = self._admit(model)
+        if fail:
+            self._json({"error": {"message": "stub: injected failure", "type": "server_error"}},
+                       self.cfg.error_status)
+            return
+        time.sleep(load)
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+        limit = body.get("max_tokens")
+        cid, created = f"chatcmpl-stub{self.state.requests}", int(time.time())
+        if body.get("stream"):
+            self._start_chunked("text/event-stream")
+            for tok in self._generate(prompt, limit):
+                ev = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                      "choices": [{"index": 0, "delta": {"content": tok}, "finish_reason": None}]}
+                self._chunk(f"data: {json.dumps(ev, ensure_ascii=False)}\n\n")
+            ev = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                  "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self._chunk(f"data: {json.dumps(ev)}\n\n")
+            self._chunk("data: [DONE]\n\n")
+            self._end_chunked()
+        else:
+            toks = list(self._generate(prompt, limit))
+            ptoks = _prompt_tokens(prompt)
+            self._json({
+                "id": cid, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(toks)}}],
+                "usage": {"prompt_tokens": ptoks, "completion_tokens": len(toks),
+                          "total_tokens": ptoks + len(toks)},
+            })
+
+
+class StubServer:
+    """Запущенная заглушка: url для OLLAMA_HOST/OPENAI_BASE_URL (+ "/v1"), stats(), stop()."""
+
+    def __init__(self, cfg: StubConfig, host: str = "127.0.0.1", port: int = 0):
+        self.cfg = cfg
+        self.state = _State(rng=random.Random(cfg.seed))
+        handler = type("StubHandler", (_Handler,), {"cfg": cfg, "state": self.state})
+        self._srv = ThreadingHTTPServer((host, port), handler)
+        self._srv.daemon_threads = True
+        self.url = f"http://{host}:{self._srv.server_port}"
+        self._thread = threading.Thread(target=self._srv.serve_forever, name="stub-llm", daemon=True)
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._srv.serve_forever()
+
+    def stats(self) -> dict:
+        with self.state.lock:
+            return {"requests": self.state.requests, "errors": self.state.errors,
+                    "loaded": sorted(self.state.loaded)}
+
+    def stop(self) -> None:
+        self._srv.shutdown()
+        self._srv.server_close()
+
+
+def serve(cfg: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    """Поднять заглушку в фоновом потоке (port=0 — свободный порт)."""
+    return StubServer(cfg or StubConfig(), host, port).start()
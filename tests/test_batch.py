@@ -0,0 +1,46 @@
+import os
+import sys
+import zipfile
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.utils import batch
+
+
+def test_zip_source_skips_non_resume_members(tmp_path):
+    path = tmp_path / "cv.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("cv/anna.txt", "Python SQL")
+        z.writestr("cv/ivan.md", "Docker")
+        z.writestr("__MACOSX/cv/._anna.txt", "junk")
+        z.writestr("cv/photo.png", "junk")
+        z.writestr("cv/.DS_Store", "junk")
+    assert [name for name, _ in batch.iter_sources(str(path))] == ["cv/anna.txt", "cv/ivan.md"]
+
+
+def test_glob_source_skips_non_resume_files_but_literal_file_is_taken(tmp_path):
+    for name in ("anna.txt", "ivan.md", "photo.png", ".DS_Store", "notes.log"):
+        (tmp_path / name).write_text("Python", encoding="utf-8")
+    names = [os.path.basename(n) for n, _ in batch.iter_sources(str(tmp_path / "*"))]
+    assert names == ["anna.txt", "ivan.md"]
+    assert [n for n, _ in batch.iter_sources(str(tmp_path / "notes.log"))] == [str(tmp_path / "notes.log")]
+
+
+def test_topk_matches_full_sort():
+    rows = [{"resume": f"r{i}", "score": (i * 37) % 11} for i in range(60)]   # много равных score
+    top = batch.TopK(7)
+    for r in rows:
+        top.push(r)
+    assert top.sorted() == sorted(rows, key=lambda r: r["score"], reverse=True)[:7]
+
+
+def test_batch_score_top_k_keeps_best_rows(monkeypatch):
+    monkeypatch.setattr(batch, "score_fit", lambda jd, text: (float(len(text) % 13), [], [], ""))
+    resumes = [(f"cv{i}", "x" * (i * 5)) for i in range(40)]
+    full, _ = batch.batch_score("JD", resumes)
+    top, csv_path = batch.batch_score("JD", iter(resumes), top_k=5)
+    assert top == full[:5]
+    with open(csv_path, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 41   # CSV — полный результат
@@ -0,0 +1,41 @@
+import os
+import sys
+import socket
+import threading
+import time
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm_ollama
+from skillpilot.gen.cancel import CancelToken, CANCELLED_TEXT
+from skillpilot.gen.ollama_pool import OllamaPool
+
+
+def test_token_callbacks():
+    tok, hits = CancelToken(), []
+    h = tok.register(lambda: hits.append("a"))
+    tok.register(lambda: hits.append("b"))
+    tok.unregister(h)
+    tok.cancel()
+    tok.cancel()
+    assert hits == ["b"] and tok.cancelled
+    tok.register(lambda: hits.append("late"))  # уже отменён — вызывается сразу
+    assert hits == ["b", "late"]
+
+
+def test_cancel_aborts_hanging_request(monkeypatch):
+    # сервер принимает соединение и молчит — без отмены chat() висел бы OLLAMA_TIMEOUT
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(4)
+    monkeypatch.setattr(llm_ollama, "_POOL", OllamaPool([f"http://127.0.0.1:{srv.getsockname()[1]}"]))
+    tok = CancelToken()
+    threading.Timer(0.3, tok.cancel).start()
+    t = time.monotonic()
+    try:
+        assert llm_ollama.chat("s", "p", cancel=tok) == CANCELLED_TEXT
+    finally:
+        srv.close()
+    assert time.monotonic() - t < 3
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import numpy as np
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import compact as C
+
+
+def _bow_embed(texts):
+    # детерминированный «эмбеддер»: мешок слов по хэшу, L2-нормировка
+    M = np.zeros((len(texts), 64), dtype=np.float32)
+    for i, t in enumerate(texts):
+        for w in C._WORD.findall(t.lower()):
+            M[i, sum(map(ord, w)) % 64] += 1
+    return M / np.maximum(np.linalg.norm(M, axis=1, keepdims=True), 1e-6)
+
+
+RESUME = "\n".join(
+    ["Иван Петров — Data Scientist", "Опыт работы:"]
+    + [f"- Организовал корпоратив номер {i} и турнир по настольному теннису в офисе" for i in range(20)]
+    + ["- Построил модель churn на Python и pandas, AUC 0.91",
+       "- Развернул сервис на Docker и Kubernetes"]
+)
+JD = "Ищем Data Scientist: Python, pandas, Docker, Kubernetes, модели churn."
+
+
+def test_compact_keeps_relevant_within_budget():
+    out = C.compact(RESUME, JD, budget=60, embed_fn=_bow_embed)
+    assert out.tokens_before > 60 >= out.tokens_after
+    assert out.saved > 0 and out.dropped > 0
+    lines = out.text.splitlines()
+    assert lines[0] == "Иван Петров — Data Scientist" and "Опыт работы:" in lines
+    assert any("churn" in l for l in lines) and any("Kubernetes" in l for l in lines)
+    assert C._GAP in lines
+    # исходный порядок сохранён
+    assert lines.index(next(l for l in lines if "churn" in l)) < lines.index(next(l for l in lines if "Kubernetes" in l))
+
+
+def test_short_input_untouched_and_lexical_fallback():
+    assert C.compact(JD, JD, budget=500).text == JD
+
+    def broken(_):
+        raise OSError("offline")
+
+    out = C.compact(RESUME, JD, budget=60, embed_fn=broken)
+    assert any("churn" in l for l in out.text.splitlines()) and out.tokens_after <= 60
+    assert C.stats()["tokens_saved"] > 0
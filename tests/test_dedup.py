@@ -0,0 +1,36 @@
+import os
+import sys
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.utils.dedup import NearDupIndex
+
+
+CV = (
+    "Data Scientist. Python, pandas, numpy, scikit-learn, SQL. "
+    "Строил ETL в Airflow, контейнеризировал модели в Docker, "
+    "ускорил отчётность в 3 раза, обработал 2 млн строк логов."
+)
+
+
+def test_near_duplicate_found():
+    idx = NearDupIndex(threshold=0.8)
+    idx.add("a", idx.signature(CV))
+    hit = idx.query(idx.signature(CV + " GitHub: github.com/user"))
+    assert hit is not None and hit[0] == "a" and hit[1] >= 0.8
+
+
+def test_different_resume_not_matched():
+    idx = NearDupIndex(threshold=0.8)
+    idx.add("a", idx.signature(CV))
+    other = "Java backend developer. Spring Boot, Kafka, Kubernetes, микросервисы для банка."
+    assert idx.query(idx.signature(other)) is None
+
+
+def test_texts_without_words_are_never_duplicates():
+    idx = NearDupIndex(threshold=0.8)
+    idx.add("blank", idx.signature("   \n\t"))
+    assert len(idx) == 0
+    assert idx.query(idx.signature("")) is None and idx.query(idx.signature("— • —")) is None
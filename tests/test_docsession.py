@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm as L, llm_ollama
+from skillpilot.gen.cover import make_cover
+from skillpilot.gen.docsession import doc_session
+from skillpilot.gen.ollama_pool import OllamaPool
+from skillpilot.gen.resume import make_tailored_resume
+from skillpilot.interview.qa import gen_questions
+
+
+def _kv_stub():
+    """Мини-Ollama с «KV-кэшем»: prompt_eval_count — символы после общего с прошлым промптом префикса."""
+    seen = {"last": "", "payloads": []}
+
+    class H(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            seen["payloads"].append(body)
+            text = "".join(m["content"] for m in body["messages"])
+            common = len(os.path.commonprefix([seen["last"], text]))
+            seen["last"] = text
+            out = json.dumps({"message": {"content": "ok"}, "done": True,
+                              "prompt_eval_count": len(text) - common}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, seen
+
+
+def test_generations_share_prefix_and_pinned_ctx(monkeypatch):
+    srv, seen = _kv_stub()
+    monkeypatch.setattr(L, "LLM_BACKEND", "ollama")
+    monkeypatch.setattr(L, "ollama_up", lambda: True)
+    monkeypatch.setattr(llm_ollama, "_POOL", OllamaPool([f"http://127.0.0.1:{srv.server_port}"]))
+    monkeypatch.setattr(L, "OLLAMA_FAST_MODEL", "small-fast")   # questions маршрутизировались бы на неё
+    resume = "Иван — Data Scientist.\n" + "\n".join(
+        f"- Проект {i}: модель churn на Python и pandas, AUC 0.9{i % 10}, сервис в Docker" for i in range(30))
+    jd = "Ищем Data Scientist: Python, pandas, Docker."
+    try:
+        assert make_tailored_resume(resume, jd, cache=False) == "ok"
+        assert make_cover(resume, jd, cache=False) == "ok"
+        gen_questions(jd, 5, resume=resume, cache=False)
+    finally:
+        srv.shutdown()
+
+    doc = doc_session(resume, jd)
+    first, second = doc.stats()["prefill_tokens"][:2]
+    assert second < first / 2          # второй вызов считает только хвост с заданием
+    a, b, q = seen["payloads"]
+    assert {p["model"] for p in seen["payloads"]} == {doc.model}   # вся сессия — на одной модели
+    assert a["messages"][0] == b["messages"][0]
+    assert a["messages"][1]["content"].startswith(doc.prefix) and b["messages"][1]["content"].startswith(doc.prefix)
+    assert a["options"]["num_ctx"] == b["options"]["num_ctx"] == doc.num_ctx
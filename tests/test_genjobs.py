@@ -0,0 +1,86 @@
+import os
+import sys
+import zipfile
+
+import pytest
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.interview import qa
+from skillpilot.utils import genjobs, jobs
+
+
+def test_top_n_generated_in_background_and_resumable(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(genjobs, "GENJOBS_DIR", str(tmp_path / "genjobs"))
+    src = tmp_path / "cv"
+    src.mkdir()
+    for i in range(4):
+        (src / f"cand{i}.txt").write_text(f"Кандидат {i}: Python SQL " + "pandas " * i, encoding="utf-8")
+    batch = jobs.BatchJob.create("Python pandas SQL", [str(src)])
+    for _ in batch.run():
+        pass
+
+    calls, fail = [], {"cover": True}
+
+    def fake(name):
+        def gen(cv, jd, **kw):
+            calls.append((name, kw["priority"]))
+            if fail.get(name):
+                return "[OLLAMA ERROR] down"
+            return f"{name}: {cv.split(':')[0]}"
+        return gen
+
+    monkeypatch.setitem(genjobs.GEN_FIELDS, "tailored", ("Резюме", fake("tailored")))
+    monkeypatch.setitem(genjobs.GEN_FIELDS, "cover", ("Письмо", fake("cover")))
+
+    job = genjobs.start_gen_job(batch.id, top_n=2, fields=["tailored", "cover"])
+    assert job.wait(10)
+    p = job.progress()
+    assert (p["done"], p["failed"], p["total"], p["status"]) == (2, 2, 4, "partial")
+    assert {pr for _, pr in calls} == {"background"}
+    best = [c["resume"] for c in job.meta["candidates"]]
+    assert best == [r["resume"] for r in batch.top(2)]
+
+    # продолжение: готовое не пересчитывается, упавшее — повторяется
+    fail.clear()
+    calls.clear()
+    job = genjobs.GenJob.load(job.id).start()
+    assert job.wait(10) and job.progress()["status"] == "done"
+    assert sorted(n for n, _ in calls) == ["cover", "cover"]
+
+    with zipfile.ZipFile(job.export_zip(str(tmp_path / "out.zip"))) as z:
+        names = z.namelist()
+        assert "index.md" in names and len([n for n in names if n.endswith(".md")]) == 5
+        assert z.read(f"{job.meta['candidates'][0]['dir']}/cover.md").decode().startswith("# Письмо")
+
+
+def test_questions_llm_error_is_not_recorded_as_done(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(genjobs, "GENJOBS_DIR", str(tmp_path / "genjobs"))
+    monkeypatch.setattr(genjobs, "_BUSY_PAUSE", 0.01)
+    monkeypatch.setattr(qa, "QUESTIONS_CACHE", 0)
+    src = tmp_path / "cv"
+    src.mkdir()
+    for i in range(2):
+        (src / f"cand{i}.txt").write_text(f"Кандидат {i}: Python SQL", encoding="utf-8")
+    batch = jobs.BatchJob.create("Python SQL", [str(src)])
+    for _ in batch.run():
+        pass
+
+    calls = []
+
+    def fake_llm(system, prompt, **kw):
+        calls.append(kw.get("priority"))
+        return "[BUSY] LLM занята" if len(calls) <= genjobs._BUSY_RETRIES else "[OFFLINE] LLM не настроена"
+
+    monkeypatch.setattr(qa, "llm", fake_llm)
+    job = genjobs.start_gen_job(batch.id, top_n=1, fields=["questions"])
+    assert job.wait(10)
+    p = job.progress()
+    assert (p["done"], p["failed"]) == (0, 1)
+    assert len(calls) == genjobs._BUSY_RETRIES   # [BUSY] вопросов повторяется, а не сохраняется шаблоном
+    with pytest.raises(qa.QuestionsError, match=r"^\[OFFLINE\]"):
+        qa.gen_questions("Python SQL", 5)
@@ -0,0 +1,126 @@
+import os
+import sys
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot import cli
+from skillpilot.utils import batch, jobs
+
+CV = (
+    "Data Scientist. Python, pandas, numpy, scikit-learn, SQL. "
+    "Строил ETL в Airflow, контейнеризировал модели в Docker, "
+    "ускорил отчётность в 3 раза, обработал 2 млн строк логов."
+)
+OTHER = "Java backend developer. Spring Boot, Kafka, Kubernetes, микросервисы для банка."
+
+
+def test_resume_marks_duplicates_of_already_written_representatives(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    scored = []
+
+    def fake_breakdown(jd, text):
+        scored.append(text)
+        return {"score": 90.0 if "Python" in text else 20.0, "semantic": 0.5, "overlap": 0.5, "penalty": 0,
+                "missing_critical": [], "strengths": ["Python"], "gaps": []}
+
+    monkeypatch.setattr(batch, "score_breakdown", fake_breakdown)
+    src = tmp_path / "cv"
+    src.mkdir()
+    (src / "a.txt").write_text(CV, encoding="utf-8")
+    (src / "b.txt").write_text(OTHER, encoding="utf-8")
+    job = jobs.BatchJob.create("Python SQL", [str(src)], dedup_threshold=0.8)
+    assert len(list(job.run())) == 2
+
+    # между запусками появились точный и почти-дубль уже записанного репрезентанта
+    (src / "c.txt").write_text(CV, encoding="utf-8")
+    (src / "d.txt").write_text(CV + " GitHub: github.com/user", encoding="utf-8")
+    scored.clear()
+    new = {r["resume"]: r for r in jobs.BatchJob.load(job.id).run(workers=2)}
+    assert scored == []                                  # дубли не скорились заново
+    assert set(new) == {"c.txt", "d.txt"}
+    assert new["c.txt"]["duplicate_of"] == "a.txt" and new["c.txt"]["similarity"] == 1.0
+    assert new["d.txt"]["duplicate_of"] == "a.txt" and new["d.txt"]["score"] == 90.0
+    assert set(new["d.txt"]) == {"resume", "score", "sha", "cluster", "duplicate_of", "similarity"}
+
+    # повторный resume ничего не добавляет
+    assert list(jobs.BatchJob.load(job.id).run()) == []
+    assert os.path.exists(os.path.join(job.dir, "index.sqlite"))
+
+
+def test_pages_and_export_follow_score_order_from_rank_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    job = jobs.BatchJob.create("Python", [])
+    rows = [{"resume": f"cv{i}.txt", "score": float(i % 4), "sha": str(i), "duplicate_of": "cv0.txt" if i == 5 else ""}
+            for i in range(10)]
+    with open(os.path.join(job.dir, "results.jsonl"), "w", encoding="utf-8") as fh:
+        for r in rows[:6]:
+            fh.write(jobs.json.dumps(r) + "\n")
+    assert [r["resume"] for r in job.results()] == [r["resume"] for r in sorted(rows[:6], key=lambda r: -r["score"])]
+
+    # лог дописывается — индекс догоняет; недописанная строка не индексируется
+    with open(os.path.join(job.dir, "results.jsonl"), "a", encoding="utf-8") as fh:
+        for r in rows[6:]:
+            fh.write(jobs.json.dumps(r) + "\n")
+        fh.write('{"resume": "half')
+    expect = [r["resume"] for r in sorted(rows, key=lambda r: -r["score"]) if not r["duplicate_of"]]
+    got, total = [], None
+    for p in range(3):
+        page, total = job.page(p, 4, hide_duplicates=True)
+        got += [r["resume"] for r in page]
+    assert got == expect and total == 9
+    assert job.page(0, 10, query="CV7", min_score=1)[0][0]["resume"] == "cv7.txt"
+
+    out = job.export(str(tmp_path / "all.jsonl"), "jsonl")
+    with open(out, encoding="utf-8") as f:
+        assert [jobs.json.loads(l)["resume"] for l in f] == [r["resume"] for r in sorted(rows, key=lambda r: -r["score"])]
+    job.export(str(tmp_path / "top.jsonl"), "jsonl", top=2)
+    with open(tmp_path / "top.jsonl", encoding="utf-8") as f:
+        assert [jobs.json.loads(l)["resume"] for l in f] == expect[:2]
+
+
+def test_hide_pii_masks_batch_through_anonymize_many(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(jobs, "PII_BATCH", 2)
+    calls, seen = [], []
+    real = jobs.anonymize_many
+    monkeypatch.setattr(jobs, "anonymize_many", lambda texts: calls.append(len(texts)) or real(texts))
+
+    def fake_breakdown(jd, text):
+        seen.append(text)
+        return {"score": 50.0, "semantic": 0.5, "overlap": 0.5, "penalty": 0,
+                "missing_critical": [], "strengths": [], "gaps": []}
+
+    monkeypatch.setattr(batch, "score_breakdown", fake_breakdown)
+    src = tmp_path / "cv"
+    src.mkdir()
+    for i in range(3):
+        (src / f"{i}.txt").write_text(f"Иван Петров {i}, ivan{i}@mail.ru. " + OTHER, encoding="utf-8")
+    job = jobs.BatchJob.create("Java", [str(src)], hide_pii=True, dedup=False)
+    assert len(list(job.run())) == 3
+    assert calls == [2, 1]
+    assert len(seen) == 3 and not any("@mail.ru" in t or "Иван" in t for t in seen)
+
+
+def test_cli_unknown_job_id_is_an_error_not_a_traceback(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    assert cli.main(["jobs", "fetch", "nope", "--out", str(tmp_path / "x.csv")]) == 2
+    assert cli.main(["jobs", "resume", "nope", "-q"]) == 2
+    assert capsys.readouterr().err.count("[ERROR]") == 2
+
+
+def test_empty_resumes_are_scored_not_marked_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(batch, "score_breakdown", lambda jd, text: {
+        "score": 0.0, "semantic": 0.0, "overlap": 0.0, "penalty": 0, "missing_critical": [], "strengths": [], "gaps": []})
+    src = tmp_path / "cv"
+    src.mkdir()
+    (src / "scan1.txt").write_text("", encoding="utf-8")
+    (src / "scan2.txt").write_text("  \n ", encoding="utf-8")
+    (src / "scan3.txt").write_text("", encoding="utf-8")
+    job = jobs.BatchJob.create("Python", [str(src)])
+    rows = list(job.run())
+    assert sorted(r["resume"] for r in rows) == ["scan1.txt", "scan2.txt", "scan3.txt"]
+    assert not any(r["duplicate_of"] for r in rows) and len({r["sha"] for r in rows}) == 3
+    assert list(jobs.BatchJob.load(job.id).run()) == []
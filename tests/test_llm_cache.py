@@ -0,0 +1,39 @@
+import os
+import sys
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm_cache
+
+
+def _fresh(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(llm_cache, "_CONN", None)
+
+
+def test_roundtrip_and_errors_not_cached(monkeypatch, tmp_path):
+    _fresh(monkeypatch, tmp_path)
+    k = llm_cache.cache_key("ollama", "m", "sys", "prompt", 0.2, 400)
+    assert k != llm_cache.cache_key("ollama", "m", "sys", "prompt", 0.3, 400)
+    llm_cache.put(k, "[OLLAMA ERROR] timeout")
+    assert llm_cache.get(k) is None
+    llm_cache.put(k, "ответ")
+    assert llm_cache.get(k) == "ответ"
+
+
+def test_ttl_and_size_eviction(monkeypatch, tmp_path):
+    _fresh(monkeypatch, tmp_path)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_TTL", 0.0)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MAX_MB", 0.01)  # ~10 KB
+    monkeypatch.setattr(llm_cache, "_EVICT_EVERY", 1)
+    for i in range(20):
+        llm_cache.put(f"k{i}", "x" * 1000)
+    st = llm_cache.stats()
+    assert st["bytes"] <= 0.01 * 1024 * 1024 and llm_cache.get("k19") is not None
+    assert llm_cache.get("k0") is None  # давно не использованные вытеснены первыми
+
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_TTL", 1e-9)  # запись старше TTL — промах
+    assert llm_cache.get("k19") is None
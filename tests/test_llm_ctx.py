@@ -0,0 +1,93 @@
+import os
+import sys
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm as L
+
+
+def test_context_size_buckets(monkeypatch):
+    monkeypatch.setattr(L, "OLLAMA_ADAPTIVE_CTX", True)
+    monkeypatch.setattr(L, "OLLAMA_CTX_BUCKETS", [2048, 4096, 8192])
+    assert L.context_size("s", "короткий промпт", 400) == (2048, 400)
+    mid = "слово " * 1500            # ~3300 токенов
+    assert L.context_size("s", mid, 400)[0] == 4096
+    huge = "слово " * 5000           # не влезает даже в 8192 — режем ответ, а не промпт
+    ctx, predict = L.context_size("s", huge, 900)
+    assert ctx == 8192 and predict < 900
+    monkeypatch.setattr(L, "OLLAMA_ADAPTIVE_CTX", False)
+    assert L.context_size("s", "x", 400) == (L.OLLAMA_NUM_CTX, 400)
+
+
+def test_profile_and_ollama_options_forwarded(monkeypatch):
+    sent = {}
+    monkeypatch.setattr(L, "LLM_BACKEND", "ollama")
+    monkeypatch.setattr(L, "ollama_up", lambda: True)
+    monkeypatch.setattr(L, "ollama_chat", lambda s, p, **kw: sent.update(kw) or "ok")
+    monkeypatch.setattr(L, "OLLAMA_ADAPTIVE_CTX", True)
+    monkeypatch.setattr(L, "OLLAMA_CTX_BUCKETS", [2048, 4096])
+
+    assert L.llm("sys", "план", task="plan", cache=False) == "ok"
+    assert sent["max_tokens"] == 600 and sent["num_ctx"] == 2048
+    assert sent["stop"] == L.TASK_PROFILES["plan"]["stop"]
+
+    # явные аргументы важнее профиля
+    L.llm("sys", "план", task="plan", max_tokens=100, top_p=0.9, stop=["END"], cache=False)
+    assert sent["max_tokens"] == 100 and sent["top_p"] == 0.9 and sent["stop"] == ["END"]
+    assert sent["temperature"] == L.DEFAULT_TEMPERATURE
+
+
+def test_route_model_by_task_and_queue(monkeypatch):
+    sent = []
+    monkeypatch.setattr(L, "LLM_BACKEND", "ollama")
+    monkeypatch.setattr(L, "ollama_up", lambda: True)
+    monkeypatch.setattr(L, "ollama_chat", lambda s, p, **kw: sent.append(kw["model"]) or "ok")
+    monkeypatch.setattr(L, "OLLAMA_MODEL", "big")
+    monkeypatch.setattr(L, "OLLAMA_FAST_MODEL", "small")
+    monkeypatch.setattr(L, "_LATENCY", {})
+    monkeypatch.setattr(L, "_ROUTED", {})
+
+    L.llm("s", "вопросы", task="questions", cache=False)
+    L.llm("s", "письмо", task="cover", cache=False)
+    assert sent == ["small", "big"]
+
+    # cover на основной модели идёт ~40s, впереди 4 запроса на 2 слота — в бюджет 60s не влезаем
+    monkeypatch.setattr(L, "_LATENCY", {("cover", "big"): 40.0})
+    monkeypatch.setattr(L.SCHEDULER, "stats", lambda: {"queued": 4, "active": 2, "slots": 2})
+    assert L.expected_latency("cover", "big") > L.TASK_PROFILES["cover"]["budget"]
+    L.llm("s", "письмо 2", task="cover", cache=False)
+    assert sent[-1] == "small"
+    assert L.routing_stats()["cover"]["small"]["calls"] == 1
+
+    # без быстрой модели маршрутизации нет
+    monkeypatch.setattr(L, "OLLAMA_FAST_MODEL", "")
+    L.llm("s", "вопросы 2", task="questions", cache=False)
+    assert sent[-1] == "big"
+
+
+def test_explicit_model_and_doc_session_bypass_routing(monkeypatch):
+    sent = []
+    monkeypatch.setattr(L, "LLM_BACKEND", "ollama")
+    monkeypatch.setattr(L, "ollama_up", lambda: True)
+    monkeypatch.setattr(L, "ollama_chat", lambda s, p, **kw: sent.append(kw["model"]) or "ok")
+    monkeypatch.setattr(L, "OLLAMA_MODEL", "big")
+    monkeypatch.setattr(L, "OLLAMA_FAST_MODEL", "small")
+    monkeypatch.setattr(L, "_ROUTED", {})
+    # очередь длинная: cover без закрепления ушёл бы на быструю модель
+    monkeypatch.setattr(L, "_LATENCY", {("cover", "big"): 40.0})
+    monkeypatch.setattr(L.SCHEDULER, "stats", lambda: {"queued": 4, "active": 2, "slots": 2})
+
+    class Doc:
+        model = "big"
+        context = staticmethod(lambda s, p, m: (4096, m))
+        key = "k"
+        record = staticmethod(lambda meta: None)
+
+    L.llm("s", "вопросы", task="questions", model="big", cache=False)
+    L.llm("s", "письмо", task="cover", doc=Doc(), cache=False)
+    assert sent == ["big", "big"]
+    assert L._ROUTED == {}                         # ни один вызов не маршрутизировался
+    L.llm("s", "письмо 2", task="cover", cache=False)
+    assert sent[-1] == "small" and L.routing_stats()["cover"]["small"]["calls"] == 1
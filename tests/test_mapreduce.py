@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+import time
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import mapreduce as M
+
+CV = "\n".join(
+    ["Иван Петров", "Опыт работы:"]
+    + [f"- Компания {i}: построил модель оттока на Python, выручка +{i} млн" for i in range(60)]
+    + ["Образование:", "- МГУ, прикладная математика"]
+)
+
+
+def test_split_chunks_covers_document_by_sections():
+    chunks = M.split_chunks(CV, budget=200)
+    assert len(chunks) > 2
+    assert "\n".join(chunks).splitlines() == CV.splitlines()   # ни одна строка не потеряна
+    assert all(M.estimate_tokens(c) <= 200 for c in chunks)
+    assert any(c.startswith("Образование:") for c in chunks)    # новый раздел — новый кусок
+
+
+def test_map_facts_parallel_with_deadline(monkeypatch):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_llm(system, prompt, task=None, cancel=None, **kw):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            if "Компания 0:" in prompt:                 # «зависший» кусок
+                cancel.wait(5)
+                return "[CANCELLED]"
+            time.sleep(0.05)
+            return "- факт"
+        finally:
+            with lock:
+                active[0] -= 1
+
+    real_compact = M.compact
+
+    def lexical_only(text, query, budget, embed_fn="default"):
+        assert embed_fn is None            # после дедлайна эмбеддер не зовём
+        return real_compact(text, query, budget, embed_fn=None)
+
+    monkeypatch.setattr(M, "llm", fake_llm)
+    monkeypatch.setattr(M, "compact", lexical_only)
+    t = time.monotonic()
+    facts = M.map_facts(CV, "Python", parallel=2, timeout=0.5)
+    assert time.monotonic() - t < 2                    # дедлайн ограничил map-фазу
+    n = len(M.split_chunks(CV))
+    assert facts.count("Раздел ") == n and peak[0] <= 2
+    # кусок, не успевший к дедлайну, попал в reduce в сжатом виде, а не пропал
+    assert "Компания 0" in facts
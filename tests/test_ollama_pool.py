@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm_ollama
+from skillpilot.gen.ollama_pool import OllamaPool
+
+
+def _stub(loaded=()):
+    """Мини-Ollama: /api/tags, /api/ps (loaded — загруженные модели), /api/chat → имя узла."""
+    hits = []
+
+    class H(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def _json(self, obj):
+            body = json.dumps(obj).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/ps":
+                self._json({"models": [{"name": m} for m in loaded]})
+            else:
+                self._json({"models": []})
+
+        def do_POST(self):
+            srv.bodies.append(json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}"))
+            hits.append(self.path)
+            self._json({"message": {"role": "assistant", "content": f"node{srv.server_port}"}, "done": True})
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+    srv.bodies = []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, hits
+
+
+def _url(srv):
+    return f"http://127.0.0.1:{srv.server_port}"
+
+
+def test_least_outstanding_and_model_affinity():
+    a, _ = _stub()
+    b, _ = _stub(loaded=["mistral:latest"])
+    try:
+        pool = OllamaPool([_url(a), _url(b)], affinity_slack=1)
+        assert pool.refresh(requests.get, timeout=2)
+        warm = pool.nodes[1]
+        with pool.node("mistral") as n1:
+            assert n1 is warm               # модель уже загружена на b
+            with pool.node("mistral") as n2:
+                assert n2 is warm           # перекос 1 ≤ slack — всё ещё b
+                with pool.node("mistral") as n3:
+                    assert n3 is pool.nodes[0]  # b перегружен — уходим на холодный a
+        assert all(n.outstanding == 0 for n in pool.nodes)
+    finally:
+        a.shutdown()
+        b.shutdown()
+
+
+def test_ejection_failover_and_readmission(monkeypatch):
+    live, hits = _stub()
+    dead = _stub()[0]
+    dead_url = _url(dead)
+    dead.shutdown()
+    dead.server_close()  # порт закрыт — connection refused
+    pool = OllamaPool([dead_url, _url(live)], eject_after=1, eject_for=60)
+    monkeypatch.setattr(llm_ollama, "_POOL", pool)
+    monkeypatch.setattr(llm_ollama, "_wake", lambda: None)
+    monkeypatch.setattr(llm_ollama, "_pause", lambda s, c: False)
+    try:
+        pool.nodes[1].outstanding += 1  # живой узел занят — первый запрос уйдёт на мёртвый
+        first = llm_ollama.chat("s", "p")
+        pool.nodes[1].outstanding -= 1
+        outs = [first] + [llm_ollama.chat("s", "p") for _ in range(3)]
+        assert outs == [f"node{live.server_port}"] * 4 and len(hits) == 4
+        st = pool.stats()
+        assert st[0]["ejected"] and not st[0]["healthy"] and st[1]["served"] == 4
+        # узел снова отвечает на probe — возвращается в ротацию
+        pool.nodes[0].url = _url(live)
+        assert pool.refresh(requests.get, timeout=2)
+        assert not pool.stats()[0]["ejected"]
+    finally:
+        live.shutdown()
+
+
+def test_warmup_loads_cold_nodes_only(monkeypatch):
+    cold, cold_hits = _stub()
+    warm, warm_hits = _stub(loaded=["mistral:latest"])
+    monkeypatch.setattr(llm_ollama, "OLLAMA_MODEL", "mistral")
+    monkeypatch.setattr(llm_ollama, "_POOL", OllamaPool([_url(cold), _url(warm)]))
+    try:
+        assert llm_ollama.warm_up() == 1          # срок на тёплом узле неизвестен — не трогаем
+        assert cold_hits == ["/api/generate"] and warm_hits == []
+        assert llm_ollama.warm_up(force=True) == 2
+        assert [s["loaded"] for s in llm_ollama.model_state()] == [False, True]
+    finally:
+        cold.shutdown()
+        warm.shutdown()
+
+
+def test_warmup_uses_num_ctx_of_real_requests(monkeypatch):
+    srv, hits = _stub()
+    pool = OllamaPool([_url(srv)])
+    monkeypatch.setattr(llm_ollama, "_POOL", pool)
+    monkeypatch.setattr(llm_ollama, "_CTX_SEEN", {})
+    monkeypatch.setattr(llm_ollama, "OLLAMA_ADAPTIVE_CTX", True)
+    monkeypatch.setattr(llm_ollama, "OLLAMA_CTX_BUCKETS", [2048, 4096, 8192])
+    monkeypatch.setattr(llm_ollama, "OLLAMA_NUM_CTX", 4096)
+    try:
+        assert pool.refresh(requests.get, timeout=2)
+        node = pool.nodes[0]
+        assert llm_ollama.warm_ctx("m", node) == 4096     # до запросов — корзина под OLLAMA_NUM_CTX
+        llm_ollama.chat("s", "p", num_ctx=2048, model="m")
+        assert llm_ollama.load_model(node, "m")           # keep-alive refresh после запроса
+        llm_ollama.chat("s", "p", num_ctx=2048, model="m")
+        chat1, warm, chat2 = srv.bodies
+        assert hits == ["/api/chat", "/api/generate", "/api/chat"]
+        assert warm["options"]["num_ctx"] == chat1["options"]["num_ctx"] == chat2["options"]["num_ctx"] == 2048
+    finally:
+        srv.shutdown()
+
+
+def test_keep_alive_and_warm_hours():
+    assert llm_ollama._keep_alive_seconds("15m") == 900
+    assert llm_ollama._keep_alive_seconds("1h") == 3600
+    assert llm_ollama._keep_alive_seconds("-1") is None
+    assert llm_ollama._in_warm_hours(9, "8-20") and not llm_ollama._in_warm_hours(21, "8-20")
+    assert llm_ollama._in_warm_hours(23, "22-6") and not llm_ollama._in_warm_hours(12, "22-6")
+    assert llm_ollama._in_warm_hours(3, "")
@@ -0,0 +1,89 @@
+import os
+import random
+import re
+import sys
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.utils import pii
+from skillpilot.utils.pii import _PII, TECH_SAFE, anonymize, anonymize_many, anonymize_with_map, deanonymize
+
+
+TEXT = "Контакты: Иван Петров, ivan.petrov@mail.ru, +7 (999) 123-45-67. Стек: Python, Docker."
+
+
+def test_anonymize_hides_pii_keeps_tech():
+    out = anonymize(TEXT)
+    assert "ivan.petrov@mail.ru" not in out and "123-45-67" not in out and "Иван" not in out
+    assert "[email hidden]" in out and "[phone hidden]" in out and "[name]" in out
+    assert "Python" in out and "Docker" in out
+    assert anonymize(TEXT) == out  # memo
+
+
+def test_name_does_not_swallow_email():
+    assert anonymize("Contact Ivan Petrov@mail.ru") == "[name] [email hidden]"
+
+
+def test_reversible_map_roundtrip():
+    masked, mapping = anonymize_with_map(TEXT + " Ещё раз: ivan.petrov@mail.ru")
+    assert masked.count("[email_1]") == 2
+    assert deanonymize(masked, mapping) == TEXT + " Ещё раз: ivan.petrov@mail.ru"
+
+
+def test_anonymize_many_matches_single():
+    texts = [TEXT, "", "Anna Smith anna@x.io"]
+    assert anonymize_many(texts) == [anonymize(t) for t in texts]
+
+
+def test_anonymize_many_process_pool_matches_single(monkeypatch):
+    monkeypatch.setattr(pii, "_PARALLEL_MIN", 2)
+    monkeypatch.setattr(pii.os, "cpu_count", lambda: 2)
+    texts = [TEXT, "", "Anna Smith anna@x.io", "тел 123-45-67Иван"] * 3
+    assert anonymize_many(texts, workers=4) == [anonymize(t) for t in texts]
+
+
+def test_reversible_map_covers_every_kind():
+    text = "Anna Smith, anna@x.io, +7 999 111-22-33; Иван Петров, +7 999 111-22-33. Python. [name_9]"
+    masked, mapping = anonymize_with_map(text)
+    assert {"[email_1]", "[phone_1]", "[name_1]", "[name_2]"} <= set(mapping)
+    assert masked.count("[phone_1]") == 2 and "Python" in masked
+    assert not any(v in masked for v in mapping.values())
+    assert deanonymize(masked, mapping) == text      # чужой токен [name_9] остаётся как есть
+
+
+# исходная анонимизация в три прохода — эталон: всё, что скрывала она, должно скрываться и сейчас
+_B_EMAIL = re.compile(r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b")
+_B_PHONE = re.compile(r"(?:\+?\d[\d\-\s\(\)]{7,}\d)")
+_B_NAME = re.compile(r"\b([А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+){0,2}|[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b")
+
+
+def _baseline_masked(text):
+    """Позиции символов, скрытых тремя проходами (замена той же длины не меняет границ слов)."""
+    chars, out = list(text), set()
+    for rx in (_B_EMAIL, _B_PHONE, _B_NAME):
+        for m in rx.finditer("".join(chars)):
+            if rx is _B_NAME and m.group(0).lower() in TECH_SAFE:
+                continue
+            a, b = m.span()
+            out.update(range(a, b))
+            chars[a:b] = ["["] + ["\x01"] * (b - a - 2) + ["]"]
+    return out
+
+
+def _masked(text):
+    return {i for m in _PII.finditer(text)
+            if not (m.lastgroup == "name" and m.group(0).lower() in TECH_SAFE) for i in range(*m.span())}
+
+
+def test_single_pass_never_reveals_what_three_passes_hid():
+    assert anonymize("call 8 800 555 35 35hr@corp.com") == "call [phone hidden]"
+    assert anonymize("тел 123-45-67Иван") == "тел [phone hidden][name]"
+    toks = ["Иван", "Петров", "Ivan", "Petrov", "hr", "corp", "@", ".", ".com", ".ru", "-", "+", "(", ")",
+            " ", "\n", "8", "800", "555", "35", "123", "7", "x", "_", "é", "Python", "Docker", "mail", "%"]
+    rng = random.Random(7)
+    corpus = [TEXT, "call 8 800 555 35 35hr@corp.com", "тел 123-45-67Иван", "Contact Ivan Petrov@mail.ru"]
+    corpus += ["".join(rng.choice(toks) for _ in range(rng.randint(1, 12))) for _ in range(5000)]
+    leaks = [t for t in corpus if _baseline_masked(t) - _masked(t)]
+    assert not leaks, leaks[:5]
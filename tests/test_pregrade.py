@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.core.embedder import embed
+from skillpilot.interview.pregrade import pregrade, parse_transcript, grade_transcript
+from skillpilot.interview.rubric import RUBRIC
+
+Q = "Расскажите о проекте, где вы улучшили метрику модели."
+GOOD = ("В компании X на проекте антифрода стояла задача снизить потери. Я построил модель на бустинге "
+        "вместо правил, потому что правила не ловили новые схемы. В итоге AUC вырос с 0.81 до 0.92, "
+        "потери снизились на 35%, задержка осталась ниже 50 мс.")
+BAD = "Ну типа делал модели, как бы всё норм."
+
+
+def _fake(texts):
+    return embed(texts, name="fake")
+
+
+def test_pregrade_rubric_dimensions_fast():
+    t = time.perf_counter()
+    good, bad = pregrade(Q, GOOD, embed_fn=_fake), pregrade(Q, BAD, embed_fn=_fake)
+    assert time.perf_counter() - t < 0.5
+    assert set(good["dims"]) == set(RUBRIC)
+    assert all(good["star"].values()) and good["dims"]["specific"] == 100
+    assert good["score"] > 60 > 30 > bad["score"]
+    assert any("Результат" in h for h in bad["hints"]) and any("паразиты" in h for h in bad["hints"])
+
+
+def test_transcript_batch():
+    text = f"В: {Q}\nО: {GOOD}\nпродолжение ответа\n\nQ: Почему ушли?\nA: {BAD}"
+    pairs = parse_transcript(text)
+    assert [q for q, _ in pairs] == [Q, "Почему ушли?"]
+    assert pairs[0][1].endswith("продолжение ответа")
+    res = grade_transcript(text, jd="антифрод, ML", embed_fn=_fake)
+    assert len(res["items"]) == 2 and res["items"][0]["score"] > res["items"][1]["score"]
+    assert res["score"] == round((res["items"][0]["score"] + res["items"][1]["score"]) / 2, 1)
@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+
+import pytest
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm as L, llm_cache
+from skillpilot.interview import qa
+
+JD = "Ищем Data Scientist: Python, SQL, A/B-тесты, продакшн-модели."
+
+
+def test_structured_questions_cached_by_jd(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(llm_cache, "_CONN", None)
+    calls = []
+
+    def fake_chat(system, prompt, **kw):
+        calls.append(kw)
+        qs = [f"Вопрос номер {i} про Python и SQL в продакшне?" for i in range(1, 6)]
+        return json.dumps({"questions": qs}, ensure_ascii=False)
+
+    monkeypatch.setattr(L, "LLM_BACKEND", "ollama")
+    monkeypatch.setattr(L, "ollama_up", lambda: True)
+    monkeypatch.setattr(L, "ollama_chat", fake_chat)
+
+    qs = qa.gen_questions(JD, 5)
+    assert len(qs) == 5 and qs[0] == "Вопрос номер 1 про Python и SQL в продакшне?"
+    schema = calls[0]["fmt"]["properties"]["questions"]
+    assert schema["minItems"] == schema["maxItems"] == 5 and calls[0]["stop"] == ["]}"]
+
+    # повторный клик / другая сессия — из кэша, без LLM
+    assert qa.gen_questions(JD, 5) == qs and qa.cached_questions(JD, 5) == qs
+    assert len(calls) == 1
+    qa.gen_questions(JD, 5, regenerate=True)
+    assert len(calls) == 2
+    assert qa.cached_questions("Другой JD", 5) is None
+
+
+def test_parse_truncated_or_loose_json():
+    cut = '{"questions": ["Как вы валидируете модель?", "Какие метрики выбираете и почему?"'   # съел stop "]}"
+    assert qa._parse_questions(cut, 5) == ["Как вы валидируете модель?", "Какие метрики выбираете и почему?"]
+    loose = 'Вот вопросы:\n1. Расскажите о проекте\n2. Как проводите A/B тест?\n3. Лишний'
+    assert qa._parse_questions(loose, 2) == ["Расскажите о проекте", "Как проводите A/B тест?"]
+    long = json.dumps({"questions": [" ".join(["слово"] * 40)]})
+    assert len(qa._parse_questions(long, 1)[0].split()) == qa.QUESTION_WORDS_MAX
+
+
+def test_llm_error_is_raised_and_bad_cache_entry_is_a_miss(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(llm_cache, "_CONN", None)
+    monkeypatch.setattr(qa, "llm", lambda *a, **kw: "[OLLAMA ERROR] 500: model crashed")
+    with pytest.raises(qa.QuestionsError, match="OLLAMA ERROR"):
+        qa.gen_questions(JD, 5)
+    assert qa.cached_questions(JD, 5) is None
+
+    for bad in ("{not json", '{"questions": []}', '["ok", 3]', "[]"):
+        llm_cache.put(qa._cache_key(JD, "", 5), bad)
+        assert qa.cached_questions(JD, 5) is None
@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen.cancel import CancelToken
+from skillpilot.gen.scheduler import Busy, LLMScheduler
+
+
+def _wait_queued(s, n, timeout=2.0):
+    end = time.monotonic() + timeout
+    while s.stats()["queued"] < n and time.monotonic() < end:
+        time.sleep(0.005)
+
+
+def test_priority_and_round_robin_order():
+    s = LLMScheduler(slots=1, max_queue=10, timeout=5)
+    hold = s.acquire("interactive", "x")
+    order, threads = [], []
+
+    def worker(prio, sess, tag):
+        with s.slot(prio, sess):
+            order.append(tag)
+
+    # сессия A кладёт два запроса раньше B; background — раньше всех
+    for prio, sess, tag in [("background", "z", "bg"), ("interactive", "A", "a1"),
+                            ("interactive", "A", "a2"), ("interactive", "B", "b1")]:
+        th = threading.Thread(target=worker, args=(prio, sess, tag))
+        th.start()
+        threads.append(th)
+        _wait_queued(s, len(threads))
+    s.release(hold)
+    for th in threads:
+        th.join(2)
+    assert order == ["a1", "b1", "a2", "bg"]
+    assert s.stats()["served"] == 5
+
+
+def test_busy_when_queue_full_and_cancel_while_waiting():
+    s = LLMScheduler(slots=1, max_queue=1, timeout=5)
+    hold = s.acquire()
+    token = CancelToken()
+    got = []
+    th = threading.Thread(target=lambda: got.append(s.acquire(cancel=token)))
+    th.start()
+    _wait_queued(s, 1)
+    with pytest.raises(Busy) as e:
+        s.acquire()
+    assert e.value.text().startswith("[BUSY]") and e.value.position == 2
+    token.cancel()
+    th.join(2)
+    assert got and not got[0].granted
+    assert s.stats()["queued"] == 0 and s.stats()["rejected"] == 1
+    s.release(hold)
+    assert s.stats()["active"] == 0
+
+
+def test_background_keeps_a_slot_for_interactive():
+    s = LLMScheduler(slots=2, max_queue=4, timeout=5)
+    bg = s.acquire("background")
+    got = []
+    th = threading.Thread(target=lambda: got.append(s.acquire("background")))
+    th.start()
+    _wait_queued(s, 1)                  # второй background ждёт, а не занимает последний слот
+    assert s.stats()["queued_by_priority"]["background"] == 1
+    t = time.monotonic()
+    ui = s.acquire("interactive")       # ждущий background не мешает занять свободный слот
+    assert ui.granted and time.monotonic() - t < 0.5
+    s.release(bg)                       # освободившийся слот уходит ждущему background
+    th.join(2)
+    assert got and got[0].granted
+    s.release(ui)
+    s.release(got[0])
+    assert s.stats()["active"] == 0 and s.stats()["rejected"] == 0
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import time
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen.cancel import CancelToken
+from skillpilot.gen.singleflight import SingleFlight
+
+
+def _slow_upstream(calls, n=5, delay=0.05):
+    def factory(token):
+        calls.append(token)
+        for i in range(n):
+            if token.cancelled:
+                return
+            time.sleep(delay)
+            yield f"t{i} "
+    return factory
+
+
+def test_concurrent_streams_share_one_upstream():
+    sf, calls, outs = SingleFlight(), [], []
+
+    def worker():
+        outs.append("".join(sf.stream("k", _slow_upstream(calls))))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+        time.sleep(0.02)  # опоздавшие получают буфер с начала
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert outs == ["t0 t1 t2 t3 t4 "] * 3
+    assert len(sf) == 0
+
+
+def test_upstream_cancelled_only_when_all_subscribers_leave():
+    sf, calls = SingleFlight(), []
+    a, b = CancelToken(), CancelToken()
+    got = {}
+
+    def worker(name, tok):
+        got[name] = "".join(sf.stream("k", _slow_upstream(calls, n=20), tok))
+
+    ta = threading.Thread(target=worker, args=("a", a))
+    tb = threading.Thread(target=worker, args=("b", b))
+    ta.start(); tb.start()
+    time.sleep(0.12)
+    a.cancel()
+    ta.join(1)
+    assert not calls[0].cancelled  # b ещё слушает
+    time.sleep(0.1)
+    b.cancel()
+    tb.join(1)
+    time.sleep(0.1)
+    assert calls[0].cancelled
+    assert len(got["b"]) > len(got["a"])
+
+
+def test_call_returns_same_result_for_concurrent_callers():
+    sf, n = SingleFlight(), []
+
+    def fn(token):
+        n.append(1)
+        time.sleep(0.1)
+        return "ответ"
+
+    res = []
+    threads = [threading.Thread(target=lambda: res.append(sf.call("q", fn))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert res == ["ответ"] * 4 and len(n) == 1
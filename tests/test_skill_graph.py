@@ -0,0 +1,48 @@
+import os
+import sys
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.graph import skill_graph as SG
+
+JD = "Ищем ML-инженера: Python, SQL, Airflow, Docker, A/B-тесты, градиентный бустинг."
+CV = "Data Scientist. Python, SQL, pandas, градиентный бустинг, модели оттока."
+
+
+def test_graph_computed_once_and_png_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(SG, "GRAPH_CACHE_DIR", str(tmp_path))
+    SG._RECO.clear()
+    calls = []
+    real = SG.extract_keywords
+    monkeypatch.setattr(SG, "extract_keywords", lambda t, n: calls.append(t) or real(t, n))
+
+    G1, have, recs = SG.demo_graph_reco(JD, CV)
+    G2, _, _ = SG.demo_graph_reco(JD, CV)
+    assert len(calls) == 2                              # YAKE по двум документам — один раз на пару
+    assert SG.graph_key(G1) == SG.graph_key(G2)
+    assert SG.graph_key(G1) != SG.graph_key(G1, target_role="другая роль")
+
+    before = SG.render_stats()
+    p1 = SG.render_graph_png(G1, target_role="под JD")
+    p2 = SG.render_graph_png(G2, target_role="под JD")
+    after = SG.render_stats()
+    assert os.path.exists(p1) and os.path.exists(p2)
+    if SG.nx is not None and SG.plt is not None:
+        assert p1 == p2 and os.path.dirname(p1) == str(tmp_path)
+        assert after["renders"] - before["renders"] == 1
+        assert after["cache_hits"] - before["cache_hits"] == 1
+
+
+def test_png_cache_keeps_newest_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(SG, "GRAPH_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(SG, "GRAPH_CACHE_MAX", 2)
+    if SG.nx is None or SG.plt is None:
+        return
+    paths = []
+    for i in range(4):
+        paths.append(SG.render_graph_png({"have": [f"навык {i}"], "need": ["SQL"]}))
+        os.utime(paths[-1], (1000 + i, 1000 + i))   # явный порядок по mtime
+    left = sorted(os.listdir(tmp_path))
+    assert len(left) == 2 and sorted(os.path.basename(p) for p in paths[-2:]) == left
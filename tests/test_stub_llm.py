@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.core.embedder import embed
+from skillpilot.gen import llm_ollama, telemetry
+from skillpilot.gen.ollama_pool import OllamaPool
+from skillpilot.utils.stub_llm import StubConfig, serve
+
+
+def test_stub_speaks_ollama_with_ttft_and_rate(monkeypatch):
+    srv = serve(StubConfig(ttft=0.2, token_rate=50, tokens=10, load_secs=0.3))
+    monkeypatch.setattr(telemetry, "LLM_COLD_LOAD_MS", 100)
+    monkeypatch.setattr(llm_ollama, "_POOL", OllamaPool([srv.url]))
+    telemetry.clear()
+    try:
+        t = time.monotonic()
+        parts = list(llm_ollama.chat_stream("s", "промпт", max_tokens=5, task="star"))
+        assert len(parts) == 5                          # num_predict ограничивает ответ
+        assert 0.5 <= time.monotonic() - t < 2          # загрузка + TTFT + 4 токена по 20ms
+        again = llm_ollama.chat("s", "промпт", max_tokens=5)
+        assert again == "".join(parts).strip()          # ответ зависит только от промпта
+        cold, warm = telemetry.records()
+        assert cold["cold"] and not warm["cold"] and warm["gen_tokens"] == 5
+        assert llm_ollama._POOL.refresh(requests.get) and llm_ollama._POOL.nodes[0].has_model("mistral")
+    finally:
+        srv.stop()
+
+
+def test_stub_openai_shape_and_errors():
+    srv = serve(StubConfig(ttft=0, token_rate=0, content="готово", error_rate=0.5, seed=1))
+    try:
+        codes = []
+        for _ in range(10):
+            r = requests.post(f"{srv.url}/v1/chat/completions",
+                              json={"model": "m", "messages": [{"role": "user", "content": "x"}]})
+            codes.append(r.status_code)
+            if r.ok:
+                assert r.json()["choices"][0]["message"]["content"] == "готово"
+        assert 0 < codes.count(500) < 10 and srv.stats()["errors"] == codes.count(500)
+    finally:
+        srv.stop()
+
+
+def test_fake_embedder_deterministic():
+    a, b, c = embed(["Python SQL аналитик", "аналитик Python", "повар кондитер"], name="fake:128")
+    assert a.shape == (128,) and np.isclose(np.linalg.norm(a), 1.0)
+    assert np.allclose(a, embed("Python SQL аналитик", name="fake:128")[0])
+    assert a @ b > a @ c
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+if BASE not in sys.path:
+    sys.path.append(BASE)
+
+from skillpilot.gen import llm_ollama, telemetry
+from skillpilot.gen.ollama_pool import OllamaPool
+
+FINAL = {"done": True, "prompt_eval_count": 120, "prompt_eval_duration": 300_000_000,
+         "eval_count": 40, "eval_duration": 2_000_000_000, "load_duration": 3_000_000_000}
+
+
+def _stub():
+    class H(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if body.get("stream"):
+                lines = [{"message": {"content": "a"}}, {"message": {"content": "b"}}, dict(FINAL)]
+                out = "".join(json.dumps(x) + "\n" for x in lines).encode()
+            else:
+                out = json.dumps(dict(FINAL, message={"content": "ok"})).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def test_chat_calls_recorded_by_task(monkeypatch):
+    srv = _stub()
+    monkeypatch.setattr(llm_ollama, "_POOL", OllamaPool([f"http://127.0.0.1:{srv.server_port}"]))
+    telemetry.clear()
+    try:
+        assert llm_ollama.chat("s", "p", task="cover") == "ok"
+        assert "".join(llm_ollama.chat_stream("s", "p", task="plan")) == "ab"
+    finally:
+        srv.shutdown()
+
+    cover, plan = telemetry.records()
+    assert (cover["task"], plan["task"]) == ("cover", "plan") and plan["stream"]
+    assert cover["ttft"] == 3.3                      # load + prefill по счётчикам Ollama
+    assert plan["ttft"] <= plan["total"]             # у стрима — по первому куску
+    assert cover["prompt_tokens"] == 120 and cover["gen_tokens"] == 40 and cover["tok_s"] == 20
+    assert cover["cold"] and plan["cold"]            # load_duration 3s > LLM_COLD_LOAD_MS
+
+    s = telemetry.summary()
+    assert s["cover"]["calls"] == 1 and s["plan"]["cold"] == 1
+    assert "| cover | 1 |" in telemetry.summary_md()